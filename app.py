@@ -1,14 +1,25 @@
 import os
 import csv
-from flask import Flask, jsonify, request
+from urllib.parse import urlencode
+from flask import Flask, g, jsonify, request
 from flasgger import Swagger, swag_from
 import pandas as pd
+import numpy as np
 from flask_jwt_extended import (
     JWTManager, create_access_token, create_refresh_token,
     jwt_required, get_jwt_identity, get_jwt
 )
 import joblib
-from monitorar import monitor_api_call  # <- Importa o decorador
+from monitorar import GRAVADOR_LOGS, monitor_api_call  # <- Importa o decorador
+from metricas import METRICAS
+from perfil import etapa
+from book_store import CAMPOS_LIVRO
+from book_reload import INTERVALO_PADRAO, BookStoreReloader
+from book_table import COLUNAS_RESUMO
+from book_search import ranquear
+from response_cache import ResponseCache
+from book_cursor import (CursorExpirado, CursorInvalido, codificar_cursor, decodificar_cursor, escopo_consulta,
+                         livro_do_cursor, posicao_keyset)
 
 app = Flask(__name__)
 app.config['SWAGGER'] = {
@@ -32,52 +43,152 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CSV_FILENAME = 'tabela_unificada.csv'
 FULL_CSV_PATH = os.path.join(BASE_DIR, 'exports', 'csv', CSV_FILENAME)
 
-def load_books_from_csv():
+# Intervalo (segundos) entre verificações da tabela unificada para recarregar os dados; 0 desativa
+RELOAD_INTERVAL = int(os.environ.get('BOOKS_RELOAD_INTERVAL', INTERVALO_PADRAO))
+
+def publish_book_store(store):
+    """Troca a referência global pelo store recém-carregado (chamado pelo BOOK_RELOADER)."""
+    global BOOK_STORE
+    BOOK_STORE = store
+
+# Guarda o BookStore em uso e o troca, sem reiniciar a API, quando a tabela unificada muda
+BOOK_RELOADER = BookStoreReloader(ao_trocar=publish_book_store)
+
+def load_book_store():
     """
-    Carrega todos os dados dos livros do arquivo CSV.
-    Retorna uma lista de dicionários.
+    Carrega a tabela unificada em um BookStore (arrays colunares somente leitura),
+    compartilhado por todas as rotas. Retorna None se os dados não puderem ser carregados.
     """
-    if not os.path.exists(FULL_CSV_PATH):
+    try:
+        return BOOK_RELOADER.carregar()
+    except FileNotFoundError:
         print(f"ERROR: CSV file not found at {FULL_CSV_PATH}")
         return None
-
-    books_data = []
-    try:
-        with open(FULL_CSV_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                book = {
-                    "product_page_url": row.get("product_page_url"),
-                    "universal_product_code": row.get("universal_product_code"),
-                    "title": row.get("title"),
-                    "price_including_tax": row.get("price_including_tax"),
-                    "price_excluding_tax": row.get("price_excluding_tax"),
-                    "number_available": row.get("number_available"),
-                    "product_description": row.get("product_description"),
-                    "category": row.get("category"),
-                    "review_rating": row.get("review_rating"),
-                    "image_url": row.get("image_url"),
-                    "arquivo_origem": row.get("arquivo_origem", CSV_FILENAME)
-                }
-                books_data.append(book)
-        return books_data
     except Exception as e:
         print(f"ERROR: Error reading CSV file: {e}")
         return None
 
-# Carrega os dados do CSV uma única vez
-ALL_BOOKS_DATA = load_books_from_csv()
+# Carrega os dados do CSV na inicialização; as versões seguintes vêm do BOOK_RELOADER
+BOOK_STORE = BOOK_RELOADER.atual = load_book_store()
 
-if ALL_BOOKS_DATA is None:
+if BOOK_STORE is None:
     print("FATAL: Failed to load books data at startup.")
 
-# Função auxiliar para aplicar paginação
-def apply_pagination(data_list):
+@app.before_request
+def pin_book_store():
+    """
+    Fixa o store em uso para toda a requisição: um reload no meio dela não a afeta,
+    e a versão antiga só é liberada quando as requisições que a usam terminam.
+    """
+    g.book_store = BOOK_RELOADER.atual
+    BOOK_RELOADER.observar(RELOAD_INTERVAL)
+
+def current_store():
+    return g.book_store
+
+# Soma os snapshots de workers que já terminaram no total dos encerrados
+METRICAS.recolher_encerrados()
+
+# Cache das respostas GET, descartado sempre que a versão dos dados (mtime da tabela) muda
+RESPONSE_CACHE = ResponseCache(versao=lambda: current_store().versao if current_store() is not None else None)
+
+# Tamanho máximo de página nas listagens (um limit maior é reduzido a este valor)
+MAX_PAGE_SIZE = 100
+
+# Funções auxiliares para aplicar paginação
+def pagination_args():
     limit = request.args.get('limit', type=int, default=10)
     offset = request.args.get('offset', type=int, default=0)
-    limit = max(1, limit)
-    offset = max(0, offset)
-    return data_list[offset:offset + limit]
+    return min(max(1, limit), MAX_PAGE_SIZE), max(0, offset)
+
+def cursor_arg(requer_chave=False):
+    """
+    Lê o parâmetro cursor (token devolvido em X-Next-Cursor pela página anterior).
+    Retorna (cursor, erro): cursor é (id do último livro entregue, chave de ordenação) ou None
+    quando não foi informado; erro é a resposta 400 (cursor inválido) ou 410 (livro não existe mais).
+    """
+    token = request.args.get('cursor')
+    if not token:
+        return None, None
+    try:
+        dados = decodificar_cursor(token, escopo_consulta(request.path, request.args))
+        if requer_chave and 'k' not in dados:
+            raise CursorInvalido("cursor sem chave de ordenação")
+        book_id = livro_do_cursor(dados, current_store())
+    except CursorInvalido as e:
+        return None, (jsonify({"error": f"Invalid cursor: {e}."}), 400)
+    except CursorExpirado:
+        return None, (jsonify({"error": "Cursor expired, the book it points to no longer exists. Restart pagination."}), 410)
+    return (book_id, dados.get('k')), None
+
+def page_after(ids, limit, offset, cursor):
+    """
+    Página de uma lista de ids em ordem crescente: a partir do offset ou, com cursor,
+    logo após o último id entregue (busca binária, o custo não cresce com a profundidade).
+    Retorna os ids da página e se existe uma próxima página.
+    """
+    start = offset if cursor is None else int(np.searchsorted(ids, cursor[0], side='right'))
+    return ids[start:start + limit], start + limit < len(ids)
+
+def ranked_page(ids, scores, limit, offset, cursor):
+    """
+    Página de uma lista ordenada por pontuação decrescente (empate pelo id), com ids em ordem crescente.
+    Com cursor ficam só os livros depois do último entregue e a página volta a ser um top-k,
+    como a primeira; só os livros da página são ordenados por completo.
+    Retorna os ids da página e a pontuação do último (None quando não há próxima página).
+    """
+    start = offset
+    if cursor is not None:
+        last_id, last_score = cursor
+        after = (scores < last_score) | ((scores == last_score) & (ids > last_id))
+        ids, scores = ids[after], scores[after]
+        start = 0
+
+    page = ranquear(ids, scores, start + limit)[start:start + limit]
+    if start + limit >= len(ids):
+        return page, None
+    return page, scores[np.searchsorted(ids, page[-1])]
+
+# Maior k aceito nas rotas de top-k e desempates disponíveis (nome na API -> índice do store)
+MAX_TOP_K = 100
+TIE_BREAKS = {'default': 'padrao', 'price': 'preco', 'availability': 'estoque'}
+
+def top_k_args(args, default_k):
+    """
+    Lê k e tie_break (da query ou do corpo JSON) para as rotas de top-k.
+    Retorna (k, desempate do store, erro), com erro sendo a resposta 400 para valores inválidos.
+    """
+    k = args.get('k', default_k)
+    tie_break = args.get('tie_break', 'default')
+    try:
+        k = int(k)
+    except (TypeError, ValueError):
+        k = 0
+    if not 1 <= k <= MAX_TOP_K:
+        return None, None, (jsonify({"error": f"'k' must be an integer between 1 and {MAX_TOP_K}."}), 400)
+    if tie_break not in TIE_BREAKS:
+        return None, None, (jsonify({"error": f"Invalid 'tie_break', use {', '.join(TIE_BREAKS)}."}), 400)
+    return k, TIE_BREAKS[tie_break], None
+
+def paginated_response(items, total, last_id=None, last_key=None):
+    """
+    Resposta de uma página: o corpo continua sendo a lista; X-Total-Count traz o total de resultados
+    e, quando há próxima página (last_id informado), X-Next-Cursor e Link (rel="next") apontam para ela.
+    """
+    response = jsonify(items)
+    response.headers['X-Total-Count'] = str(total)
+    if last_id is not None:
+        book_store = current_store()
+        last_id = int(last_id)
+        cursor = codificar_cursor(
+            escopo_consulta(request.path, request.args), book_store.versao, last_id,
+            book_store.valor('universal_product_code', last_id), last_key
+        )
+        args = {name: request.args.getlist(name) for name in request.args if name not in ('cursor', 'offset')}
+        args['cursor'] = [cursor]
+        response.headers['X-Next-Cursor'] = cursor
+        response.headers['Link'] = f'<{request.path}?{urlencode(args, doseq=True)}>; rel="next"'
+    return response
 
 @app.route('/')
 def home():
@@ -85,6 +196,7 @@ def home():
 
 @app.route('/api/v1/books', methods=['GET'])
 @monitor_api_call
+@RESPONSE_CACHE.cached
 def get_all_books():
     """
     Retorna uma lista paginada de todos os livros.
@@ -95,27 +207,54 @@ def get_all_books():
         type: integer
         required: false
         default: 10
-        description: O número de livros a serem retornados por página.
+        description: O número de livros a serem retornados por página (máximo 100).
       - name: offset
         in: query
         type: integer
         required: false
         default: 0
         description: O ponto de partida para a paginação.
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Token do cabeçalho X-Next-Cursor da página anterior (substitui o offset).
     responses:
       200:
         description: Uma lista de livros.
+        headers:
+          X-Total-Count:
+            type: integer
+            description: Total de livros encontrados.
+          X-Next-Cursor:
+            type: string
+            description: Cursor da próxima página (ausente na última página).
+      400:
+        description: Cursor inválido ou gerado para outra consulta.
+      410:
+        description: O livro apontado pelo cursor não existe mais nos dados recarregados.
       500:
         description: Erro interno do servidor, dados dos livros não carregados.
     """
-    if ALL_BOOKS_DATA is None:
+    book_store = current_store()
+    if book_store is None:
         return jsonify({"error": "Book data not loaded. Check server logs."}), 500
     
-    paginated_books = apply_pagination(ALL_BOOKS_DATA)
-    return jsonify(paginated_books)
+    limit, offset = pagination_args()
+    cursor, error = cursor_arg()
+    if error:
+        return error
+
+    # Ordem da tabela: a página seguinte ao cursor começa no id seguinte
+    total = len(book_store)
+    start = offset if cursor is None else cursor[0] + 1
+    page = range(start, min(start + limit, total))
+    has_next = start + limit < total
+    return paginated_response(book_store.livros(page), total, page[-1] if has_next else None)
 
 @app.route('/api/v1/books/category/<string:category_name>', methods=['GET'])
 @monitor_api_call
+@RESPONSE_CACHE.cached
 def get_books_by_category(category_name):
     """
     Busca livros por uma categoria específica.
@@ -131,49 +270,86 @@ def get_books_by_category(category_name):
         type: integer
         required: false
         default: 10
-        description: O número de livros a serem retornados por página.
+        description: O número de livros a serem retornados por página (máximo 100).
       - name: offset
         in: query
         type: integer
         required: false
         default: 0
         description: O ponto de partida para a paginação.
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Token do cabeçalho X-Next-Cursor da página anterior (substitui o offset).
     responses:
       200:
         description: Uma lista de livros da categoria especificada.
+        headers:
+          X-Total-Count:
+            type: integer
+            description: Total de livros encontrados.
+          X-Next-Cursor:
+            type: string
+            description: Cursor da próxima página (ausente na última página).
+      400:
+        description: Cursor inválido ou gerado para outra consulta.
+      410:
+        description: O livro apontado pelo cursor não existe mais nos dados recarregados.
       404:
         description: Nenhum livro encontrado para a categoria especificada.
       500:
         description: Erro interno, dados dos livros não carregados.
     """
-    if ALL_BOOKS_DATA is None:
+    book_store = current_store()
+    if book_store is None:
         return jsonify({"error": "Book data not loaded. Check server logs."}), 500
 
-    filtered_by_category = [
-        book for book in ALL_BOOKS_DATA 
-        if book.get('category', '').lower() == category_name.lower()
-    ]
+    filtered_by_category = book_store.ids_categoria(category_name)
 
-    if not filtered_by_category:
+    if len(filtered_by_category) == 0:
         return jsonify({"message": f"No books found for category: {category_name}"}), 404
 
-    paginated_books = apply_pagination(filtered_by_category)
-    return jsonify(paginated_books)
+    limit, offset = pagination_args()
+    cursor, error = cursor_arg()
+    if error:
+        return error
+
+    page, has_next = page_after(filtered_by_category, limit, offset, cursor)
+    return paginated_response(
+        book_store.livros(page), len(filtered_by_category), page[-1] if has_next else None
+    )
 
 @app.route('/api/v1/books/search', methods=['GET'])
 @monitor_api_call
+@RESPONSE_CACHE.cached
 def search_books():
     """
-    Retorna livros que correspondem parcial ou totalmente ao título e/ou à categoria informada
+    Retorna livros que correspondem ao texto, ao título e/ou à categoria informada
     ---
-    summary: Busca livros por título e/ou categoria
-    description: Retorna livros que correspondem parcial ou totalmente ao título e/ou à categoria informada.
+    summary: Busca livros por texto (título e descrição), título e/ou categoria
+    description: >
+      Busca pelo índice textual: todos os termos precisam aparecer (o último também casa por prefixo),
+      sem diferenciar maiúsculas/minúsculas e acentos; palavras muito comuns (the, of, and...) são ignoradas
+      (uma busca só com essas palavras procura o texto dentro dos títulos).
+      Com q ou title os resultados vêm ordenados por relevância (BM25, título com peso maior que a descrição).
     parameters:
+      - name: q
+        in: query
+        type: string
+        required: false
+        description: Termos buscados no título e na descrição do livro.
       - name: title
         in: query
         type: string
         required: false
-        description: Parte do título do livro (busca case-insensitive).
+        description: Termos buscados apenas no título do livro.
+      - name: fuzzy
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Aceita termos com um erro de digitação (uma edição de distância).
       - name: category
         in: query
         type: string
@@ -184,52 +360,92 @@ def search_books():
         type: integer
         required: false
         default: 10
-        description: Número máximo de livros retornados.
+        description: Número máximo de livros retornados (até 100).
       - name: offset
         in: query
         type: integer
         required: false
         default: 0
         description: Quantidade de livros a serem pulados (paginação).
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Token do cabeçalho X-Next-Cursor da página anterior (substitui o offset).
     responses:
       200:
         description: Lista de livros que atendem aos critérios de busca.
+        headers:
+          X-Total-Count:
+            type: integer
+            description: Total de livros encontrados.
+          X-Next-Cursor:
+            type: string
+            description: Cursor da próxima página (ausente na última página).
       400:
-        description: Nenhum parâmetro de busca ('title' ou 'category') foi fornecido.
+        description: Nenhum parâmetro de busca ('q', 'title' ou 'category') foi fornecido, ou cursor inválido.
+      410:
+        description: O livro apontado pelo cursor não existe mais nos dados recarregados.
       404:
         description: Nenhum livro encontrado com os critérios informados.
       500:
         description: Erro interno - os dados dos livros não foram carregados corretamente.
     """
-    if ALL_BOOKS_DATA is None:
+    book_store = current_store()
+    if book_store is None:
         return jsonify({"error": "Book data not loaded. Check server logs."}), 500
 
+    text_query = request.args.get('q')
     title_filter = request.args.get('title')
     category_filter = request.args.get('category')
+    fuzzy = request.args.get('fuzzy', '').lower() in ('1', 'true', 'yes')
+
+    if not text_query and not title_filter and not category_filter:
+        return jsonify({"error": "At least 'q', 'title' or 'category' query parameter is required for search."}), 400
 
-    if not title_filter and not category_filter:
-        return jsonify({"error": "At least 'title' or 'category' query parameter is required for search."}), 400
+    # Filtra ids de linhas (com a pontuação de relevância quando há busca textual)
+    search_ids, scores = None, None
 
-    filtered_books = []
-    # Usando uma cópia para não modificar a lista original
-    search_list = list(ALL_BOOKS_DATA)
+    if text_query:
+        search_ids, scores = book_store.buscar_texto(text_query, fuzzy=fuzzy)
 
     if title_filter:
-        search_list = [book for book in search_list if title_filter.lower() in book.get('title', '').lower()]
-    
+        title_ids, title_scores = book_store.buscar_texto(title_filter, so_titulo=True, fuzzy=fuzzy)
+        if search_ids is None:
+            search_ids, scores = title_ids, title_scores
+        else:
+            search_ids, a, b = np.intersect1d(search_ids, title_ids, assume_unique=True, return_indices=True)
+            scores = scores[a] + title_scores[b]
+
     if category_filter:
-        search_list = [book for book in search_list if book.get('category', '').lower() == category_filter.lower()]
-    
-    filtered_books = search_list
+        category_ids = book_store.ids_categoria(category_filter)
+        if search_ids is None:
+            search_ids = category_ids
+        else:
+            in_category = np.isin(search_ids, category_ids, assume_unique=True)
+            search_ids, scores = search_ids[in_category], scores[in_category]
 
-    if not filtered_books:
+    if len(search_ids) == 0:
         return jsonify({"message": "No books found matching the specified criteria."}), 404
-    
-    paginated_books = apply_pagination(filtered_books)
-    return jsonify(paginated_books)
+
+    limit, offset = pagination_args()
+    cursor, error = cursor_arg(requer_chave=scores is not None)
+    if error:
+        return error
+
+    total = len(search_ids)
+    if scores is None:
+        page, has_next = page_after(search_ids, limit, offset, cursor)
+        return paginated_response(book_store.livros(page), total, page[-1] if has_next else None)
+
+    page, last_score = ranked_page(search_ids, scores, limit, offset, cursor)
+    if last_score is None:
+        return paginated_response(book_store.livros(page), total)
+    return paginated_response(book_store.livros(page), total, page[-1], last_score)
 
 @app.route('/api/v1/books/<string:universal_product_code>', methods=['GET'])
 @monitor_api_call
+@RESPONSE_CACHE.cached
 def get_book_by_id(universal_product_code):
     """
     Buscar livro por Universal Product Code (UPC)
@@ -275,20 +491,81 @@ def get_book_by_id(universal_product_code):
       500:
         description: Erro interno, dados dos livros não carregados.
     """
-    if ALL_BOOKS_DATA is None:
+    book_store = current_store()
+    if book_store is None:
         return jsonify({"error": "Book data not loaded. Check server logs."}), 500
 
-    for book in ALL_BOOKS_DATA:
-        if book.get('universal_product_code') == universal_product_code:
-            return jsonify(book), 200
+    book_id = book_store.buscar_upc(universal_product_code)
+    if book_id is not None:
+        return jsonify(book_store.livro(book_id)), 200
     
     return jsonify({"message": "Book not found with the provided Universal Product Code."}), 404
 
+# Número máximo de UPCs aceitos em uma busca em lote
+MAX_BATCH_UPCS = 500
+
+@app.route('/api/v1/books/batch', methods=['POST'])
+@monitor_api_call
+def get_books_batch():
+    """
+    Buscar vários livros por UPC em uma única requisição
+    ---
+    summary: Buscar livros em lote por Universal Product Code (UPC)
+    description: Retorna os livros dos UPCs informados, na mesma ordem, e a lista dos UPCs não encontrados.
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            upcs:
+              type: array
+              items:
+                type: string
+              example: ["a897fe39b1053632", "90fa61229261140a"]
+    responses:
+      200:
+        description: Livros encontrados e UPCs não encontrados.
+        schema:
+          type: object
+          properties:
+            books:
+              type: array
+              items:
+                type: object
+            not_found:
+              type: array
+              items:
+                type: string
+      400:
+        description: Corpo inválido ou mais UPCs que o limite permitido.
+      500:
+        description: Erro interno, dados dos livros não carregados.
+    """
+    book_store = current_store()
+    if book_store is None:
+        return jsonify({"error": "Book data not loaded. Check server logs."}), 500
+
+    data = request.get_json(silent=True)
+    upcs = data.get('upcs') if isinstance(data, dict) else None
+    if not isinstance(upcs, list) or not all(isinstance(upc, str) for upc in upcs):
+        return jsonify({"error": "Body must be a JSON object with an 'upcs' list of strings."}), 400
+    if len(upcs) > MAX_BATCH_UPCS:
+        return jsonify({"error": f"At most {MAX_BATCH_UPCS} UPCs per request."}), 400
+
+    book_ids = book_store.buscar_upcs(upcs)
+    books = [book_store.livro(i) for i in book_ids if i is not None]
+    not_found = [upc for upc, i in zip(upcs, book_ids) if i is None]
+    return jsonify({"books": books, "not_found": not_found})
+
 @app.route('/api/v1/categories', methods=['GET'])
 @monitor_api_call
 def get_categories():
     """
     Retorna uma lista de todas as categorias de livros disponíveis.
+    A lista é pré-calculada ao carregar os dados e acompanha um ETag;
+    com If-None-Match igual ao ETag atual a resposta é 304, sem corpo.
     ---
     responses:
       200:
@@ -297,15 +574,21 @@ def get_categories():
           type: array
           items:
             type: string
+      304:
+        description: A lista não mudou desde o ETag informado em If-None-Match.
       500:
         description: Erro interno, dados dos livros não carregados.
     """
-    if ALL_BOOKS_DATA is None:
+    book_store = current_store()
+    if book_store is None:
         return jsonify({"error": "Book data not loaded. Check server logs."}), 500
-    
-    categories = set(book.get('category') for book in ALL_BOOKS_DATA if book.get('category'))
-    
-    return jsonify(sorted(list(categories)))
+
+    if request.if_none_match.contains(book_store.categorias_etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(book_store.lista_categorias)
+    response.set_etag(book_store.categorias_etag)
+    return response
 
 @app.route('/api/v1/health', methods=['GET'])
 @monitor_api_call
@@ -320,41 +603,90 @@ def health_check():
       500:
         description: A API não está saudável, os dados não puderam ser carregados.
     """
-    if ALL_BOOKS_DATA is not None:
+    book_store = current_store()
+    if book_store is not None:
         return jsonify({
             "status": "healthy",
             "message": "API está saudável!",
-            "total_books_loaded": len(ALL_BOOKS_DATA)
+            "total_books_loaded": len(book_store),
+            "dataset_version": book_store.versao,
+            "reloads": BOOK_RELOADER.recargas,
+            "last_reload_error": BOOK_RELOADER.ultimo_erro,
+            "request_log": GRAVADOR_LOGS.estatisticas()
         }), 200
     else:
         return jsonify({
             "status": "unhealthy",
             "message": "API não está saudável! Falha ao carregar os dados."
         }), 500
+
+@app.route('/api/v1/metrics', methods=['GET'])
+@monitor_api_call
+def get_metrics():
+    """
+    Métricas das rotas, somadas entre todos os workers.
+    Por padrão no formato texto do Prometheus (contadores por rota/método/status, histograma de latência
+    e requisições em andamento); com format=json retorna um resumo por rota com p50/p95/p99 estimados.
+    ---
+    parameters:
+      - name: format
+        in: query
+        type: string
+        required: false
+        default: prometheus
+        enum: [prometheus, json]
+        description: Formato da resposta.
+    responses:
+      200:
+        description: Métricas no formato pedido.
+      400:
+        description: Formato inválido.
+    """
+    output_format = request.args.get('format', 'prometheus')
+    if output_format == 'json':
+        return jsonify(METRICAS.resumo())
+    if output_format != 'prometheus':
+        return jsonify({"error": "Invalid 'format', use prometheus or json."}), 400
+    return app.response_class(METRICAS.texto_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/v1/cache/stats', methods=['GET'])
+@monitor_api_call
+def get_cache_stats():
+    """
+    Estatísticas do cache de respostas.
+    Acertos, faltas, remoções por LRU, invalidações por troca de versão dos dados e ocupação atual.
+    ---
+    responses:
+      200:
+        description: Contadores e ocupação do cache.
+        schema:
+          type: object
+          properties:
+            hits:
+              type: integer
+            misses:
+              type: integer
+            hit_ratio:
+              type: number
+            evictions:
+              type: integer
+            invalidations:
+              type: integer
+            entries:
+              type: integer
+            bytes:
+              type: integer
+    """
+    return jsonify(RESPONSE_CACHE.estatisticas())
     
 
     
 # Criando as estatísticas de overview
-# Carregar os dados uma vez ao iniciar a aplicação (ou em um serviço de dados)
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-caminho_da_pasta_csv = os.path.join(BASE_DIR, 'exports', 'csv')
-nome_arquivo_csv = 'tabela_unificada.csv'
-caminho_completo_csv = os.path.join(caminho_da_pasta_csv, nome_arquivo_csv)
-
-df = pd.DataFrame() # Inicializa o DataFrame vazio
-
-try:
-    df = pd.read_csv(caminho_completo_csv)
-    # Garante que a coluna de preço seja numérica, tratando erros.
-    df['price_including_tax'] = pd.to_numeric(df['price_including_tax'], errors='coerce')
-    df.dropna(subset=['price_including_tax'], inplace=True)
-except FileNotFoundError:
-    print(f"Erro: O arquivo '{caminho_completo_csv}' não foi encontrado.")
-except Exception as e:
-    print(f"Erro ao carregar ou processar o CSV: {e}")
+# As rotas abaixo usam o mesmo store, considerando apenas os livros com preço válido
 
 @app.route('/api/v1/stats/overview', methods=['GET'])
 @monitor_api_call
+@RESPONSE_CACHE.cached
 def get_stats_overview():
     """
     Retorna estatísticas gerais dos livros.
@@ -386,37 +718,106 @@ def get_stats_overview():
       500:
         description: Dados não disponíveis.
     """
-    if df.empty:
+    book_store = current_store()
+    if book_store is None:
         return jsonify({"error": "Dados não disponíveis. Verifique o arquivo CSV e o caminho."}), 500
 
-    total_livros = len(df)
-    
-    # Preço médio geral
-    preco_medio_geral = df['price_including_tax'].mean()
-    if preco_medio_geral is not None:
-        preco_medio_geral = round(preco_medio_geral, 2)
-
-    distribuicao_ratings = df['review_rating'].value_counts().sort_index().to_dict()
-
-    # Calcular o preço médio por categoria
-    # Agrupa por 'category', seleciona 'price_including_tax' e calcula a média
-    preco_medio_por_categoria = df.groupby('category')['price_including_tax'].mean().round(2).to_dict()
-
-    stats = {
-        "total_livros": total_livros,
-        "preco_medio_geral": preco_medio_geral,
-        "distribuicao_ratings": distribuicao_ratings,
-        "preco_medio_por_categoria": preco_medio_por_categoria
-    }
+    # Estatísticas materializadas uma vez por versão dos dados (ver book_stats.py)
+    stats = book_store.estatisticas.resumo
     return jsonify(stats)
 
 
+@app.route('/api/v1/stats/category/<string:category_name>', methods=['GET'])
+@monitor_api_call
+@RESPONSE_CACHE.cached
+def get_category_stats(category_name):
+    """
+    Retorna estatísticas de uma categoria.
+    ---
+    parameters:
+      - name: category_name
+        in: path
+        type: string
+        required: true
+        description: Nome da categoria (case-insensitive).
+    responses:
+      200:
+        description: Estatísticas dos livros com preço válido da categoria.
+        schema:
+          type: object
+          properties:
+            categoria:
+              type: string
+            total_livros:
+              type: integer
+            preco_medio:
+              type: number
+              format: float
+            preco_minimo:
+              type: number
+              format: float
+            preco_maximo:
+              type: number
+              format: float
+            preco_mediana:
+              type: number
+              format: float
+            percentis_preco:
+              type: object
+              description: Percentis 10, 25, 50, 75 e 90 do preço (p10, p25...).
+              additionalProperties:
+                type: number
+                format: float
+            rating_medio:
+              type: number
+              format: float
+            distribuicao_ratings:
+              type: object
+              additionalProperties:
+                type: integer
+            total_disponivel:
+              type: integer
+              description: Soma do estoque dos livros da categoria.
+      404:
+        description: Categoria não encontrada.
+      500:
+        description: Dados não disponíveis.
+    """
+    book_store = current_store()
+    if book_store is None:
+        return jsonify({"error": "Dados não disponíveis. Verifique o arquivo CSV e o caminho."}), 500
+
+    stats = book_store.estatisticas.da_categoria(category_name)
+    if stats is None:
+        return jsonify({"message": f"No books found for category: {category_name}"}), 404
+    return jsonify(stats)
+
 @app.route('/api/v1/books/top-rated', methods=['GET'])
 @monitor_api_call
+@RESPONSE_CACHE.cached
 def get_top_rated_books():
     """
-    Retorna os 20 livros com melhor avaliação.
+    Retorna os livros com melhor avaliação (20 por padrão).
     ---
+    parameters:
+      - name: k
+        in: query
+        type: integer
+        required: false
+        default: 20
+        description: Quantidade de livros retornados (máximo 100).
+      - name: category
+        in: query
+        type: string
+        required: false
+        description: Considera apenas os livros desta categoria (case-insensitive).
+      - name: tie_break
+        in: query
+        type: string
+        required: false
+        default: default
+        enum: [default, price, availability]
+        description: Desempate entre livros com a mesma avaliação (ordem da tabela, mais barato ou mais disponível).
     responses:
       200:
         description: Lista dos livros com as maiores avaliações.
@@ -435,28 +836,40 @@ def get_top_rated_books():
                 format: float
               product_page_url:
                 type: string
+      400:
+        description: Valor inválido para k ou tie_break.
+      404:
+        description: Categoria não encontrada.
       500:
         description: Dados não disponíveis.
     """
-    if df.empty:
+    book_store = current_store()
+    if book_store is None:
         return jsonify({"error": "Dados não disponíveis. Verifique o arquivo CSV e o caminho."}), 500
 
-    # Ordena os livros por review_rating em ordem decrescente
-    # Se houver empate no rating, a ordem original ou por índice será mantida
-    top_books_df = df.sort_values(by='review_rating', ascending=False).head(20)
+    k, tie_break, error = top_k_args(request.args, 20)
+    if error:
+        return error
+
+    # Início do índice por rating decrescente (empates pelo desempate e pela ordem da tabela)
+    category = request.args.get('category')
+    top_ids = book_store.top_rating(k, categoria=category, desempate=tie_break)
+    if category is not None and len(top_ids) == 0:
+        return jsonify({"message": f"No books found for category: {category}"}), 404
 
     # Seleciona as colunas desejadas e converte para uma lista de dicionários
-    top_books_list = top_books_df[[
+    top_books_list = book_store.registros(top_ids, [
         'title', 
         'review_rating', 
         'price_including_tax', 
         'product_page_url'
-    ]].to_dict(orient='records')
+    ])
 
     return jsonify(top_books_list)
 
 @app.route('/api/v1/books/price-range', methods=['GET'])
 @monitor_api_call
+@RESPONSE_CACHE.cached
 def get_books_by_price_range():
     """
     Filtrar livros por faixa de preço
@@ -476,9 +889,40 @@ def get_books_by_price_range():
         format: float
         required: false
         description: Preço máximo (inclusivo) para filtrar os livros.
+      - name: sort
+        in: query
+        type: string
+        required: false
+        default: price_asc
+        enum: [price_asc, price_desc, default]
+        description: Ordem dos livros (preço crescente, decrescente ou a ordem da tabela).
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 10
+        description: O número de livros a serem retornados por página (máximo 100).
+      - name: offset
+        in: query
+        type: integer
+        required: false
+        default: 0
+        description: O ponto de partida para a paginação.
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Token do cabeçalho X-Next-Cursor da página anterior (substitui o offset).
     responses:
       200:
-        description: Lista de livros dentro da faixa de preço especificada.
+        description: Página de livros dentro da faixa de preço especificada (total no header X-Total-Count).
+        headers:
+          X-Total-Count:
+            type: integer
+            description: Total de livros encontrados.
+          X-Next-Cursor:
+            type: string
+            description: Cursor da próxima página (ausente na última página).
         schema:
           type: array
           items:
@@ -496,34 +940,208 @@ def get_books_by_price_range():
                 format: float
               product_page_url:
                 type: string
+      400:
+        description: Valor inválido para sort ou cursor inválido.
+      410:
+        description: O livro apontado pelo cursor não existe mais nos dados recarregados.
       500:
         description: Erro interno, dados dos livros não carregados.
     """
-    if df.empty:
+    book_store = current_store()
+    if book_store is None:
         return jsonify({"error": "Dados não disponíveis. Verifique o arquivo CSV e o caminho."}), 500
 
     min_price = request.args.get('min', type=float)
     max_price = request.args.get('max', type=float)
+    sort = request.args.get('sort', 'price_asc')
+    if sort not in ('price_asc', 'price_desc', 'default'):
+        return jsonify({"error": "Invalid 'sort', use price_asc, price_desc or default."}), 400
+
+    limit, offset = pagination_args()
+    cursor, error = cursor_arg(requer_chave=sort != 'default')
+    if error:
+        return error
+
+    # Faixa de preço pelo índice ordenado (preços e ids em ordem crescente de preço, empate pelo id)
+    start, end = book_store.faixa_preco(min_price, max_price)
+    prices = book_store.indices['preco_ordenado'][start:end]
+    ids = book_store.indices['preco_ordem'][start:end]
+
+    if sort == 'default':
+        page, has_next = page_after(np.sort(ids), limit, offset, cursor)
+    elif sort == 'price_asc':
+        first = offset if cursor is None else posicao_keyset(prices, ids, cursor[1], cursor[0], side='right')
+        page, has_next = ids[first:first + limit], first + limit < len(ids)
+    else:
+        # price_desc percorre o mesmo índice de trás para frente
+        last = len(ids) - offset if cursor is None else posicao_keyset(prices, ids, cursor[1], cursor[0], side='left')
+        page, has_next = ids[max(0, last - limit):max(0, last)][::-1], last - limit > 0
 
-    filtered_df = df.copy() # Cria uma cópia para evitar modificar o DataFrame global
-
-    # Aplica os filtros
-    if min_price is not None:
-        filtered_df = filtered_df[filtered_df['price_including_tax'] >= min_price]
-    
-    if max_price is not None:
-        filtered_df = filtered_df[filtered_df['price_including_tax'] <= max_price]
-
-    # Formata a saída
-    books_in_range = filtered_df[[
+    # Formata a saída (apenas a página pedida)
+    books_in_range = book_store.registros(page, [
         'title', 
         'price_including_tax', 
         'category',
         'review_rating', 
         'product_page_url'
-    ]].to_dict(orient='records')
+    ])
+
+    if not has_next:
+        return paginated_response(books_in_range, len(ids))
+    return paginated_response(books_in_range, len(ids), page[-1], book_store.preco[page[-1]])
+
+# Ordenações da consulta combinada: cada uma vira uma pontuação (maior primeiro, empate pelo id)
+QUERY_SORTS = {
+    'price_asc': lambda store, ids: -store.preco[ids],
+    'price_desc': lambda store, ids: store.preco[ids],
+    'rating_desc': lambda store, ids: store.rating_num[ids].astype('float64'),
+    'availability_desc': lambda store, ids: store.disponivel[ids].astype('float64'),
+}
+QUERY_FIELDS = CAMPOS_LIVRO + ['review_rating_num']
+
+@app.route('/api/v1/books/query', methods=['GET'])
+@monitor_api_call
+@RESPONSE_CACHE.cached
+def query_books():
+    """
+    Consulta combinando filtros, ordenação e campos retornados
+    ---
+    summary: Consulta de livros com filtros combinados
+    description: >
+      Todos os filtros informados precisam ser atendidos (ex. category=Fantasy&max_price=20&min_rating=4&sort=price_asc).
+      Os filtros usam os índices do store (título, categoria e preço) e máscaras vetorizadas, sem percorrer livro a livro.
+    parameters:
+      - name: category
+        in: query
+        type: string
+        required: false
+        description: Nome da categoria (case-insensitive).
+      - name: min_price
+        in: query
+        type: number
+        format: float
+        required: false
+        description: Preço mínimo (inclusivo).
+      - name: max_price
+        in: query
+        type: number
+        format: float
+        required: false
+        description: Preço máximo (inclusivo).
+      - name: min_rating
+        in: query
+        type: integer
+        required: false
+        description: Avaliação mínima (1 a 5).
+      - name: min_available
+        in: query
+        type: integer
+        required: false
+        description: Quantidade mínima em estoque.
+      - name: title
+        in: query
+        type: string
+        required: false
+        description: Termos buscados no título (mesma busca de /books/search).
+      - name: fuzzy
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Aceita termos do título com um erro de digitação.
+      - name: sort
+        in: query
+        type: string
+        required: false
+        enum: [default, relevance, price_asc, price_desc, rating_desc, availability_desc]
+        description: Ordenação (padrão relevance com title, senão default, a ordem da tabela). Empates pela ordem da tabela.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Campos retornados, separados por vírgula (padrão universal_product_code, title, price_including_tax, number_available, category, review_rating, review_rating_num, product_page_url).
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 10
+        description: O número de livros a serem retornados por página (máximo 100).
+      - name: offset
+        in: query
+        type: integer
+        required: false
+        default: 0
+        description: O ponto de partida para a paginação.
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Token do cabeçalho X-Next-Cursor da página anterior (substitui o offset).
+    responses:
+      200:
+        description: Página de livros que atendem a todos os filtros, apenas com os campos pedidos.
+        headers:
+          X-Total-Count:
+            type: integer
+            description: Total de livros encontrados.
+          X-Next-Cursor:
+            type: string
+            description: Cursor da próxima página (ausente na última página).
+      400:
+        description: Valor inválido para sort ou fields, ou cursor inválido.
+      410:
+        description: O livro apontado pelo cursor não existe mais nos dados recarregados.
+      500:
+        description: Erro interno, dados dos livros não carregados.
+    """
+    book_store = current_store()
+    if book_store is None:
+        return jsonify({"error": "Book data not loaded. Check server logs."}), 500
+
+    title = request.args.get('title')
+    sort = request.args.get('sort', 'relevance' if title else 'default')
+    if (sort not in QUERY_SORTS and sort not in ('default', 'relevance')) or (sort == 'relevance' and not title):
+        return jsonify({"error": f"Invalid 'sort', use default, {', '.join(QUERY_SORTS)} or relevance (with 'title')."}), 400
+
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else COLUNAS_RESUMO
+    invalid = [f for f in fields if f not in QUERY_FIELDS]
+    if invalid:
+        return jsonify({"error": f"Invalid fields: {', '.join(invalid)}. Available: {', '.join(QUERY_FIELDS)}."}), 400
+
+    limit, offset = pagination_args()
+    cursor, error = cursor_arg(requer_chave=sort != 'default')
+    if error:
+        return error
+
+    with etapa('consultar'):
+        ids, scores = book_store.consultar(
+            categoria=request.args.get('category'),
+            preco_min=request.args.get('min_price', type=float),
+            preco_max=request.args.get('max_price', type=float),
+            rating_min=request.args.get('min_rating', type=int),
+            disponivel_min=request.args.get('min_available', type=int),
+            titulo=title,
+            fuzzy=request.args.get('fuzzy', '').lower() in ('1', 'true', 'yes')
+        )
+
+    with etapa('ordenar'):
+        if sort == 'default':
+            page, has_next = page_after(ids, limit, offset, cursor)
+            last_key = None
+        else:
+            if sort != 'relevance':
+                # Livros sem preço ficam por último nas ordenações por preço
+                scores = QUERY_SORTS[sort](book_store, ids)
+                scores = np.where(np.isnan(scores), -np.inf, scores)
+            page, last_key = ranked_page(ids, scores, limit, offset, cursor)
+            has_next = last_key is not None
 
-    return jsonify(books_in_range)
+    with etapa('registros'):
+        books = book_store.registros(page, fields)
+    if not has_next:
+        return paginated_response(books, len(ids))
+    return paginated_response(books, len(ids), page[-1], last_key)
 
 
 
@@ -697,10 +1315,48 @@ def trigger_scraping():
         status="triggered"
     )
 
+@app.route("/api/v1/admin/reload", methods=["POST"])
+@monitor_api_call
+@jwt_required()
+def reload_books_data():
+    """
+    Recarrega a tabela unificada sem reiniciar a API.
+    O novo store e seus índices são montados em segundo plano; as requisições continuam usando
+    a versão atual até a troca. Requer autenticação JWT válida e role de admin.
+    ---
+    security:
+      - Bearer: []
+    parameters:
+      - name: force
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Recarrega mesmo que a tabela não tenha mudado.
+    responses:
+      202:
+        description: Reload iniciado (acompanhe em /api/v1/health).
+      409:
+        description: Já existe um reload em andamento.
+      403:
+        description: Acesso não autorizado. Requer privilégios de administrador.
+      401:
+        description: Token de acesso inválido ou expirado.
+    """
+    claims = get_jwt()
+    if "admin" not in claims.get("roles", []):
+        return jsonify({"msg": "Acesso não autorizado. Requer privilégios de administrador."}), 403
+
+    force = request.args.get('force', '').lower() in ('1', 'true', 'yes')
+    if not BOOK_RELOADER.recarregar_em_segundo_plano(forcar=force):
+        return jsonify({"status": "already_running"}), 409
+    return jsonify({"status": "reloading", "current_version": BOOK_RELOADER.versao_fontes()}), 202
+
 #inicio das rotas de ML 
 
 @app.route('/api/v1/ml/features', methods=['GET'])
 @monitor_api_call
+@RESPONSE_CACHE.cached
 def get_ml_features():
     """
     Retorna os dados dos livros formatados como features para um modelo de Machine Learning.
@@ -727,18 +1383,25 @@ def get_ml_features():
       500:
         description: Dados não disponíveis. Problema ao carregar o arquivo CSV.
     """
-    if df.empty:
+    book_store = current_store()
+    if book_store is None:
         return jsonify({"error": "Dados não disponíveis. Verifique o arquivo CSV e o caminho."}), 500
 
-    features_df = df[['price_including_tax', 'number_available', 'category']].copy()
-    features_df = pd.get_dummies(features_df, columns=['category'], drop_first=True)
-    return jsonify(features_df.to_dict(orient='records'))
+    with etapa('frame'):
+        features_df = book_store.frame(['price_including_tax', 'number_available', 'category'], book_store.com_preco)
+    with etapa('get_dummies'):
+        features_df = pd.get_dummies(features_df, columns=['category'], drop_first=True)
+    with etapa('to_dict'):
+        records = features_df.to_dict(orient='records')
+    with etapa('jsonify'):
+        return jsonify(records)
 
 
 
 
 @app.route('/api/v1/ml/training-data', methods=['GET'])
 @monitor_api_call
+@RESPONSE_CACHE.cached
 def get_ml_training_data():
     """
     Retorna o dataset completo para treinamento de um modelo de Machine Learning, incluindo features e variável alvo.
@@ -769,35 +1432,29 @@ def get_ml_training_data():
       500:
         description: Dados não disponíveis. Problema ao carregar o arquivo CSV.
     """
-    if df.empty:
+    book_store = current_store()
+    if book_store is None:
         return jsonify({"error": "Dados não disponíveis. Verifique o arquivo CSV e o caminho."}), 500
 
-    features_and_target_df = df[['price_including_tax', 'number_available', 'category', 'review_rating']].copy()
-    features_and_target_df = pd.get_dummies(features_and_target_df, columns=['category'], drop_first=True)
-    return jsonify(features_and_target_df.to_dict(orient='records'))
-
-
+    with etapa('frame'):
+        features_and_target_df = book_store.frame(
+            ['price_including_tax', 'number_available', 'category', 'review_rating'], book_store.com_preco
+        )
+    with etapa('get_dummies'):
+        features_and_target_df = pd.get_dummies(features_and_target_df, columns=['category'], drop_first=True)
+    with etapa('to_dict'):
+        records = features_and_target_df.to_dict(orient='records')
+    with etapa('jsonify'):
+        return jsonify(records)
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-csv_path = os.path.join(BASE_DIR, 'exports', 'csv', 'tabela_unificada.csv')
-
-# Carrega dataset
-df_books = pd.read_csv(csv_path)
 
-# Converte review_rating para numérico
-def convert_rating(r):
-    try:
-        return int(r.split()[0])
-    except:
-        return 0
-
-df_books['review_rating_num'] = df_books['review_rating'].apply(convert_rating)
 
 @app.route('/api/v1/ml/predictions', methods=['POST'])
 @monitor_api_call
 def ml_predictions():
     """
     Recebe um preço e retorna os 3 livros recomendados com preço menor ou igual, ordenados por avaliação.
+    Opcionalmente: k (quantidade, até 100), category e tie_break (default, price ou availability).
     ---
     parameters: # Definição dos parâmetros da requisição
       - name: price_including_tax
@@ -812,6 +1469,14 @@ def ml_predictions():
             price_including_tax:
               type: number
               format: float
+            k:
+              type: integer
+              default: 3
+            category:
+              type: string
+            tie_break:
+              type: string
+              enum: [default, price, availability]
     responses:
       200:
         description: Top 3 livros recomendados
@@ -842,12 +1507,30 @@ def ml_predictions():
         return jsonify({'error': 'Campo price_including_tax é obrigatório'}), 400
 
     price_limit = data['price_including_tax']
+    if isinstance(price_limit, bool) or not isinstance(price_limit, (int, float)):
+        return jsonify({'error': 'Campo price_including_tax deve ser numérico'}), 400
+
+    k, tie_break, error = top_k_args(data, 3)
+    if error:
+        return error
+    category = data.get('category')
+    if category is not None and not isinstance(category, str):
+        return jsonify({'error': 'Campo category deve ser texto'}), 400
+
+    book_store = current_store()
+    if book_store is None:
+        return jsonify({"error": "Dados não disponíveis. Verifique o arquivo CSV e o caminho."}), 500
 
-    filtered_books = df_books[df_books['price_including_tax'] <= price_limit]
-    top_books = filtered_books.sort_values(by='review_rating_num', ascending=False).head(3)
+    # Percorre o índice por rating decrescente só até achar k livros dentro do preço
+    with etapa('top_rating'):
+        top_ids = book_store.top_rating(
+            k, categoria=category, desempate=tie_break,
+            filtro=lambda ids: book_store.preco[ids] <= price_limit
+        )
 
     columns_to_return = ['title', 'price_including_tax', 'review_rating', 'category', 'number_available']
-    recommendations = top_books[columns_to_return].to_dict(orient='records')
+    with etapa('registros'):
+        recommendations = book_store.registros(top_ids, columns_to_return)
 
     return jsonify({'recommendations': recommendations})
 
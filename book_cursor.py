@@ -0,0 +1,87 @@
+import base64
+import binascii
+import hashlib
+import json
+
+import numpy as np
+
+# Parâmetros que não mudam o conjunto de resultados (não entram no escopo do cursor)
+PARAMETROS_PAGINACAO = ('cursor', 'limit', 'offset')
+
+
+class CursorInvalido(ValueError):
+    """Cursor malformado ou gerado para outra consulta."""
+
+
+class CursorExpirado(ValueError):
+    """O livro referenciado pelo cursor não existe mais na versão atual dos dados."""
+
+
+def escopo_consulta(caminho, argumentos):
+    """
+    Identifica a consulta (rota + filtros + ordenação) a que um cursor pertence,
+    para que um cursor não seja reaproveitado com outros filtros.
+    """
+    filtros = sorted(
+        (nome, valor) for nome in argumentos if nome not in PARAMETROS_PAGINACAO
+        for valor in argumentos.getlist(nome)
+    )
+    texto = json.dumps([caminho, filtros], ensure_ascii=False)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:12]
+
+
+def codificar_cursor(escopo, versao, livro_id, upc, chave=None):
+    """
+    Gera o token opaco (base64 url-safe) que aponta para o último livro de uma página:
+    seu id na versão atual dos dados, seu UPC (para reencontrá-lo após um reload)
+    e o valor da chave de ordenação (preço, pontuação...).
+    """
+    dados = {'e': escopo, 'v': versao, 'i': int(livro_id), 'u': upc}
+    if chave is not None:
+        dados['k'] = float(chave)
+    texto = json.dumps(dados, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).rstrip(b'=').decode('ascii')
+
+
+def decodificar_cursor(token, escopo):
+    """
+    Lê um cursor gerado por codificar_cursor.
+    Lança CursorInvalido se o token estiver malformado ou for de outra consulta.
+    """
+    try:
+        texto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        dados = json.loads(texto)
+    except (binascii.Error, ValueError) as e:
+        raise CursorInvalido("cursor malformado") from e
+    if not isinstance(dados, dict) or not isinstance(dados.get('i'), int) or dados['i'] < 0:
+        raise CursorInvalido("cursor malformado")
+    if dados.get('e') != escopo:
+        raise CursorInvalido("cursor gerado para outra consulta")
+    if 'k' in dados and not isinstance(dados['k'], (int, float)):
+        raise CursorInvalido("cursor malformado")
+    return dados
+
+
+def livro_do_cursor(dados, book_store):
+    """
+    Id, na versão atual dos dados, do livro apontado por um cursor decodificado.
+    Se os dados foram recarregados (ids de linha mudaram), o livro é reencontrado pelo UPC.
+    Lança CursorExpirado se ele não existe mais.
+    """
+    livro_id = dados['i']
+    if dados.get('v') != book_store.versao or livro_id >= len(book_store):
+        livro_id = book_store.buscar_upc(str(dados.get('u')))
+        if livro_id is None:
+            raise CursorExpirado("o livro do cursor não existe mais")
+    return livro_id
+
+
+def posicao_keyset(chaves, ids, chave, livro_id, side='right'):
+    """
+    Posição de (chave, livro_id) numa lista ordenada por chave e, nos empates, por id
+    (ambos crescentes): com side='right' é onde começa a página seguinte ao livro,
+    com side='left' onde o livro está ou estaria. Duas buscas binárias, O(log n).
+    """
+    inicio = np.searchsorted(chaves, chave, side='left')
+    fim = np.searchsorted(chaves, chave, side='right')
+    return int(inicio + np.searchsorted(ids[inicio:fim], livro_id, side=side))
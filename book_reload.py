@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+
+from book_store import STORE_DIR, BookStore
+from book_table import CSV_PATH, PARQUET_PATH
+
+# Intervalo (segundos) entre verificações da tabela unificada; 0 desativa o observador
+INTERVALO_PADRAO = 30
+
+
+class BookStoreReloader:
+    """
+    Guarda o BookStore em uso (`atual`) e o troca por uma nova versão sem reiniciar a API.
+    O novo store, com todos os índices, é montado fora do caminho das requisições e só então
+    a referência é trocada (uma atribuição, atômica): uma requisição nunca vê um store pela metade.
+    Requisições em andamento continuam com a referência que pegaram no início; a versão antiga
+    é liberada (e seus mmaps fechados) quando a última delas termina.
+    """
+
+    def __init__(self, caminho_csv=CSV_PATH, caminho_parquet=PARQUET_PATH, diretorio=STORE_DIR, ao_trocar=None):
+        self.caminho_csv = caminho_csv
+        self.caminho_parquet = caminho_parquet
+        self.diretorio = diretorio
+        self.ao_trocar = ao_trocar
+        self.atual = None
+        self.recargas = 0
+        self.ultima_recarga = None
+        self.ultimo_erro = None
+        self.lock = threading.Lock()
+        self.pid_observador = None
+
+    def versao_fontes(self):
+        """Versão da tabela no disco (maior mtime entre CSV e Parquet), None se nenhum existir."""
+        mtimes = [os.path.getmtime(p) for p in (self.caminho_csv, self.caminho_parquet) if os.path.exists(p)]
+        return max(mtimes) if mtimes else None
+
+    def desatualizado(self):
+        versao = self.versao_fontes()
+        return versao is not None and (self.atual is None or versao != self.atual.versao)
+
+    def carregar(self):
+        """Monta (ou abre do snapshot) o store da versão atual da tabela, sem trocar o que está em uso."""
+        return BookStore.carregar(self.caminho_csv, self.caminho_parquet, self.diretorio)
+
+    def recarregar(self, forcar=False):
+        """
+        Monta o store da tabela atual e troca a referência. Sem forcar, só recarrega se a tabela mudou.
+        Retorna True se o store foi trocado; False se não havia mudança, se outro reload
+        já está em andamento ou se a carga falhou (o store anterior continua em uso).
+        """
+        if not self.lock.acquire(blocking=False):
+            return False
+        try:
+            if not forcar and not self.desatualizado():
+                return False
+            inicio = time.perf_counter()
+            try:
+                novo = self.carregar()
+            except Exception as e:
+                self.ultimo_erro = str(e)
+                print(f"ERROR: Failed to reload books data, keeping the current version: {e}")
+                return False
+
+            self.atual = novo
+            self.recargas += 1
+            self.ultima_recarga = time.time()
+            self.ultimo_erro = None
+            if self.ao_trocar is not None:
+                self.ao_trocar(novo)
+            print(f"Books data reloaded: {len(novo)} books in {time.perf_counter() - inicio:.2f} s")
+            return True
+        finally:
+            self.lock.release()
+
+    def recarregar_em_segundo_plano(self, forcar=False):
+        """Dispara recarregar() numa thread; retorna False se já há um reload em andamento."""
+        if self.lock.locked():
+            return False
+        threading.Thread(target=self.recarregar, kwargs={'forcar': forcar}, daemon=True).start()
+        return True
+
+    def observar(self, intervalo=INTERVALO_PADRAO):
+        """
+        Inicia (uma vez por processo) a thread que verifica a tabela a cada `intervalo` segundos.
+        O reload só acontece quando a versão no disco ficou igual em duas verificações seguidas,
+        para não montar o store enquanto o scraping ainda está gravando o arquivo.
+        Chamado pelo próprio processo que atende as requisições: threads não sobrevivem ao fork
+        dos workers (gunicorn --preload).
+        """
+        if intervalo <= 0 or self.pid_observador == os.getpid():
+            return
+        self.pid_observador = os.getpid()
+
+        def loop():
+            vista = self.versao_fontes()
+            while True:
+                time.sleep(intervalo)
+                versao = self.versao_fontes()
+                if versao == vista and self.desatualizado():
+                    self.recarregar()
+                vista = versao
+
+        threading.Thread(target=loop, name='book-store-reloader', daemon=True).start()
@@ -0,0 +1,304 @@
+import re
+import sys
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+# Termos são gravados como bytes UTF-8 de tamanho fixo (array 'S'); termos maiores são truncados
+TAMANHO_TERMO = 32
+# Pesos dos campos no BM25 (título vale mais que a descrição)
+PESO_TITULO = 2.0
+PESO_DESCRICAO = 1.0
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Limite de termos do vocabulário usados na expansão por prefixo (os mais frequentes)
+MAX_EXPANSAO_PREFIXO = 16
+# Peso dos termos encontrados por aproximação (fuzzy) em relação ao termo exato
+PESO_FUZZY = 0.5
+ALFABETO_FUZZY = 'abcdefghijklmnopqrstuvwxyz0123456789'
+
+PADRAO_TOKEN = re.compile(r'\w+')
+
+# Palavras muito comuns (inglês, idioma do catálogo) ficam fora do índice e das consultas
+STOPWORDS = frozenset('''
+a about after all also an and any are as at be because been but by can could did do does for from had has
+have he her his how i if in into is it its just me more my no not of on one or our out she so some than that
+the their them then there these they this those to too up us was we were what when which who will with would
+you your
+'''.split())
+
+
+@lru_cache(maxsize=65536)
+def sem_acentos(palavra):
+    return ''.join(c for c in unicodedata.normalize('NFKD', palavra) if not unicodedata.combining(c))
+
+
+def palavras(texto):
+    """Palavras de um texto: minúsculas, sem acentos, sem stopwords (como str)."""
+    if not texto:
+        return []
+    encontradas = PADRAO_TOKEN.findall(texto.casefold())
+    if not texto.isascii():
+        encontradas = [p if p.isascii() else sem_acentos(p) for p in encontradas]
+    return [palavra for palavra in encontradas if palavra not in STOPWORDS]
+
+
+def tokenizar(texto):
+    """Termos de um texto como bytes UTF-8 truncados em TAMANHO_TERMO (formato do vocabulário)."""
+    return [palavra.encode('utf-8')[:TAMANHO_TERMO] for palavra in palavras(texto)]
+
+
+def variacoes(termo):
+    """Termos a distância de edição 1 (remoção, troca de vizinhos, substituição e inserção)."""
+    texto = termo.decode('utf-8', errors='ignore')
+    divisoes = [(texto[:i], texto[i:]) for i in range(len(texto) + 1)]
+    remocoes = [a + b[1:] for a, b in divisoes if b]
+    trocas = [a + b[1] + b[0] + b[2:] for a, b in divisoes if len(b) > 1]
+    substituicoes = [a + c + b[1:] for a, b in divisoes if b for c in ALFABETO_FUZZY]
+    insercoes = [a + c + b for a, b in divisoes for c in ALFABETO_FUZZY]
+    candidatos = set(remocoes + trocas + substituicoes + insercoes)
+    candidatos.discard(texto)
+    return [c.encode('utf-8')[:TAMANHO_TERMO] for c in candidatos if c]
+
+
+def construir_indice_texto(titulos, descricoes):
+    """
+    Monta o índice invertido de título e descrição como arrays NumPy:
+    texto_termos (vocabulário ordenado, bytes de tamanho fixo), texto_inicio (CSR: as postings do termo t
+    ficam em [inicio[t], inicio[t + 1])), texto_docs (id do livro, crescente dentro de cada termo)
+    e texto_pontos (pontuação BM25 já calculada de cada posting: coluna 0 só título, coluna 1 título + descrição).
+    Como a pontuação depende apenas do par termo/livro, a consulta só soma valores prontos.
+    """
+    total_docs = len(titulos)
+    vocabulario = {}
+    # Uma entrada por (palavra, livro, campo), na ordem dos livros
+    termos_ids, docs_ids, campos_ids, contagens = array('l'), array('l'), array('b'), array('l')
+    tamanhos = np.zeros((total_docs, 2), dtype='float64')
+    for doc, textos in enumerate(zip(titulos, descricoes)):
+        for campo, texto in enumerate(textos):
+            contagem = Counter(palavras(texto))
+            tamanhos[doc, campo] = sum(contagem.values())
+            termos_ids.extend([vocabulario.setdefault(palavra, len(vocabulario)) for palavra in contagem])
+            contagens.extend(contagem.values())
+            docs_ids.extend([doc] * len(contagem))
+            campos_ids.extend([campo] * len(contagem))
+
+    # Vocabulário em ordem de bytes (permite busca binária e faixas de prefixo).
+    # Palavras diferentes que ficam iguais após truncar em TAMANHO_TERMO viram um único termo.
+    termos, posicao = np.unique(
+        np.array([palavra.encode('utf-8')[:TAMANHO_TERMO] for palavra in vocabulario], dtype=f'S{TAMANHO_TERMO}'),
+        return_inverse=True
+    )
+    termo_entrada = posicao.astype('int64')[np.frombuffer(termos_ids, dtype=termos_ids.typecode)] \
+        if len(termos_ids) else np.zeros(0, dtype='int64')
+
+    # Ordenação estável por termo: dentro de cada termo as entradas continuam em ordem de livro,
+    # então entradas consecutivas com o mesmo (termo, livro) formam uma posting
+    ordem = np.argsort(termo_entrada, kind='stable')
+    termo_entrada = termo_entrada[ordem]
+    doc_entrada = np.frombuffer(docs_ids, dtype=docs_ids.typecode)[ordem] if len(ordem) else termo_entrada
+    chave = termo_entrada * max(total_docs, 1) + doc_entrada
+    nova_posting = np.ones(len(chave), dtype=bool)
+    nova_posting[1:] = chave[1:] != chave[:-1]
+    posting = np.cumsum(nova_posting) - 1
+
+    total_postings = int(nova_posting.sum())
+    tf = np.zeros((total_postings, 2), dtype='float64')
+    if len(ordem):
+        campo_entrada = np.frombuffer(campos_ids, dtype='int8')[ordem]
+        contagem_entrada = np.frombuffer(contagens, dtype=contagens.typecode)[ordem]
+        tf = np.bincount(posting * 2 + campo_entrada, weights=contagem_entrada, minlength=2 * total_postings)
+        tf = tf.reshape(total_postings, 2)
+    docs = doc_entrada[nova_posting].astype('int32')
+    termo_posting = termo_entrada[nova_posting]
+    inicio = np.zeros(len(termos) + 1, dtype='int64')
+    np.cumsum(np.bincount(termo_posting, minlength=len(termos)), out=inicio[1:])
+
+    # BM25 por campo, ponderado por PESO_TITULO / PESO_DESCRICAO
+    frequencia_docs = np.diff(inicio)[termo_posting]
+    idf = np.log(1 + (total_docs - frequencia_docs + 0.5) / (frequencia_docs + 0.5))
+    media = np.maximum(tamanhos.mean(axis=0), 1.0) if total_docs else np.ones(2)
+    normalizacao = BM25_K1 * (1 - BM25_B + BM25_B * tamanhos[docs] / media)
+    bm25 = tf * (BM25_K1 + 1) / (tf + normalizacao) * idf[:, None]
+    pontos = np.empty((total_postings, 2), dtype='float32')
+    pontos[:, 0] = PESO_TITULO * bm25[:, 0]
+    pontos[:, 1] = pontos[:, 0] + PESO_DESCRICAO * bm25[:, 1]
+
+    return {
+        'texto_termos': termos,
+        'texto_inicio': inicio,
+        'texto_docs': docs,
+        'texto_pontos': pontos,
+        'texto_tamanhos': tamanhos.astype('float32')
+    }
+
+
+class IndiceTexto:
+    """
+    Busca textual com ranking BM25 sobre título e descrição (BM25F simplificado: soma ponderada
+    do BM25 de cada campo). Todos os termos da consulta precisam aparecer no livro;
+    o último termo também casa por prefixo e, com fuzzy, termos fora do vocabulário
+    casam com termos a uma edição de distância.
+    """
+
+    def __init__(self, indices):
+        self.termos = indices['texto_termos']
+        self.inicio = indices['texto_inicio']
+        self.docs = indices['texto_docs']
+        self.pontos = indices['texto_pontos']
+        self.total_docs = len(indices['texto_tamanhos'])
+
+    def posicoes(self, termos):
+        """Posição de cada termo no vocabulário (-1 se não existir), em uma única busca binária vetorizada."""
+        if not termos or not len(self.termos):
+            return np.full(len(termos), -1, dtype='int64')
+        chaves = np.array(termos, dtype=f'S{TAMANHO_TERMO}')
+        posicoes = np.minimum(np.searchsorted(self.termos, chaves), len(self.termos) - 1)
+        return np.where(self.termos[posicoes] == chaves, posicoes, -1)
+
+    def expandir(self, termo, prefixo=False, fuzzy=False):
+        """
+        Termos do vocabulário que representam um termo da consulta, com o peso de cada um:
+        o próprio termo, os termos que começam com ele (prefixo) e, se o termo não existir,
+        as variações a uma edição de distância (fuzzy).
+        """
+        expansao = {}
+        posicao = self.posicoes([termo])[0]
+        if posicao >= 0:
+            expansao[int(posicao)] = 1.0
+
+        if prefixo and len(termo) >= 3:
+            primeiro, ultimo = np.searchsorted(
+                self.termos, np.array([termo, termo + b'\xff'], dtype=f'S{TAMANHO_TERMO}')
+            )
+            candidatos = np.arange(primeiro, ultimo)
+            if len(candidatos) > MAX_EXPANSAO_PREFIXO:
+                frequencias = self.inicio[candidatos + 1] - self.inicio[candidatos]
+                candidatos = candidatos[np.argpartition(-frequencias, MAX_EXPANSAO_PREFIXO)[:MAX_EXPANSAO_PREFIXO]]
+            for candidato in candidatos.tolist():
+                expansao.setdefault(candidato, 1.0)
+
+        if fuzzy and posicao < 0:
+            for candidato in self.posicoes(variacoes(termo)).tolist():
+                if candidato >= 0:
+                    expansao.setdefault(candidato, PESO_FUZZY)
+        return expansao
+
+    def custo(self, expansao):
+        return sum(int(self.inicio[t + 1] - self.inicio[t]) for t in expansao)
+
+    def materializar(self, expansao, coluna):
+        """Livros (ids crescentes) de um grupo de termos expandidos, somando a pontuação de cada termo."""
+        docs, pontos = [], []
+        for termo, peso in expansao.items():
+            inicio, fim = self.inicio[termo], self.inicio[termo + 1]
+            docs.append(self.docs[inicio:fim])
+            pontos.append(self.pontos[inicio:fim, coluna] * peso)
+        if len(docs) == 1:
+            return docs[0], pontos[0]
+        docs, pontos = np.concatenate(docs), np.concatenate(pontos)
+        if len(docs) > self.total_docs // 16:
+            # Muitos livros: acumula num array denso (O(livros + postings), sem ordenar)
+            # (toda posting tem pontuação > 0 na coluna 1; na coluna 0 só as que aparecem no título)
+            acumulado = np.bincount(docs, weights=pontos, minlength=self.total_docs)
+            docs = np.flatnonzero(acumulado > 0).astype('int32')
+            return docs, acumulado[docs].astype('float32')
+        docs, inverso = np.unique(docs, return_inverse=True)
+        return docs, np.bincount(inverso, weights=pontos).astype('float32')
+
+    def filtrar(self, docs, pontuacao, expansao, coluna):
+        """
+        Mantém os livros de `docs` que contêm algum termo do grupo, somando sua pontuação.
+        Cada lista de postings é consultada por busca binária, sem materializar o grupo inteiro.
+        Postings com pontuação zero na coluna (termo só na descrição, em busca por título) não contam.
+        """
+        pontos_grupo = np.zeros(len(docs), dtype='float32')
+        presente = np.zeros(len(docs), dtype=bool)
+        for termo, peso in expansao.items():
+            inicio, fim = self.inicio[termo], self.inicio[termo + 1]
+            lista = self.docs[inicio:fim]
+            posicoes = np.minimum(np.searchsorted(lista, docs), len(lista) - 1)
+            pontos = self.pontos[inicio + posicoes, coluna]
+            achou = (lista[posicoes] == docs) & (pontos > 0)
+            pontos_grupo[achou] += peso * pontos[achou]
+            presente |= achou
+        return docs[presente], pontuacao[presente] + pontos_grupo[presente]
+
+    def buscar(self, consulta, so_titulo=False, prefixo=True, fuzzy=False):
+        """
+        Livros que contêm todos os termos da consulta (no título, com so_titulo).
+        Os grupos de termos são processados do menos para o mais frequente: o primeiro é materializado
+        e os seguintes só filtram os candidatos restantes.
+        Retorna (ids dos livros em ordem crescente, pontuação BM25 de cada um).
+        """
+        vazio = (np.zeros(0, dtype='int32'), np.zeros(0, dtype='float32'))
+        termos = list(dict.fromkeys(tokenizar(consulta)))
+        if not termos:
+            return vazio
+
+        grupos = []
+        for n, termo in enumerate(termos):
+            expansao = self.expandir(termo, prefixo=prefixo and n == len(termos) - 1, fuzzy=fuzzy)
+            if not expansao:
+                return vazio
+            grupos.append(expansao)
+        grupos.sort(key=self.custo)
+
+        coluna = 0 if so_titulo else 1
+        docs, pontuacao = self.materializar(grupos[0], coluna)
+        if so_titulo:
+            no_titulo = pontuacao > 0
+            docs, pontuacao = docs[no_titulo], pontuacao[no_titulo]
+        for expansao in grupos[1:]:
+            if not len(docs):
+                break
+            docs, pontuacao = self.filtrar(docs, pontuacao, expansao, coluna)
+        return docs, pontuacao
+
+
+def ranquear(docs, pontuacao, k=None):
+    """
+    Ordena os livros por pontuação (maior primeiro, empate pelo id) e devolve os k primeiros.
+    Com k menor que o total, seleciona os k melhores com argpartition antes de ordenar.
+    """
+    if k is not None and k < len(docs):
+        melhores = np.argpartition(-pontuacao, k - 1)[:k]
+        # Inclui os empatados com o k-ésimo para que o desempate pelo id seja exato
+        limite = pontuacao[melhores].min()
+        melhores = np.flatnonzero(pontuacao >= limite)
+        docs, pontuacao = docs[melhores], pontuacao[melhores]
+    ordem = np.lexsort((docs, -pontuacao))
+    return docs[ordem][:k]
+
+
+def benchmark(caminho_csv=None, caminho_parquet=None, consultas=('love', 'the', 'history of', 'myst', 'mistery'),
+              repeticoes=200):
+    """Mede o tempo de construção do índice e a latência de algumas consultas sobre a tabela unificada."""
+    from book_store import BookStore
+
+    argumentos = {}
+    if caminho_csv:
+        argumentos = {'caminho_csv': caminho_csv, 'caminho_parquet': caminho_parquet or ''}
+    from book_table import carregar_tabela
+    inicio = time.perf_counter()
+    store = BookStore.de_tabela(carregar_tabela(**argumentos))
+    print(f"{len(store)} livros, store e índices montados em {time.perf_counter() - inicio:.2f} s "
+          f"({len(store.busca.termos)} termos, {len(store.busca.docs)} postings)")
+    print(f"{'consulta':<14}{'fuzzy':<12}{'livros':>8}{'ms':>13}")
+
+    for consulta in consultas:
+        for fuzzy in (False, True):
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                docs, pontuacao = store.busca.buscar(consulta, fuzzy=fuzzy)
+                ranquear(docs, pontuacao, 10)
+            duracao = (time.perf_counter() - inicio) / repeticoes * 1000
+            print(f"{consulta!r:<14}{fuzzy!s:<12}{len(docs):>8}{duracao:>13.3f}")
+
+
+if __name__ == "__main__":
+    benchmark(*sys.argv[1:3])
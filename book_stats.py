@@ -0,0 +1,122 @@
+import numpy as np
+
+# Percentis de preço materializados por categoria
+PERCENTIS = (10, 25, 50, 75, 90)
+
+
+def percentis_por_grupo(valores, inicio, percentis=PERCENTIS):
+    """
+    Percentis (interpolação linear, como np.percentile) de cada grupo de um array já ordenado
+    dentro dos grupos, com o grupo g em valores[inicio[g]:inicio[g + 1]].
+    Retorna um array (grupos x percentis), NaN para grupos vazios; sem laço por grupo.
+    """
+    contagem = np.diff(inicio)
+    resultado = np.full((len(contagem), len(percentis)), np.nan)
+    grupos = np.flatnonzero(contagem)
+    if len(grupos) == 0:
+        return resultado
+    posicao = (contagem[grupos, None] - 1) * (np.asarray(percentis, dtype='float64') / 100)
+    abaixo = np.floor(posicao).astype('int64')
+    acima = np.minimum(abaixo + 1, contagem[grupos, None] - 1)
+    base = inicio[grupos, None]
+    menor, maior = valores[base + abaixo], valores[base + acima]
+    resultado[grupos] = menor + (maior - menor) * (posicao - abaixo)
+    return resultado
+
+
+def _arredondar(valor):
+    return None if valor is None or np.isnan(valor) else float(np.round(valor, 2))
+
+
+class EstatisticasLivros:
+    """
+    Estatísticas dos livros com preço válido, materializadas uma vez por versão dos dados
+    (o store é imutável; uma nova versão da tabela gera um novo store e novas estatísticas).
+    Somas, contagens e histogramas vêm de bincount sobre os códigos de categoria e rating;
+    mínimo, máximo, mediana e percentis por categoria vêm do índice categoria -> livros em ordem
+    de preço (gravado no snapshot), então as rotas só montam dicionários, sem varrer a tabela.
+    """
+
+    def __init__(self, store):
+        ids = store.com_preco
+        precos = store.preco[ids]
+        rating = store.rating
+        categoria = store.categoria
+
+        # Geral
+        self.total = len(ids)
+        self.soma = float(precos.sum())
+        codigos_rating = rating.codigos[ids]
+        self.histograma_ratings = np.bincount(
+            codigos_rating[codigos_rating >= 0], minlength=len(rating.categorias)
+        )
+
+        # Por categoria, como aparece na tabela (usado no overview)
+        codigos = categoria.codigos[ids]
+        validos = codigos >= 0
+        self.contagem_categoria = np.bincount(codigos[validos], minlength=len(categoria.categorias))
+        self.soma_categoria = np.bincount(
+            codigos[validos], weights=precos[validos], minlength=len(categoria.categorias)
+        )
+
+        # Por categoria normalizada (minúsculas), a partir do índice em ordem de preço
+        inicio = store.indices['categoria_preco_inicio']
+        ordem = store.indices['categoria_preco_ordem']
+        precos_ordenados = store.preco[ordem]
+        total_categorias = len(store.categorias_normalizadas)
+        self.inicio = inicio
+        self.contagem = np.diff(inicio)
+        grupo = np.repeat(np.arange(total_categorias), self.contagem)
+        self.soma_por_categoria = np.bincount(grupo, weights=precos_ordenados, minlength=total_categorias)
+        self.rating_por_categoria = np.bincount(
+            grupo, weights=store.rating_num[ordem], minlength=total_categorias
+        )
+        self.disponivel_por_categoria = np.bincount(
+            grupo, weights=store.disponivel[ordem], minlength=total_categorias
+        ).astype('int64')
+        codigos_rating = rating.codigos[ordem]
+        com_rating = codigos_rating >= 0
+        self.ratings_por_categoria = np.bincount(
+            grupo[com_rating] * len(rating.categorias) + codigos_rating[com_rating],
+            minlength=total_categorias * len(rating.categorias)
+        ).reshape(total_categorias, len(rating.categorias))
+        self.percentis = percentis_por_grupo(precos_ordenados, inicio)
+        self.minimo = np.full(total_categorias, np.nan)
+        self.maximo = np.full(total_categorias, np.nan)
+        com_livros = np.flatnonzero(self.contagem)
+        self.minimo[com_livros] = precos_ordenados[inicio[com_livros]]
+        self.maximo[com_livros] = precos_ordenados[inicio[com_livros + 1] - 1]
+
+        self.nomes_rating = list(rating.categorias)
+        self.categorias_normalizadas = store.categorias_normalizadas
+        self.posicao_categoria = store.posicao_categoria
+
+        # A resposta do overview não depende da requisição: é montada uma vez
+        self.resumo = {
+            "total_livros": self.total,
+            "preco_medio_geral": round(self.soma / self.total, 2) if self.total else None,
+            "distribuicao_ratings": dict(zip(self.nomes_rating, self.histograma_ratings.tolist())),
+            "preco_medio_por_categoria": {
+                categoria.categorias[c]: float(np.round(self.soma_categoria[c] / self.contagem_categoria[c], 2))
+                for c in np.flatnonzero(self.contagem_categoria)
+            }
+        }
+
+    def da_categoria(self, nome):
+        """Estatísticas de preço, rating e estoque de uma categoria (sem diferenciar maiúsculas), None se não existir."""
+        c = self.posicao_categoria.get(nome.lower())
+        if c is None or self.contagem[c] == 0:
+            return None
+        total = int(self.contagem[c])
+        return {
+            "categoria": self.categorias_normalizadas[c],
+            "total_livros": total,
+            "preco_medio": _arredondar(self.soma_por_categoria[c] / total),
+            "preco_minimo": _arredondar(self.minimo[c]),
+            "preco_maximo": _arredondar(self.maximo[c]),
+            "preco_mediana": _arredondar(self.percentis[c][PERCENTIS.index(50)]),
+            "percentis_preco": {f"p{p}": _arredondar(v) for p, v in zip(PERCENTIS, self.percentis[c])},
+            "rating_medio": _arredondar(self.rating_por_categoria[c] / total),
+            "distribuicao_ratings": dict(zip(self.nomes_rating, self.ratings_por_categoria[c].tolist())),
+            "total_disponivel": int(self.disponivel_por_categoria[c])
+        }
@@ -0,0 +1,622 @@
+import hashlib
+import json
+import os
+import sys
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+from book_search import IndiceTexto, construir_indice_texto, tokenizar
+from book_stats import EstatisticasLivros
+from book_table import CSV_PATH, PARQUET_PATH, carregar_tabela
+
+# Snapshot do store em arquivos .npy, aberto com mmap pelos workers da API
+STORE_DIR = os.path.join(os.path.dirname(CSV_PATH), '.book_store')
+# Versão do formato do snapshot; snapshots de outro formato são recriados
+SNAPSHOT_FORMATO = 7
+
+# Ordem dos campos de um livro nas respostas da API
+CAMPOS_LIVRO = [
+    'product_page_url', 'universal_product_code', 'title', 'price_including_tax',
+    'price_excluding_tax', 'number_available', 'product_description', 'category',
+    'review_rating', 'image_url', 'arquivo_origem'
+]
+COLUNAS_NUMERICAS = {
+    'price_including_tax': 'float64',
+    'price_excluding_tax': 'float64',
+    'number_available': 'int32',
+    'review_rating_num': 'int8'
+}
+COLUNAS_CATEGORICAS = ['category', 'review_rating', 'arquivo_origem']
+# Critérios de desempate dos índices de rating (além do desempate final pela ordem da tabela)
+DESEMPATES_RATING = ('padrao', 'preco', 'estoque')
+COLUNAS_TEXTO = ['product_page_url', 'universal_product_code', 'title', 'product_description', 'image_url']
+
+
+def _somente_leitura(array):
+    array.flags.writeable = False
+    return array
+
+
+def _salvar_array(caminho, array):
+    # Grava em arquivo temporário e troca: processos com o arquivo antigo em mmap não são afetados
+    # (o pid no nome evita que dois workers recriando o snapshot ao mesmo tempo usem o mesmo temporário)
+    tmp_path = f"{caminho}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as arquivo:
+        np.save(arquivo, array)
+    os.replace(tmp_path, caminho)
+
+
+class ColunaTexto:
+    """
+    Coluna de texto compacta: todos os valores codificados em UTF-8 num único buffer de bytes,
+    com um array de offsets (o valor i fica em buffer[offsets[i]:offsets[i + 1]]) e uma máscara de nulos.
+    Não cria um objeto Python por linha, então as páginas de memória não são tocadas
+    pelo contador de referências e continuam compartilhadas entre processos após o fork.
+    """
+
+    def __init__(self, buffer, offsets, nulos):
+        self.buffer = buffer
+        self.offsets = offsets
+        self.nulos = nulos
+
+    @classmethod
+    def de_serie(cls, serie):
+        if pa is not None:
+            # Com pyarrow, buffer e offsets saem direto da representação Arrow da coluna
+            # (valores nulos ocupam zero bytes no buffer)
+            array = pa.array(serie.astype(object), type=pa.large_string(), from_pandas=True)
+            _, buffer_offsets, buffer_dados = array.buffers()
+            offsets = np.frombuffer(buffer_offsets, dtype='int64')[array.offset:array.offset + len(array) + 1]
+            buffer = np.frombuffer(buffer_dados, dtype='uint8') if buffer_dados is not None else np.zeros(0, dtype='uint8')
+            nulos = serie.isna().to_numpy()
+            return cls(_somente_leitura(buffer[offsets[0]:offsets[-1]].copy()),
+                       _somente_leitura(offsets - offsets[0]), _somente_leitura(nulos.copy()))
+
+        codificados = [b'' if pd.isna(v) else str(v).encode('utf-8') for v in serie]
+        offsets = np.zeros(len(codificados) + 1, dtype='int64')
+        np.cumsum([len(v) for v in codificados], out=offsets[1:])
+        buffer = np.frombuffer(b''.join(codificados), dtype='uint8')
+        nulos = serie.isna().to_numpy()
+        return cls(_somente_leitura(buffer.copy()), _somente_leitura(offsets), _somente_leitura(nulos.copy()))
+
+    def __len__(self):
+        return len(self.nulos)
+
+    def __getitem__(self, i):
+        if self.nulos[i]:
+            return None
+        return self.bruto(i).decode('utf-8')
+
+    def bruto(self, i):
+        """Bytes UTF-8 do valor i (vazio para nulo)."""
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def hashes(self):
+        """CRC32 de cada valor (estável entre processos, ao contrário de hash())."""
+        dados = self.buffer.tobytes()
+        offsets = self.offsets.tolist()
+        return np.array([zlib.crc32(dados[offsets[i]:offsets[i + 1]]) for i in range(len(self))], dtype='int64')
+
+    def valores(self, ids):
+        return [self[i] for i in ids]
+
+
+class ColunaCategorica:
+    """Coluna categórica: códigos inteiros por linha (-1 para nulo) e a lista de categorias."""
+
+    def __init__(self, codigos, categorias):
+        self.codigos = codigos
+        self.categorias = categorias
+
+    @classmethod
+    def de_serie(cls, serie):
+        serie = serie.astype('category')
+        codigos = serie.cat.codes.to_numpy().astype('int32')
+        return cls(_somente_leitura(codigos), [str(c) for c in serie.cat.categories])
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def __getitem__(self, i):
+        codigo = self.codigos[i]
+        return None if codigo < 0 else self.categorias[codigo]
+
+    def valores(self, ids):
+        return [self[i] for i in ids]
+
+    def categorical(self, ids):
+        return pd.Categorical.from_codes(self.codigos[ids], categories=self.categorias)
+
+
+class BookStore:
+    """
+    Tabela de livros carregada uma única vez e compartilhada por todas as rotas da API.
+    Números ficam em arrays NumPy, colunas categóricas como códigos e textos em buffers UTF-8;
+    as rotas montam apenas as linhas que vão responder.
+    Todos os arrays são somente leitura: com `gunicorn --preload` ou abrindo o snapshot com mmap,
+    os workers compartilham a mesma memória.
+    """
+
+    def __init__(self, numericas, categoricas, textos, indices=None):
+        self.numericas = numericas
+        self.categoricas = categoricas
+        self.textos = textos
+        self.total = len(numericas['price_including_tax'])
+        # Versão da tabela de origem (mtime do CSV/Parquet), usada nos cursores de paginação
+        self.versao = None
+
+        # Atalhos usados pelas rotas
+        self.preco = numericas['price_including_tax']
+        self.disponivel = numericas['number_available']
+        self.rating_num = numericas['review_rating_num']
+        self.categoria = categoricas['category']
+        self.rating = categoricas['review_rating']
+
+        # Nomes de categoria normalizados (minúsculos): código da categoria -> código normalizado
+        # (o -1 extra no fim mapeia o código de nulo para ele mesmo)
+        self.categorias_normalizadas = sorted({c.lower() for c in self.categoria.categorias})
+        posicao = {nome: n for n, nome in enumerate(self.categorias_normalizadas)}
+        self.codigo_normalizado = np.array(
+            [posicao[c.lower()] for c in self.categoria.categorias] + [-1], dtype='int32'
+        )
+        self.posicao_categoria = posicao
+
+        self.indices = dict(indices or {})
+        self.construir_indices()
+        self.busca = IndiceTexto(self.indices)
+
+        # Lista ordenada de categorias e seu ETag, calculados uma vez por versão dos dados
+        codigos = self.categoria.codigos
+        contagem = np.bincount(codigos[codigos >= 0], minlength=len(self.categoria.categorias))
+        self.lista_categorias = sorted(
+            c for c, quantidade in zip(self.categoria.categorias, contagem) if c and quantidade
+        )
+        self.categorias_etag = hashlib.sha1(
+            json.dumps(self.lista_categorias, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()[:16]
+
+        # Linhas com preço válido (as rotas de estatística/ML ignoram as demais)
+        self.com_preco = _somente_leitura(np.flatnonzero(~np.isnan(self.preco)))
+        self.estatisticas = EstatisticasLivros(self)
+
+    def construir_indices(self):
+        """Monta os índices que não vieram do snapshot (são gravados junto com ele)."""
+        if 'upc' not in self.indices:
+            self.indices['upc'] = _somente_leitura(self.construir_indice_hash(self.textos['universal_product_code']))
+        if 'categoria_ordem' not in self.indices or 'categoria_inicio' not in self.indices:
+            ordem, inicio = self.construir_indice_invertido(
+                self.codigo_normalizado[self.categoria.codigos], len(self.categorias_normalizadas)
+            )
+            self.indices['categoria_ordem'] = _somente_leitura(ordem)
+            self.indices['categoria_inicio'] = _somente_leitura(inicio)
+        if 'preco_ordem' not in self.indices:
+            # Livros com preço válido ordenados por preço (empates pelo id) e os preços nessa ordem
+            com_preco = np.flatnonzero(~np.isnan(self.preco))
+            ordem = com_preco[np.argsort(self.preco[com_preco], kind='stable')]
+            self.indices['preco_ordem'] = _somente_leitura(ordem.astype('int64'))
+            self.indices['preco_ordenado'] = _somente_leitura(np.asarray(self.preco[ordem], dtype='float64'))
+        if 'categoria_preco_ordem' not in self.indices:
+            # Livros com preço agrupados por categoria, em ordem de preço dentro de cada uma (estatísticas)
+            ordem = self.indices['preco_ordem']
+            posicoes, inicio = self.construir_indice_invertido(
+                self.codigo_normalizado[self.categoria.codigos[ordem]], len(self.categorias_normalizadas)
+            )
+            self.indices['categoria_preco_ordem'] = _somente_leitura(np.asarray(ordem[posicoes], dtype='int64'))
+            self.indices['categoria_preco_inicio'] = _somente_leitura(inicio)
+        if 'categoria_rating_inicio' not in self.indices:
+            # Livros com preço por rating decrescente, um índice por critério de desempate
+            # (geral e agrupado por categoria), para servir top-k lendo só o início do índice
+            com_preco = np.flatnonzero(~np.isnan(self.preco))
+            rating = -self.rating_num[com_preco].astype('int16')
+            desempates = {
+                'padrao': [],
+                'preco': [self.preco[com_preco]],
+                'estoque': [-self.disponivel[com_preco].astype('int64')]
+            }
+            for desempate in DESEMPATES_RATING:
+                ordem = com_preco[np.lexsort([com_preco] + desempates[desempate] + [rating])]
+                posicoes, inicio = self.construir_indice_invertido(
+                    self.codigo_normalizado[self.categoria.codigos[ordem]], len(self.categorias_normalizadas)
+                )
+                self.indices[f'rating_ordem_{desempate}'] = _somente_leitura(ordem.astype('int64'))
+                self.indices[f'categoria_rating_ordem_{desempate}'] = _somente_leitura(ordem[posicoes].astype('int64'))
+            self.indices['categoria_rating_inicio'] = _somente_leitura(inicio)
+        if 'texto_termos' not in self.indices:
+            titulos = self.textos['title'].valores(range(self.total))
+            descricoes = self.textos['product_description'].valores(range(self.total))
+            for nome, array in construir_indice_texto(titulos, descricoes).items():
+                self.indices[nome] = _somente_leitura(array)
+
+    @staticmethod
+    def construir_indice_invertido(codigos, total_codigos):
+        """
+        Índice invertido código -> linhas em formato CSR: `ordem` tem os ids das linhas agrupados
+        por código (em ordem crescente de id dentro de cada grupo) e as linhas do código c
+        são ordem[inicio[c]:inicio[c + 1]]. Códigos negativos (nulos) ficam de fora.
+        """
+        validos = np.flatnonzero(codigos >= 0)
+        ordem = validos[np.argsort(codigos[validos], kind='stable')]
+        inicio = np.zeros(total_codigos + 1, dtype='int64')
+        np.cumsum(np.bincount(codigos[validos], minlength=total_codigos), out=inicio[1:])
+        return ordem.astype('int64'), inicio
+
+    @staticmethod
+    def construir_indice_hash(coluna):
+        """
+        Tabela hash com endereçamento aberto (sondagem linear) sobre uma coluna de texto:
+        array de slots com o id da linha (-1 = vazio), tamanho potência de 2 e ocupação <= 50%.
+        A inserção é vetorizada em rodadas: em cada rodada as chaves pendentes ocupam seu slot
+        se ele estiver livre (a de menor id vence em caso de disputa) e as demais avançam um slot.
+        Linhas nulas ficam fora do índice.
+        """
+        tamanho = 8
+        while tamanho < 2 * len(coluna):
+            tamanho *= 2
+        mascara = tamanho - 1
+        slots = np.full(tamanho, -1, dtype='int64')
+
+        pendentes = np.flatnonzero(~np.asarray(coluna.nulos))
+        posicoes = coluna.hashes()[pendentes] & mascara
+        while len(pendentes):
+            livres = np.flatnonzero(slots[posicoes] == -1)
+            _, primeiros = np.unique(posicoes[livres], return_index=True)
+            vencedores = livres[primeiros]
+            slots[posicoes[vencedores]] = pendentes[vencedores]
+
+            restantes = np.ones(len(pendentes), dtype=bool)
+            restantes[vencedores] = False
+            pendentes = pendentes[restantes]
+            posicoes = (posicoes[restantes] + 1) & mascara
+        return slots
+
+    @classmethod
+    def de_tabela(cls, tabela, arquivo_padrao=os.path.basename(CSV_PATH)):
+        """
+        Monta o store a partir da tabela unificada tipada (book_table.carregar_tabela).
+        Colunas ausentes viram nulos; arquivo_origem ausente vira o nome do CSV unificado.
+        """
+        total = len(tabela)
+        if 'arquivo_origem' in tabela.columns:
+            tabela = tabela.assign(arquivo_origem=tabela['arquivo_origem'].astype(object).fillna(arquivo_padrao))
+        else:
+            tabela = tabela.assign(arquivo_origem=arquivo_padrao)
+
+        numericas = {}
+        for col, dtype in COLUNAS_NUMERICAS.items():
+            if col in tabela.columns:
+                valores = tabela[col].to_numpy(dtype='float64' if dtype == 'float64' else None)
+            else:
+                valores = np.full(total, np.nan if dtype == 'float64' else 0)
+            numericas[col] = _somente_leitura(np.asarray(valores, dtype=dtype))
+
+        categoricas = {}
+        for col in COLUNAS_CATEGORICAS:
+            serie = tabela[col] if col in tabela.columns else pd.Series([None] * total)
+            categoricas[col] = ColunaCategorica.de_serie(serie)
+
+        textos = {}
+        for col in COLUNAS_TEXTO:
+            serie = tabela[col] if col in tabela.columns else pd.Series([None] * total, dtype=object)
+            textos[col] = ColunaTexto.de_serie(serie)
+
+        return cls(numericas, categoricas, textos)
+
+    @classmethod
+    def carregar(cls, caminho_csv=CSV_PATH, caminho_parquet=PARQUET_PATH, diretorio=STORE_DIR):
+        """
+        Abre o snapshot em mmap quando ele está atualizado em relação à tabela unificada;
+        caso contrário monta o store a partir da tabela (Parquet/CSV) e grava um novo snapshot.
+        Lança FileNotFoundError se a tabela não existir.
+        """
+        fontes = [p for p in (caminho_csv, caminho_parquet) if os.path.exists(p)]
+        if not fontes:
+            raise FileNotFoundError(caminho_csv)
+        versao = max(os.path.getmtime(p) for p in fontes)
+
+        meta_path = os.path.join(diretorio, 'meta.json')
+        if os.path.exists(meta_path):
+            try:
+                return cls.abrir(diretorio, versao)
+            except (ValueError, OSError, KeyError) as e:
+                print(f"Aviso: snapshot do store em {diretorio} inválido, recriando ({e})")
+
+        store = cls.de_tabela(carregar_tabela(caminho_csv=caminho_csv, caminho_parquet=caminho_parquet))
+        store.versao = versao
+        try:
+            store.salvar(diretorio, versao)
+        except OSError as e:
+            print(f"Aviso: não foi possível salvar o snapshot do store: {e}")
+        return store
+
+    def salvar(self, diretorio=STORE_DIR, versao=None):
+        """Grava os arrays do store em arquivos .npy e as categorias em meta.json."""
+        os.makedirs(diretorio, exist_ok=True)
+        arrays = dict(self.numericas)
+        for col, coluna in self.categoricas.items():
+            arrays[f'{col}.codigos'] = coluna.codigos
+        for col, coluna in self.textos.items():
+            arrays[f'{col}.buffer'] = coluna.buffer
+            arrays[f'{col}.offsets'] = coluna.offsets
+            arrays[f'{col}.nulos'] = coluna.nulos
+        for nome, array in self.indices.items():
+            arrays[f'indice.{nome}'] = array
+        for nome, array in arrays.items():
+            _salvar_array(os.path.join(diretorio, f'{nome}.npy'), array)
+
+        meta = {
+            'formato': SNAPSHOT_FORMATO,
+            'versao': versao,
+            'total': self.total,
+            'categorias': {col: coluna.categorias for col, coluna in self.categoricas.items()},
+            'indices': list(self.indices)
+        }
+        # meta.json é gravado por último: sem ele o snapshot não é considerado válido
+        tmp_path = os.path.join(diretorio, f'meta.json.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as meta_file:
+            json.dump(meta, meta_file, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(diretorio, 'meta.json'))
+
+    @classmethod
+    def abrir(cls, diretorio=STORE_DIR, versao=None):
+        """
+        Abre um snapshot com mmap (somente leitura).
+        Lança ValueError se o snapshot for de outra versão da tabela.
+        """
+        with open(os.path.join(diretorio, 'meta.json'), encoding='utf-8') as meta_file:
+            meta = json.load(meta_file)
+        if meta.get('formato') != SNAPSHOT_FORMATO:
+            raise ValueError("formato de snapshot antigo")
+        if versao is not None and meta['versao'] != versao:
+            raise ValueError("snapshot desatualizado")
+
+        def carregar_array(nome):
+            return np.load(os.path.join(diretorio, f'{nome}.npy'), mmap_mode='r')
+
+        numericas = {col: carregar_array(col) for col in COLUNAS_NUMERICAS}
+        categoricas = {
+            col: ColunaCategorica(carregar_array(f'{col}.codigos'), meta['categorias'][col])
+            for col in COLUNAS_CATEGORICAS
+        }
+        textos = {
+            col: ColunaTexto(carregar_array(f'{col}.buffer'), carregar_array(f'{col}.offsets'),
+                             carregar_array(f'{col}.nulos'))
+            for col in COLUNAS_TEXTO
+        }
+        indices = {nome: carregar_array(f'indice.{nome}') for nome in meta['indices']}
+        store = cls(numericas, categoricas, textos, indices)
+        if store.total != meta['total']:
+            raise ValueError("snapshot incompleto")
+        store.versao = meta['versao']
+        return store
+
+    def __len__(self):
+        return self.total
+
+    def valor(self, col, i):
+        """Valor de uma coluna na linha i, com tipo Python (float, int ou str)."""
+        if col in self.textos:
+            return self.textos[col][i]
+        if col in self.categoricas:
+            return self.categoricas[col][i]
+        valor = self.numericas[col][i]
+        if COLUNAS_NUMERICAS[col] == 'float64':
+            return None if np.isnan(valor) else float(valor)
+        return int(valor)
+
+    def livro(self, i):
+        """Livro da linha i no formato original da API (todos os campos como texto)."""
+        livro = {}
+        for col in CAMPOS_LIVRO:
+            valor = self.valor(col, i)
+            livro[col] = None if valor is None else str(valor)
+        return livro
+
+    def livros(self, ids):
+        return [self.livro(i) for i in ids]
+
+    def registros(self, ids, campos):
+        """Linhas selecionadas como lista de dicionários tipados, apenas com os campos pedidos."""
+        return [{col: self.valor(col, i) for col in campos} for i in ids]
+
+    def frame(self, campos, ids=None):
+        """Monta um DataFrame com os campos pedidos (colunas categóricas continuam categóricas)."""
+        if ids is None:
+            ids = np.arange(self.total)
+        dados = {}
+        for col in campos:
+            if col in self.numericas:
+                dados[col] = np.asarray(self.numericas[col][ids])
+            elif col in self.categoricas:
+                dados[col] = self.categoricas[col].categorical(ids)
+            else:
+                dados[col] = self.textos[col].valores(ids)
+        return pd.DataFrame(dados)
+
+    def ids_categoria(self, nome):
+        """
+        Linhas da categoria informada (comparação sem diferenciar maiúsculas/minúsculas),
+        em ordem crescente: uma fatia do índice invertido, sem percorrer a tabela.
+        """
+        codigo = self.posicao_categoria.get(nome.lower())
+        if codigo is None:
+            return self.indices['categoria_ordem'][:0]
+        inicio = self.indices['categoria_inicio']
+        return self.indices['categoria_ordem'][inicio[codigo]:inicio[codigo + 1]]
+
+    def faixa_preco(self, minimo=None, maximo=None):
+        """Início e fim, no índice de preços, dos livros com preço entre minimo e maximo (inclusivos)."""
+        precos = self.indices['preco_ordenado']
+        inicio = 0 if minimo is None else int(np.searchsorted(precos, minimo, side='left'))
+        fim = len(precos) if maximo is None else int(np.searchsorted(precos, maximo, side='right'))
+        return inicio, max(inicio, fim)
+
+    def ids_faixa_preco(self, minimo=None, maximo=None):
+        """
+        Livros com preço entre minimo e maximo (inclusivos), em ordem crescente de preço:
+        duas buscas binárias no índice de preços e uma fatia, O(log n) sem copiar dados.
+        """
+        inicio, fim = self.faixa_preco(minimo, maximo)
+        return self.indices['preco_ordem'][inicio:fim]
+
+    def consultar(self, categoria=None, preco_min=None, preco_max=None, rating_min=None,
+                  disponivel_min=None, titulo=None, fuzzy=False):
+        """
+        Combina os filtros informados (todos precisam ser atendidos) e retorna
+        (ids em ordem crescente, pontuação BM25 do título ou None quando não há busca por título).
+        Os filtros com índice (título, categoria, faixa de preço) geram candidatos: a busca por título
+        ou o menor dos outros conjuntos vira a base e os demais filtros são máscaras vetorizadas
+        sobre ela. Sem filtro com índice, as máscaras são aplicadas às colunas inteiras.
+        """
+        filtra_preco = preco_min is not None or preco_max is not None
+        codigo = None
+        if categoria is not None:
+            codigo = self.posicao_categoria.get(categoria.lower())
+            if codigo is None:
+                return self.indices['categoria_ordem'][:0], None
+
+        # Candidatos: a busca por título ou o menor conjunto entre categoria e faixa de preço
+        ids, pontos, base = None, None, None
+        if titulo:
+            ids, pontos = self.buscar_texto(titulo, so_titulo=True, fuzzy=fuzzy)
+        else:
+            tamanhos = {}
+            if codigo is not None:
+                inicio = self.indices['categoria_inicio']
+                tamanhos['categoria'] = inicio[codigo + 1] - inicio[codigo]
+            if filtra_preco:
+                inicio, fim = self.faixa_preco(preco_min, preco_max)
+                tamanhos['preco'] = fim - inicio
+            if tamanhos:
+                base = min(tamanhos, key=tamanhos.get)
+                if base == 'categoria':
+                    ids = self.ids_categoria(categoria)
+                else:
+                    ids = np.sort(self.ids_faixa_preco(preco_min, preco_max))
+
+        def coluna(array):
+            return array if ids is None else array[ids]
+
+        mascara = np.ones(self.total if ids is None else len(ids), dtype=bool)
+        if codigo is not None and base != 'categoria':
+            mascara &= self.codigo_normalizado[coluna(self.categoria.codigos)] == codigo
+        if filtra_preco and base != 'preco':
+            precos = coluna(self.preco)
+            if preco_min is not None:
+                mascara &= precos >= preco_min
+            if preco_max is not None:
+                mascara &= precos <= preco_max
+        if rating_min is not None:
+            mascara &= coluna(self.rating_num) >= rating_min
+        if disponivel_min is not None:
+            mascara &= coluna(self.disponivel) >= disponivel_min
+
+        if ids is None:
+            return np.flatnonzero(mascara), None
+        if mascara.all():
+            return ids, pontos
+        return ids[mascara], None if pontos is None else pontos[mascara]
+
+    def top_rating(self, k, categoria=None, desempate='padrao', filtro=None):
+        """
+        Os k livros com preço de maior rating, empates pelo desempate ('padrao', 'preco' = mais barato,
+        'estoque' = mais disponível) e depois pela ordem da tabela. Lê o início do índice pré-ordenado:
+        O(k) sem filtro; com filtro (função ids -> máscara) percorre o índice em blocos crescentes
+        até encontrar k livros, sem ordenar nada por requisição.
+        """
+        ordem = self.indices[f'rating_ordem_{desempate}']
+        if categoria is not None:
+            codigo = self.posicao_categoria.get(categoria.lower())
+            if codigo is None:
+                return ordem[:0]
+            inicio = self.indices['categoria_rating_inicio']
+            ordem = self.indices[f'categoria_rating_ordem_{desempate}'][inicio[codigo]:inicio[codigo + 1]]
+        if filtro is None:
+            return ordem[:k]
+
+        encontrados = []
+        faltam, posicao, bloco = k, 0, max(64, 4 * k)
+        while faltam > 0 and posicao < len(ordem):
+            ids = ordem[posicao:posicao + bloco]
+            selecionados = ids[filtro(ids)][:faltam]
+            encontrados.append(selecionados)
+            faltam -= len(selecionados)
+            posicao += bloco
+            bloco *= 2
+        return np.concatenate(encontrados) if encontrados else ordem[:0]
+
+    def buscar_texto(self, consulta, so_titulo=False, fuzzy=False):
+        """
+        Busca textual pelo índice BM25 (ver book_search.IndiceTexto.buscar).
+        Consultas só com palavras ignoradas pelo índice (the, of...) caem numa varredura
+        por substring no título, como a busca antiga, com pontuação zero (ordem da tabela).
+        """
+        if tokenizar(consulta) or not consulta.strip():
+            return self.busca.buscar(consulta, so_titulo=so_titulo, fuzzy=fuzzy)
+        consulta = consulta.lower()
+        titulos = self.textos['title']
+        ids = np.array([i for i in range(self.total) if consulta in (titulos[i] or '').lower()], dtype='int32')
+        return ids, np.zeros(len(ids), dtype='float32')
+
+    def buscar_upc(self, upc):
+        """Linha do livro com o UPC informado (O(1) pelo índice hash), None se não existir."""
+        slots = self.indices['upc']
+        mascara = len(slots) - 1
+        upcs = self.textos['universal_product_code']
+        chave = upc.encode('utf-8')
+        posicao = zlib.crc32(chave) & mascara
+        while True:
+            i = slots[posicao]
+            if i < 0:
+                return None
+            if upcs.bruto(i) == chave:
+                return int(i)
+            posicao = (posicao + 1) & mascara
+
+    def buscar_upcs(self, upcs):
+        """Linhas de uma lista de UPCs, na mesma ordem (None para os não encontrados)."""
+        return [self.buscar_upc(upc) for upc in upcs]
+
+
+
+def benchmark_upc(tamanhos=(1_000, 10_000, 100_000, 1_000_000), consultas=2_000):
+    """Mede a latência da busca por UPC (índice hash x varredura linear) em stores sintéticos."""
+    rng = np.random.default_rng(0)
+    for tamanho in tamanhos:
+        upcs = [f"{v:016x}" for v in rng.integers(0, 2 ** 63, size=tamanho)]
+        inicio = time.perf_counter()
+        store = BookStore.de_tabela(pd.DataFrame({
+            'universal_product_code': upcs,
+            'price_including_tax': rng.uniform(10, 60, size=tamanho)
+        }))
+        construcao = time.perf_counter() - inicio
+
+        alvos = [upcs[i] for i in rng.integers(0, tamanho, size=consultas)]
+        inicio = time.perf_counter()
+        for upc in alvos:
+            store.buscar_upc(upc)
+        indice_us = (time.perf_counter() - inicio) / consultas * 1e6
+
+        # Varredura linear equivalente à busca antiga (limitada a poucas consultas)
+        coluna = store.textos['universal_product_code']
+        inicio = time.perf_counter()
+        for upc in alvos[:5]:
+            next((i for i in range(tamanho) if coluna[i] == upc), None)
+        linear_us = (time.perf_counter() - inicio) / 5 * 1e6
+
+        print(f"{tamanho:>9} livros  índice {indice_us:8.2f} us/busca  "
+              f"varredura {linear_us:12.1f} us/busca  (índice montado em {construcao:.2f} s)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'upc':
+        benchmark_upc()
+    else:
+        print("Uso: python book_store.py upc")
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_DISPONIVEL = True
+except ImportError:
+    PARQUET_DISPONIVEL = False
+
+# Caminhos da tabela unificada (CSV gerado pelo scraping e versão colunar em Parquet)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(BASE_DIR, 'exports', 'csv', 'tabela_unificada.csv')
+PARQUET_PATH = os.path.join(BASE_DIR, 'exports', 'csv', 'tabela_unificada.parquet')
+
+# Chave dos metadados do Parquet com o tamanho e o hash do CSV de onde ele foi gerado
+CHAVE_ORIGEM = b'csv_origem'
+
+COLUNAS_PRECO = ['price_including_tax', 'price_excluding_tax']
+COLUNAS_CATEGORICAS = ['category', 'review_rating', 'arquivo_origem']
+COLUNAS_TEXTO = ['product_page_url', 'universal_product_code', 'title', 'product_description', 'image_url']
+
+# Colunas usadas pelas rotas de listagem/estatística (sem a descrição, que é a coluna mais pesada)
+COLUNAS_RESUMO = [
+    'universal_product_code', 'title', 'price_including_tax', 'number_available',
+    'category', 'review_rating', 'review_rating_num', 'product_page_url'
+]
+
+# Schema dos CSVs por categoria gerados pelo scraping (preços ainda com '£')
+SCHEMA_CSV_CATEGORIA = {
+    'product_page_url': 'object',
+    'universal_product_code': 'object',
+    'title': 'object',
+    'price_including_tax': 'object',
+    'price_excluding_tax': 'object',
+    'number_available': 'Int64',
+    'product_description': 'object',
+    'category': 'object',
+    'review_rating': 'object',
+    'image_url': 'object'
+}
+
+
+def ler_csv_categoria(caminho_arquivo):
+    """
+    Lê um CSV de categoria com o schema explícito, valida as colunas,
+    converte os preços para float e adiciona a coluna arquivo_origem.
+    Lança ValueError se faltar alguma coluna do schema.
+    """
+    df = pd.read_csv(caminho_arquivo, dtype=SCHEMA_CSV_CATEGORIA)
+
+    ausentes = [col for col in SCHEMA_CSV_CATEGORIA if col not in df.columns]
+    if ausentes:
+        raise ValueError(f"colunas ausentes: {ausentes}")
+
+    for col in COLUNAS_PRECO:
+        df[col] = df[col].astype(str).str.replace('£', '', regex=False).astype(float)
+
+    df['arquivo_origem'] = os.path.basename(caminho_arquivo)
+    return df
+
+
+def tipar_tabela(df):
+    """
+    Aplica o schema tipado da tabela unificada:
+    preços como float, number_available como inteiro, review_rating_num (1 a 5) como inteiro
+    e colunas de baixa cardinalidade (categoria, rating, arquivo de origem) como categóricas.
+    """
+    for col in COLUNAS_PRECO:
+        if col in df.columns:
+            df[col] = pd.to_numeric(
+                df[col].astype(str).str.replace('£', '', regex=False), errors='coerce'
+            ).astype('float64')
+
+    if 'number_available' in df.columns:
+        df['number_available'] = pd.to_numeric(df['number_available'], errors='coerce').fillna(0).astype('int32')
+
+    if 'review_rating' in df.columns:
+        df['review_rating_num'] = pd.to_numeric(
+            df['review_rating'].astype(str).str.split(' ', n=1).str[0], errors='coerce'
+        ).fillna(0).astype('int8')
+
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    return df
+
+
+def assinatura_csv(caminho_csv):
+    """Tamanho e hash sha256 do CSV, gravados no Parquet para saber se ele ainda corresponde ao CSV."""
+    sha = hashlib.sha256()
+    with open(caminho_csv, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            sha.update(bloco)
+    return {'size': os.path.getsize(caminho_csv), 'sha256': sha.hexdigest()}
+
+
+def parquet_corresponde(caminho_parquet, caminho_csv):
+    """
+    Se o Parquet foi gerado a partir do CSV atual (mesmo tamanho e hash, guardados nos metadados).
+    Sem o CSV vale o Parquet; mtimes não servem, já que um checkout ou cópia os altera.
+    """
+    if not os.path.exists(caminho_csv):
+        return True
+    try:
+        metadados = pq.read_schema(caminho_parquet).metadata or {}
+        origem = json.loads(metadados[CHAVE_ORIGEM])
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return False
+    if origem.get('size') != os.path.getsize(caminho_csv):
+        return False
+    return origem == assinatura_csv(caminho_csv)
+
+
+def salvar_parquet(df, caminho=PARQUET_PATH, caminho_csv=None):
+    """
+    Salva a tabela unificada em Parquet, já tipada, com a assinatura do CSV de origem
+    (por padrão o .csv de mesmo nome) nos metadados.
+    Retorna True se o arquivo foi gerado (requer pyarrow).
+    """
+    if not PARQUET_DISPONIVEL:
+        print("Aviso: pyarrow não instalado, tabela Parquet não gerada.")
+        return False
+    if df.empty:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        return False
+
+    caminho_csv = caminho_csv or os.path.splitext(caminho)[0] + '.csv'
+    tabela = pa.Table.from_pandas(tipar_tabela(df.copy()), preserve_index=False)
+    if os.path.exists(caminho_csv):
+        metadados = dict(tabela.schema.metadata or {})
+        metadados[CHAVE_ORIGEM] = json.dumps(assinatura_csv(caminho_csv)).encode('utf-8')
+        tabela = tabela.replace_schema_metadata(metadados)
+    pq.write_table(tabela, caminho)
+    return True
+
+
+def carregar_tabela(columns=None, caminho_csv=CSV_PATH, caminho_parquet=PARQUET_PATH):
+    """
+    Carrega a tabela unificada tipada, lendo apenas as colunas pedidas.
+    Usa o Parquet quando existe e foi gerado a partir do CSV atual; caso contrário lê o CSV.
+    Lança FileNotFoundError se nenhum dos dois arquivos existir.
+    """
+    parquet_atualizado = (
+        PARQUET_DISPONIVEL and os.path.exists(caminho_parquet)
+        and parquet_corresponde(caminho_parquet, caminho_csv)
+    )
+    if parquet_atualizado:
+        return pd.read_parquet(caminho_parquet, columns=columns)
+
+    usecols = None
+    if columns is not None:
+        usecols = [col for col in columns if col != 'review_rating_num']
+        if 'review_rating_num' in columns and 'review_rating' not in usecols:
+            usecols.append('review_rating')
+    df = tipar_tabela(pd.read_csv(caminho_csv, usecols=usecols))
+    return df if columns is None else df[columns]
+
+
+def _medir_carga(formato, colunas):
+    """Carrega a tabela em um processo limpo e imprime tempo e pico de memória (usado pelo benchmark)."""
+    import resource
+
+    rss_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    columns = COLUNAS_RESUMO if colunas == 'resumo' else None
+    inicio = time.perf_counter()
+    if formato == 'csv':
+        df = carregar_tabela(columns, caminho_parquet='')
+    else:
+        df = carregar_tabela(columns, caminho_csv='')
+    duracao = (time.perf_counter() - inicio) * 1000
+    rss = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_inicial) / 1024
+    print(f"{formato:<8}{colunas:<10}{len(df):>9} linhas {duracao:>10.1f} ms {rss:>10.1f} MB")
+
+
+def benchmark():
+    """Compara tempo de carga e memória da tabela unificada em CSV e em Parquet."""
+    import subprocess
+
+    if not os.path.exists(PARQUET_PATH):
+        print(f"Arquivo {PARQUET_PATH} não encontrado. Rode a unificação (web_scraping.py) antes.")
+        return
+    for formato in ['csv', 'parquet']:
+        for colunas in ['todas', 'resumo']:
+            subprocess.run([sys.executable, __file__, '--medir', formato, colunas], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == '--medir':
+        _medir_carga(sys.argv[2], sys.argv[3])
+    else:
+        benchmark()
@@ -1,44 +1,61 @@
+import time
+
 import streamlit as st
-import pandas as pd
-import os
+
+from leitor_logs import LeitorLogs, MAX_LINHAS_BRUTAS, resumo_janela
 
 #streamlit run dashboard.py
 
-# Define o caminho relativo a partir do arquivo atual
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-LOG_FILE = os.path.join(BASE_DIR, 'exports', 'logs_monitoramento.csv')
 
-st.title("Monitoramento de Rotas da API")
+@st.cache_resource
+def obter_leitor():
+    # Um leitor por processo do Streamlit: guarda a posição no log e os resumos entre as execuções
+    return LeitorLogs()
 
-# Carrega os dados
-try:
-    df = pd.read_csv(LOG_FILE)
-except FileNotFoundError:
-    st.error(f"Arquivo não encontrado: {LOG_FILE}")
-    st.stop()
 
-# Mostra as primeiras linhas para referência (opcional)
-st.subheader("Dados brutos")
-st.dataframe(df)
+st.title("Monitoramento de Rotas da API")
 
-# Agrupa por endpoint para contar chamadas e calcular tempo médio
-summary = df.groupby('endpoint').agg(
-    chamadas=('request_id', 'count'),
-    tempo_medio_ms=('duration_ms', 'mean')
-).reset_index()
+leitor = obter_leitor()
+# Lê só as linhas gravadas desde a última atualização
+leitor.atualizar()
 
-# Formata o tempo médio com 2 casas decimais
-summary['tempo_medio_ms'] = summary['tempo_medio_ms'].round(2)
+summary = leitor.resumo_rotas()
+if summary.empty:
+    st.error(f"Nenhum registro encontrado em: {leitor.caminho}")
+    st.stop()
 
 st.subheader("Resumo por rota")
-st.dataframe(summary)
+st.dataframe(summary, hide_index=True)
 
 # Gráfico de barras para chamadas por rota
 st.subheader("Chamadas por rota")
-st.bar_chart(summary.set_index('endpoint')['chamadas'])
+st.bar_chart(summary.set_index('rota')['chamadas'])
+
+# Gráfico de barras para tempo médio e percentis por rota
+st.subheader("Tempo de execução por rota (ms)")
+st.bar_chart(summary.set_index('rota')[['tempo_medio_ms', 'p95_ms']])
+
+serie = leitor.serie_minutos()
+if not serie.empty:
+    rotas = st.multiselect("Rotas", summary['rota'].tolist(), default=summary['rota'].head(5).tolist())
+    serie = serie[serie['rota'].isin(rotas)]
+
+    st.subheader("Chamadas por minuto")
+    st.line_chart(serie.pivot_table(index='minuto', columns='rota', values='chamadas', aggfunc='sum'))
+
+    st.subheader("p95 por minuto (ms)")
+    st.line_chart(serie.pivot_table(index='minuto', columns='rota', values='p95_ms', aggfunc='max'))
 
-# Gráfico de barras para tempo médio por rota
-st.subheader("Tempo médio de execução por rota (ms)")
-st.bar_chart(summary.set_index('endpoint')['tempo_medio_ms'])
+    st.subheader("Erros por minuto")
+    st.bar_chart(serie.groupby('minuto')['erros'].sum())
 
+# Percentis exatos de uma janela, lidos dos segmentos compactados (só os que cruzam a janela)
+JANELAS = {"Última hora": 3600, "Últimas 24 h": 24 * 3600, "Últimos 7 dias": 7 * 24 * 3600,
+           "Últimos 30 dias": 30 * 24 * 3600}
+st.subheader("Resumo por janela de tempo")
+janela = st.selectbox("Janela", list(JANELAS), index=1)
+st.dataframe(resumo_janela(time.time() - JANELAS[janela]), hide_index=True)
 
+# Só as últimas linhas do log, não o arquivo inteiro
+st.subheader(f"Últimas {MAX_LINHAS_BRUTAS} chamadas")
+st.dataframe(leitor.ultimas_linhas(), hide_index=True)
@@ -7,6 +7,8 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import numpy as np
 import joblib
+from book_table import carregar_tabela
+from perfil import etapa
 
 # --- Configuração de Caminhos ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -21,6 +23,9 @@ os.makedirs(MODELS_DIR, exist_ok=True)
 MODEL_FILENAME = 'book_rating_random_forest_model.pkl'
 MODEL_PATH = os.path.join(MODELS_DIR, MODEL_FILENAME)
 
+# Colunas lidas da tabela unificada (Parquet/CSV) para o modelo; a descrição não é carregada
+COLUNAS_ML = ['price_including_tax', 'number_available', 'category', 'review_rating']
+
 # Variáveis globais
 df_books = pd.DataFrame()
 ml_model = None
@@ -42,7 +47,7 @@ def load_data_and_train_model():
             
             # Carrega o CSV para as rotas da API e para obter features_columns_after_ohe
             try:
-                df_books = pd.read_csv(caminho_completo_csv)
+                df_books = carregar_tabela(columns=COLUNAS_ML).astype({'category': 'object'})
                 df_books['price_including_tax'] = pd.to_numeric(df_books['price_including_tax'], errors='coerce')
                 df_books['number_available'] = pd.to_numeric(df_books['number_available'], errors='coerce')
                 df_books['review_rating'] = pd.to_numeric(df_books['review_rating'], errors='coerce')
@@ -80,7 +85,7 @@ def load_data_and_train_model():
 
     # Se o modelo não existe ou falhou ao carregar, carrega os dados e treina um novo modelo
     try:
-        df_books = pd.read_csv(caminho_completo_csv)
+        df_books = carregar_tabela(columns=COLUNAS_ML).astype({'category': 'object'})
         
         df_books['price_including_tax'] = pd.to_numeric(df_books['price_including_tax'], errors='coerce')
         df_books['number_available'] = pd.to_numeric(df_books['number_available'], errors='coerce')
@@ -173,7 +178,8 @@ def predict_book_rating(price_including_tax, number_available, category):
         input_df = pd.DataFrame([input_data])
         
         # Aplica o mesmo One-Hot Encoding da categoria
-        input_df_processed = pd.get_dummies(input_df, columns=['category'], drop_first=True)
+        with etapa('get_dummies'):
+            input_df_processed = pd.get_dummies(input_df, columns=['category'], drop_first=True)
 
         # Alinha as colunas do input_df_processed com as colunas usadas no treinamento do modelo
         final_input_features = pd.DataFrame(0, index=input_df_processed.index, columns=features_columns_after_ohe)
@@ -183,7 +189,8 @@ def predict_book_rating(price_including_tax, number_available, category):
                 final_input_features[col] = input_df_processed[col]
 
         # Realiza a predição
-        prediction = ml_model.predict(final_input_features)[0]
+        with etapa('predict'):
+            prediction = ml_model.predict(final_input_features)[0]
         
         # Arredonda e garante o intervalo de 1 a 5
         predicted_rating = max(1, min(5, round(prediction)))
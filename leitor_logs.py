@@ -0,0 +1,362 @@
+import glob
+import io
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from metricas import quantil_histograma
+from monitorar import CAMPOS_LOG, EXPORTS_DIR, LOG_FILE_PATH
+from segmentos_logs import (
+    LOGS_DIR, caminho_pendente, identidade, ler_csv_logs, ler_segmentos, listar_segmentos, para_epoch,
+    primeiro_registro, tipar_logs
+)
+
+# Estado do leitor (posição no log + resumos agregados), mantido entre execuções do dashboard
+ESTADO_PATH = os.path.join(EXPORTS_DIR, 'dashboard', 'resumo_logs.json')
+
+# Limites (ms) dos buckets de duração; o último bucket (acima de 10 s) fica implícito
+BUCKETS_MS = (0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Minutos mantidos na série temporal e linhas brutas mantidas para exibição
+RETENCAO_MINUTOS = 24 * 60
+MAX_LINHAS_BRUTAS = 200
+# Bytes lidos do log por vez
+TAMANHO_BLOCO = 8 * 1024 * 1024
+
+SEM_HORARIO = ''
+# Colunas dos segmentos usadas nos resumos
+COLUNAS_RESUMO_LOG = ['route', 'status_code', 'duration_ms', 'timestamp']
+
+
+def _novo_resumo():
+    return {'chamadas': 0, 'erros': 0, 'soma_ms': 0.0, 'buckets': [0] * (len(BUCKETS_MS) + 1)}
+
+
+def _somar(resumo, chamadas, erros, soma_ms, buckets):
+    resumo['chamadas'] += int(chamadas)
+    resumo['erros'] += int(erros)
+    resumo['soma_ms'] += float(soma_ms)
+    resumo['buckets'] = [a + int(b) for a, b in zip(resumo['buckets'], buckets)]
+
+
+def _percentil(resumo, q):
+    valor = quantil_histograma(BUCKETS_MS, resumo['buckets'], q)
+    return None if valor is None else round(valor, 2)
+
+
+def consultar_logs(inicio=None, fim=None, rotas=None, colunas=None, caminho=LOG_FILE_PATH,
+                   diretorio_segmentos=LOGS_DIR):
+    """
+    Registros do log com timestamp em [inicio, fim) (epoch, datetime ou texto ISO), no schema
+    tipado de segmentos_logs.tipar_logs: segmentos Parquet que cruzam a janela (só as colunas pedidas),
+    CSVs rotacionados ainda não compactados e o log ativo (limitado pela rotação).
+    """
+    partes = ler_segmentos(inicio, fim, rotas, colunas, diretorio_segmentos)
+    inicio, fim = para_epoch(inicio), para_epoch(fim)
+    for csv_path in sorted(glob.glob(os.path.join(diretorio_segmentos, 'pendente_*.csv'))) + [caminho]:
+        try:
+            # Nenhum registro de um CSV é mais novo que a última gravação do arquivo
+            if inicio is not None and os.path.getmtime(csv_path) < inicio:
+                continue
+            df = ler_csv_logs(csv_path, None if colunas is None else list(dict.fromkeys(colunas + ['timestamp', 'route'])))
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            continue
+        epoch = df['timestamp'].astype('int64')
+        filtro = np.ones(len(df), dtype=bool)
+        if inicio is not None:
+            filtro &= (epoch >= inicio).to_numpy()
+        if fim is not None:
+            filtro &= (epoch < fim).to_numpy()
+        if rotas is not None:
+            filtro &= df['route'].isin(rotas).to_numpy()
+        df = df[filtro]
+        partes.append(df if colunas is None else df[colunas])
+
+    vazio = tipar_logs(pd.DataFrame(columns=CAMPOS_LOG))
+    if colunas is not None:
+        vazio = vazio[colunas]
+    df = pd.concat([vazio] + partes, ignore_index=True)
+    # Categóricas com dicionários diferentes viram object no concat
+    for col in ('endpoint', 'method', 'client_ip', 'route'):
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def resumo_janela(inicio, fim=None, **kwargs):
+    """DataFrame por rota na janela: chamadas, erros, tempo médio e p50/p95/p99 exatos (ms)."""
+    df = consultar_logs(inicio, fim, colunas=['route', 'status_code', 'duration_ms'], **kwargs)
+    colunas = ['rota', 'chamadas', 'erros', 'tempo_medio_ms', 'p50_ms', 'p95_ms', 'p99_ms']
+    if df.empty:
+        return pd.DataFrame(columns=colunas)
+    df['duration_ms'] = df['duration_ms'].astype('float64')
+    df['erro'] = df['status_code'] >= 400
+    grupos = df.groupby('route', observed=True)
+    resumo = grupos.agg(
+        chamadas=('duration_ms', 'size'), erros=('erro', 'sum'), tempo_medio_ms=('duration_ms', 'mean')
+    )
+    percentis = grupos['duration_ms'].quantile([0.5, 0.95, 0.99]).unstack()
+    percentis.columns = ['p50_ms', 'p95_ms', 'p99_ms']
+    resumo = resumo.join(percentis).round(2).reset_index().rename(columns={'route': 'rota'})
+    resumo['rota'] = resumo['rota'].astype(str)
+    return resumo[colunas].sort_values('chamadas', ascending=False, ignore_index=True)
+
+
+class LeitorLogs:
+    """
+    Lê o log de monitoramento de forma incremental: guarda a posição (em bytes) já lida e,
+    a cada atualização, processa só as linhas novas, somando-as em resumos por rota (total)
+    e por rota/minuto (últimos RETENCAO_MINUTOS). Cada resumo guarda chamadas, erros, soma das
+    durações e um histograma de buckets fixos, do qual saem os percentis; resumos somam entre si,
+    então nada precisa ser recalculado a partir do log inteiro.
+    O estado é gravado em ESTADO_PATH: reiniciar o dashboard continua de onde parou.
+    O arquivo é identificado pelo request_id do primeiro registro. Quando o log é rotacionado,
+    o que faltava ler do arquivo anterior vem do CSV pendente em LOGS_DIR ou, se já foi compactado,
+    do segmento Parquet com o mesmo id; arquivos rotacionados que o leitor nunca viu são somados
+    inteiros. Depois a leitura recomeça do início do arquivo novo, mantendo os resumos já somados.
+    """
+
+    def __init__(self, caminho=LOG_FILE_PATH, caminho_estado=ESTADO_PATH, retencao_minutos=RETENCAO_MINUTOS,
+                 max_linhas=MAX_LINHAS_BRUTAS, diretorio_segmentos=LOGS_DIR):
+        self.caminho = caminho
+        self.diretorio_segmentos = diretorio_segmentos
+        self.caminho_estado = caminho_estado
+        self.retencao_minutos = retencao_minutos
+        self.max_linhas = max_linhas
+        self.lock = threading.Lock()
+        self._zerar()
+        self._carregar_estado()
+
+    def _zerar(self):
+        self.identidade = None
+        self.posicao = 0
+        self.linhas_arquivo = 0
+        self.campos = None
+        self.arquivos_lidos = set()
+        self.por_rota = {}
+        self.por_minuto = {}
+        self.linhas = deque(maxlen=self.max_linhas)
+
+    def _carregar_estado(self):
+        try:
+            with open(self.caminho_estado, encoding='utf-8') as arquivo:
+                estado = json.load(arquivo)
+        except (OSError, ValueError):
+            return
+        if estado.get('buckets') != list(BUCKETS_MS):
+            return
+        self.identidade = estado['identidade']
+        self.posicao = estado['posicao']
+        self.linhas_arquivo = estado['linhas_arquivo']
+        self.campos = estado['campos']
+        self.arquivos_lidos = set(estado['arquivos_lidos'])
+        self.por_rota = estado['por_rota']
+        self.por_minuto = {(minuto, rota): resumo for minuto, rota, resumo in estado['por_minuto']}
+        self.linhas.extend(estado['linhas'])
+
+    def _salvar_estado(self):
+        estado = {
+            'buckets': list(BUCKETS_MS),
+            'identidade': self.identidade,
+            'posicao': self.posicao,
+            'linhas_arquivo': self.linhas_arquivo,
+            'campos': self.campos,
+            'arquivos_lidos': sorted(self.arquivos_lidos),
+            'por_rota': self.por_rota,
+            'por_minuto': [[minuto, rota, resumo] for (minuto, rota), resumo in self.por_minuto.items()],
+            'linhas': list(self.linhas)
+        }
+        os.makedirs(os.path.dirname(self.caminho_estado), exist_ok=True)
+        tmp_path = f'{self.caminho_estado}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as arquivo:
+            json.dump(estado, arquivo)
+        os.replace(tmp_path, self.caminho_estado)
+
+    def atualizar(self):
+        """Processa as linhas novas do log. Retorna quantas linhas foram lidas."""
+        with self.lock:
+            try:
+                arquivo = open(self.caminho, 'rb')
+            except FileNotFoundError:
+                return 0
+            lidas = 0
+            with arquivo:
+                # Tamanho e id do arquivo aberto: uma rotação no meio da leitura não mistura arquivos
+                tamanho = os.fstat(arquivo.fileno()).st_size
+                atual = identidade(primeiro_registro(arquivo))
+                if (self.identidade is not None and atual != self.identidade) or tamanho < self.posicao:
+                    if self.identidade is not None and atual != self.identidade:
+                        lidas += self._concluir_rotacionado()
+                        self.arquivos_lidos.add(self.identidade)
+                    self.posicao, self.linhas_arquivo, self.campos = 0, 0, None
+                # Um arquivo só com o cabeçalho ainda não tem id; ele vem com o primeiro registro
+                self.identidade = atual
+                lidas += self._ler_rotacionados(atual)
+
+                arquivo.seek(self.posicao)
+                while True:
+                    bloco = arquivo.read(TAMANHO_BLOCO)
+                    fim = bloco.rfind(b'\n') + 1
+                    if fim == 0:
+                        # Sem linha completa (fim do arquivo ou lote ainda sendo gravado)
+                        break
+                    lidas += self._processar(bloco[:fim])
+                    self.posicao += fim
+                    arquivo.seek(self.posicao)
+
+            if lidas:
+                self._podar()
+                self._salvar_estado()
+            return lidas
+
+    def _concluir_rotacionado(self):
+        # Lê o que faltava do arquivo anterior (self.identidade), já rotacionado para LOGS_DIR
+        pendente = caminho_pendente(self.identidade, self.diretorio_segmentos)
+        try:
+            with open(pendente, 'rb') as arquivo:
+                arquivo.seek(self.posicao)
+                dados = arquivo.read()
+            dados = dados[:dados.rfind(b'\n') + 1]
+            return self._processar(dados) if dados else 0
+        except FileNotFoundError:
+            pass
+
+        for _, _, id_arquivo, caminho in listar_segmentos(self.diretorio_segmentos):
+            if id_arquivo == self.identidade:
+                df = pd.read_parquet(caminho, columns=COLUNAS_RESUMO_LOG)
+                return self._somar_tipado(df.iloc[self.linhas_arquivo:])
+        return 0
+
+    def _ler_rotacionados(self, atual):
+        # Soma os arquivos rotacionados que o leitor nunca leu (várias rotações entre duas atualizações,
+        # ou o histórico todo na primeira execução) e esquece os que a retenção já apagou
+        arquivos = {
+            os.path.basename(caminho)[len('pendente_'):-len('.csv')]: caminho
+            for caminho in glob.glob(os.path.join(self.diretorio_segmentos, 'pendente_*.csv'))
+        }
+        arquivos.update({id_arquivo: caminho for _, _, id_arquivo, caminho in listar_segmentos(self.diretorio_segmentos)})
+        lidas = 0
+        for id_arquivo in sorted(set(arquivos) - self.arquivos_lidos - {atual}):
+            caminho = arquivos[id_arquivo]
+            try:
+                if caminho.endswith('.parquet'):
+                    df = pd.read_parquet(caminho, columns=COLUNAS_RESUMO_LOG)
+                else:
+                    df = ler_csv_logs(caminho)
+            except (OSError, ValueError):
+                continue
+            lidas += self._somar_tipado(df)
+            self.arquivos_lidos.add(id_arquivo)
+        self.arquivos_lidos &= set(arquivos)
+        return lidas
+
+    def _somar_tipado(self, df):
+        # Registros no schema de tipar_logs (horário em UTC, convertido para o minuto local)
+        fuso = datetime.now().astimezone().tzinfo
+        minuto = df['timestamp'].dt.tz_convert(fuso).dt.strftime('%Y-%m-%dT%H:%M')
+        self._somar_registros(minuto, df['route'].astype(str), df['duration_ms'].to_numpy(), df['status_code'])
+        return len(df)
+
+    def _processar(self, dados):
+        if self.campos is None:
+            cabecalho, _, dados = dados.partition(b'\n')
+            self.campos = cabecalho.decode('utf-8').strip().split(',')
+        if not dados:
+            return 0
+        self.linhas_arquivo += dados.count(b'\n')
+
+        # Só as colunas usadas nos resumos; linhas com menos colunas que o cabeçalho
+        # (versões antigas do log) ficam com NaN no resto
+        texto = {c: str for c in ('endpoint', 'route', 'timestamp') if c in self.campos}
+        df = pd.read_csv(io.BytesIO(dados), header=None, names=self.campos, dtype=texto, on_bad_lines='skip',
+                         usecols=[c for c in ('endpoint', 'status_code', 'duration_ms', 'route', 'timestamp')
+                                  if c in self.campos])
+        rota = df['route'].fillna(df['endpoint']) if 'route' in df.columns else df['endpoint']
+        # Minuto no formato AAAA-MM-DDTHH:MM (prefixo do timestamp ISO); vazio para logs sem horário
+        if 'timestamp' in df.columns:
+            minuto = df['timestamp'].str.slice(0, 16).fillna(SEM_HORARIO)
+        else:
+            minuto = pd.Series(SEM_HORARIO, index=df.index)
+        duracao = pd.to_numeric(df['duration_ms'], errors='coerce').fillna(0.0).to_numpy()
+        self._somar_registros(minuto, rota, duracao, df['status_code'])
+
+        # Linhas brutas: só as últimas max_linhas do bloco, lidas como texto
+        partes = dados.rsplit(b'\n', self.max_linhas + 1)
+        finais = b'\n'.join(partes[1:] if len(partes) > self.max_linhas + 1 else partes)
+        recentes = pd.read_csv(io.BytesIO(finais), header=None, names=self.campos, dtype=str, on_bad_lines='skip')
+        recentes = recentes[[c for c in CAMPOS_LOG if c in recentes.columns]].astype(object)
+        self.linhas.extend(recentes.where(recentes.notna(), None).to_dict(orient='records'))
+        return len(df)
+
+    def _somar_registros(self, minuto, rota, duracao, status):
+        erro = (pd.to_numeric(status, errors='coerce').fillna(500) >= 400).to_numpy()
+        bucket = np.searchsorted(BUCKETS_MS, duracao, side='left')
+
+        # Soma por grupo (minuto, rota) com bincount, sem groupby em Python
+        grupo, chaves = pd.MultiIndex.from_arrays([minuto, rota.fillna('')]).factorize()
+        total_grupos, total_buckets = len(chaves), len(BUCKETS_MS) + 1
+        chamadas = np.bincount(grupo, minlength=total_grupos)
+        erros = np.bincount(grupo, weights=erro, minlength=total_grupos)
+        soma_ms = np.bincount(grupo, weights=duracao, minlength=total_grupos)
+        buckets = np.bincount(grupo * total_buckets + bucket, minlength=total_grupos * total_buckets)
+        buckets = buckets.reshape(total_grupos, total_buckets)
+        for g, (minuto_grupo, rota_grupo) in enumerate(chaves):
+            _somar(self.por_rota.setdefault(rota_grupo, _novo_resumo()),
+                   chamadas[g], erros[g], soma_ms[g], buckets[g])
+            if minuto_grupo != SEM_HORARIO:
+                _somar(self.por_minuto.setdefault((minuto_grupo, rota_grupo), _novo_resumo()),
+                       chamadas[g], erros[g], soma_ms[g], buckets[g])
+
+    def _podar(self):
+        # Mantém só os últimos retencao_minutos minutos com registros
+        minutos = sorted({minuto for minuto, _ in self.por_minuto})
+        if len(minutos) > self.retencao_minutos:
+            corte = minutos[-self.retencao_minutos]
+            self.por_minuto = {chave: r for chave, r in self.por_minuto.items() if chave[0] >= corte}
+
+    def resumo_rotas(self):
+        """DataFrame por rota: chamadas, erros, tempo médio e p50/p95/p99 (ms)."""
+        with self.lock:
+            itens = [
+                {
+                    'rota': rota,
+                    'chamadas': r['chamadas'],
+                    'erros': r['erros'],
+                    'tempo_medio_ms': round(r['soma_ms'] / r['chamadas'], 2) if r['chamadas'] else None,
+                    'p50_ms': _percentil(r, 0.5),
+                    'p95_ms': _percentil(r, 0.95),
+                    'p99_ms': _percentil(r, 0.99)
+                }
+                for rota, r in self.por_rota.items()
+            ]
+        colunas = ['rota', 'chamadas', 'erros', 'tempo_medio_ms', 'p50_ms', 'p95_ms', 'p99_ms']
+        return pd.DataFrame(itens, columns=colunas).sort_values('chamadas', ascending=False, ignore_index=True)
+
+    def serie_minutos(self, rotas=None):
+        """DataFrame por minuto e rota: chamadas, erros, tempo médio e p95 (ms)."""
+        with self.lock:
+            itens = [
+                {
+                    'minuto': minuto,
+                    'rota': rota,
+                    'chamadas': r['chamadas'],
+                    'erros': r['erros'],
+                    'tempo_medio_ms': r['soma_ms'] / r['chamadas'],
+                    'p95_ms': _percentil(r, 0.95)
+                }
+                for (minuto, rota), r in self.por_minuto.items()
+                if rotas is None or rota in rotas
+            ]
+        df = pd.DataFrame(itens, columns=['minuto', 'rota', 'chamadas', 'erros', 'tempo_medio_ms', 'p95_ms'])
+        df['minuto'] = pd.to_datetime(df['minuto'])
+        return df.sort_values('minuto', ignore_index=True)
+
+    def ultimas_linhas(self):
+        """DataFrame com as últimas linhas brutas do log (mais recentes primeiro)."""
+        with self.lock:
+            linhas = list(self.linhas)
+        return pd.DataFrame(linhas[::-1], columns=CAMPOS_LOG)
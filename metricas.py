@@ -0,0 +1,353 @@
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl  # serializa a soma dos snapshots de processos encerrados entre workers (POSIX)
+except ImportError:
+    fcntl = None
+
+# Diretório onde cada processo (worker) grava o snapshot das suas métricas
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS_DIR = os.path.join(BASE_DIR, 'exports', 'metrics')
+
+# Limites (segundos) dos buckets do histograma de latência; o último bucket (+Inf) fica implícito
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Intervalo (segundos) entre gravações do snapshot do processo
+INTERVALO_SNAPSHOT = 1.0
+QUANTIS = (0.5, 0.95, 0.99)
+# Snapshot com a soma dos contadores de todos os processos já encerrados
+ARQUIVO_ENCERRADOS = 'encerrados.json'
+
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escapar(valor):
+    # Escape dos valores de rótulo do formato texto do Prometheus
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _somar(snapshots):
+    """Soma snapshots no formato de exportar() em dicionários por chave (tupla)."""
+    requisicoes, latencias, etapas, em_andamento = {}, {}, {}, {}
+    for snapshot in snapshots:
+        for rota, metodo, status, n in snapshot['requisicoes']:
+            requisicoes[(rota, metodo, status)] = requisicoes.get((rota, metodo, status), 0) + n
+        for rota, metodo, buckets, soma in snapshot['latencias']:
+            atual = latencias.setdefault((rota, metodo), {'buckets': [0] * len(buckets), 'soma': 0.0})
+            atual['buckets'] = [a + b for a, b in zip(atual['buckets'], buckets)]
+            atual['soma'] += soma
+        for rota, nome, n, soma in snapshot.get('etapas', []):
+            atual = etapas.setdefault((rota, nome), [0, 0.0])
+            atual[0] += n
+            atual[1] += soma
+        for rota, n in snapshot.get('em_andamento', {}).items():
+            em_andamento[rota] = em_andamento.get(rota, 0) + n
+    return requisicoes, latencias, etapas, em_andamento
+
+
+def quantil_histograma(limites, contagens, q):
+    """
+    Estima o quantil q a partir das contagens por bucket (não acumuladas, a última é o +Inf),
+    com interpolação linear dentro do bucket, como o histogram_quantile do Prometheus.
+    """
+    total = sum(contagens)
+    if total == 0:
+        return None
+    alvo = q * total
+    acumulado = 0
+    for i, contagem in enumerate(contagens):
+        if acumulado + contagem >= alvo and contagem:
+            if i == len(limites):
+                return limites[-1]
+            inferior = limites[i - 1] if i else 0.0
+            return inferior + (limites[i] - inferior) * (alvo - acumulado) / contagem
+        acumulado += contagem
+    return limites[-1]
+
+
+class RegistroMetricas:
+    """
+    Métricas das rotas em memória: requisições por rota/método/status, histograma de latência
+    (buckets fixos) por rota/método, tempo total por etapa (perfil.etapa) e requisições em andamento por rota.
+    Cada processo grava periodicamente um snapshot em METRICS_DIR/<pid>.json (troca atômica);
+    a rota de métricas soma os snapshots de todos os workers. Os snapshots de workers já encerrados
+    são somados em METRICS_DIR/encerrados.json e apagados, então os contadores nunca voltam atrás
+    (nem quando o Gunicorn troca um worker) e a pasta só guarda um arquivo por processo vivo;
+    as requisições em andamento só contam processos vivos.
+    """
+
+    def __init__(self, diretorio=METRICS_DIR, buckets=BUCKETS_LATENCIA, intervalo=INTERVALO_SNAPSHOT):
+        self.diretorio = diretorio
+        self.buckets = tuple(buckets)
+        self.intervalo = intervalo
+        self.lock = threading.Lock()
+        self.pid = None
+        self.id_processo = None
+        self._zerar()
+
+    def _zerar(self):
+        self.requisicoes = {}
+        self.latencias = {}
+        self.etapas = {}
+        self.em_andamento = {}
+        self.versao = 0
+        self.versao_salva = 0
+
+    def _iniciar(self):
+        # Um registro e uma thread de gravação por processo (o fork copia os contadores do pai)
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self._zerar()
+            self.pid = os.getpid()
+            self.id_processo = uuid.uuid4().hex
+        try:
+            # Um snapshot com o pid deste processo é de um processo encerrado que teve o pid reutilizado
+            self.recolher_encerrados()
+        except OSError:
+            pass
+        threading.Thread(target=self._loop, name='metricas', daemon=True).start()
+
+    def inicio(self, rota):
+        if self.pid != os.getpid():
+            self._iniciar()
+        with self.lock:
+            self.em_andamento[rota] = self.em_andamento.get(rota, 0) + 1
+            self.versao += 1
+
+    def fim(self, rota, metodo, status, duracao, etapas=None):
+        """Registra uma requisição concluída (duração e etapas em segundos)."""
+        chave = (rota, metodo)
+        with self.lock:
+            self.em_andamento[rota] -= 1
+            chave_status = (rota, metodo, str(status))
+            self.requisicoes[chave_status] = self.requisicoes.get(chave_status, 0) + 1
+            histograma = self.latencias.get(chave)
+            if histograma is None:
+                histograma = self.latencias[chave] = {'buckets': [0] * (len(self.buckets) + 1), 'soma': 0.0}
+            histograma['buckets'][bisect.bisect_left(self.buckets, duracao)] += 1
+            histograma['soma'] += duracao
+            for nome, duracao_etapa in (etapas or {}).items():
+                acumulado = self.etapas.setdefault((rota, nome), [0, 0.0])
+                acumulado[0] += 1
+                acumulado[1] += duracao_etapa
+            self.versao += 1
+
+    def exportar(self):
+        """Snapshot serializável em JSON das métricas deste processo."""
+        with self.lock:
+            return {
+                'pid': os.getpid(),
+                'processo': self.id_processo,
+                'buckets': list(self.buckets),
+                'requisicoes': [[*chave, n] for chave, n in self.requisicoes.items()],
+                'latencias': [[*chave, h['buckets'][:], h['soma']] for chave, h in self.latencias.items()],
+                'etapas': [[*chave, n, soma] for chave, (n, soma) in self.etapas.items()],
+                'em_andamento': dict(self.em_andamento)
+            }
+
+    def salvar(self):
+        """Grava o snapshot deste processo (arquivo temporário + troca, leitores nunca veem meio arquivo)."""
+        versao = self.versao
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = os.path.join(self.diretorio, f'{os.getpid()}.json')
+        tmp_path = f'{caminho}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as arquivo:
+            json.dump(self.exportar(), arquivo)
+        os.replace(tmp_path, caminho)
+        self.versao_salva = versao
+
+    def _loop(self):
+        while True:
+            time.sleep(self.intervalo)
+            if self.versao != self.versao_salva:
+                try:
+                    self.salvar()
+                except OSError:
+                    pass
+
+    @contextmanager
+    def _trava(self, modo):
+        # Trava entre processos da pasta de métricas (compartilhada para ler, exclusiva para somar encerrados)
+        os.makedirs(self.diretorio, exist_ok=True)
+        with open(os.path.join(self.diretorio, '.trava'), 'a') as trava:
+            if fcntl is not None:
+                fcntl.flock(trava, modo)
+            yield
+
+    def _snapshots_processos(self):
+        """Snapshots (pid, encerrado, snapshot) dos outros processos, sem o deste."""
+        snapshots = []
+        for caminho in glob.glob(os.path.join(self.diretorio, '*.json')):
+            try:
+                pid = int(os.path.basename(caminho).split('.')[0])
+                with open(caminho, encoding='utf-8') as arquivo:
+                    snapshot = json.load(arquivo)
+            except (OSError, ValueError):
+                continue
+            if pid == os.getpid():
+                if snapshot.get('processo') == self.id_processo:
+                    continue
+                encerrado = True
+            else:
+                encerrado = not _processo_vivo(pid)
+            snapshots.append((caminho, encerrado, snapshot))
+        return snapshots
+
+    def _ler_encerrados(self):
+        try:
+            with open(os.path.join(self.diretorio, ARQUIVO_ENCERRADOS), encoding='utf-8') as arquivo:
+                snapshot = json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+        return snapshot if tuple(snapshot.get('buckets', ())) == self.buckets else None
+
+    def recolher_encerrados(self):
+        """
+        Soma os snapshots de processos que já terminaram em METRICS_DIR/encerrados.json e apaga
+        os arquivos deles. Retorna quantos snapshots foram recolhidos.
+        """
+        if fcntl is None:
+            return 0
+        with self._trava(fcntl.LOCK_EX):
+            encerrados = [(caminho, snapshot) for caminho, encerrado, snapshot in self._snapshots_processos()
+                          if encerrado]
+            if not encerrados:
+                return 0
+            anterior = self._ler_encerrados()
+            somados = [] if anterior is None else [anterior]
+            somados += [snapshot for _, snapshot in encerrados
+                        if tuple(snapshot.get('buckets', ())) == self.buckets]
+            requisicoes, latencias, etapas, _ = _somar(somados)
+            total = {
+                'buckets': list(self.buckets),
+                'requisicoes': [[*chave, n] for chave, n in requisicoes.items()],
+                'latencias': [[*chave, h['buckets'], h['soma']] for chave, h in latencias.items()],
+                'etapas': [[*chave, n, soma] for chave, (n, soma) in etapas.items()]
+            }
+            caminho_encerrados = os.path.join(self.diretorio, ARQUIVO_ENCERRADOS)
+            tmp_path = f'{caminho_encerrados}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as arquivo:
+                json.dump(total, arquivo)
+            os.replace(tmp_path, caminho_encerrados)
+            for caminho, _ in encerrados:
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
+            return len(encerrados)
+
+    def agregar(self):
+        """
+        Soma os snapshots de todos os processos (o deste processo vem direto da memória)
+        e o dos processos encerrados.
+        """
+        snapshots = [self.exportar()]
+        with self._trava(fcntl.LOCK_SH if fcntl is not None else None):
+            processos = self._snapshots_processos()
+            encerrados = self._ler_encerrados()
+        for _, encerrado, snapshot in processos:
+            if tuple(snapshot.get('buckets', ())) != self.buckets:
+                continue
+            if encerrado:
+                snapshot['em_andamento'] = {}
+            snapshots.append(snapshot)
+        requisicoes, latencias, etapas, em_andamento = _somar(snapshots + ([encerrados] if encerrados else []))
+        if any(encerrado for _, encerrado, _ in processos):
+            try:
+                self.recolher_encerrados()
+            except OSError:
+                pass
+        return {'processos': len(snapshots), 'requisicoes': requisicoes,
+                'latencias': latencias, 'etapas': etapas, 'em_andamento': em_andamento}
+
+    def resumo(self, agregado=None):
+        """Por rota/método: total de requisições, latência média, p50/p95/p99 estimados e média por etapa (ms)."""
+        agregado = agregado or self.agregar()
+        rotas = []
+        for (rota, metodo), histograma in sorted(agregado['latencias'].items()):
+            total = sum(histograma['buckets'])
+            status = {s: n for (r, m, s), n in agregado['requisicoes'].items() if r == rota and m == metodo}
+            item = {
+                'endpoint': rota,
+                'method': metodo,
+                'requests': total,
+                'status': status,
+                'mean_ms': round(histograma['soma'] / total * 1000, 3) if total else None
+            }
+            for q in QUANTIS:
+                valor = quantil_histograma(self.buckets, histograma['buckets'], q)
+                item[f'p{int(q * 100)}_ms'] = None if valor is None else round(valor * 1000, 3)
+            item['stages_mean_ms'] = {
+                nome: round(soma / n * 1000, 3) for (r, nome), (n, soma) in agregado['etapas'].items() if r == rota
+            }
+            rotas.append(item)
+        return {'workers': agregado['processos'], 'in_flight': agregado['em_andamento'], 'endpoints': rotas}
+
+    def texto_prometheus(self, agregado=None):
+        """Métricas agregadas no formato texto do Prometheus."""
+        agregado = agregado or self.agregar()
+
+        def rotulos(**valores):
+            return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in valores.items()) + '}'
+
+        linhas = [
+            '# HELP api_requests_total Requisições atendidas por rota, método e status.',
+            '# TYPE api_requests_total counter'
+        ]
+        for (rota, metodo, status), n in sorted(agregado['requisicoes'].items()):
+            linhas.append(f'api_requests_total{rotulos(endpoint=rota, method=metodo, status=status)} {n}')
+
+        linhas += [
+            '# HELP api_request_duration_seconds Latência das requisições por rota e método.',
+            '# TYPE api_request_duration_seconds histogram'
+        ]
+        for (rota, metodo), histograma in sorted(agregado['latencias'].items()):
+            acumulado = 0
+            for limite, contagem in zip(list(self.buckets) + ['+Inf'], histograma['buckets']):
+                acumulado += contagem
+                le = limite if limite == '+Inf' else repr(float(limite))
+                linhas.append(
+                    f'api_request_duration_seconds_bucket{rotulos(endpoint=rota, method=metodo, le=le)} {acumulado}'
+                )
+            linhas.append(f'api_request_duration_seconds_sum{rotulos(endpoint=rota, method=metodo)} {histograma["soma"]!r}')
+            linhas.append(f'api_request_duration_seconds_count{rotulos(endpoint=rota, method=metodo)} {acumulado}')
+
+        linhas += [
+            '# HELP api_stage_duration_seconds Tempo gasto em cada etapa das requisições, por rota.',
+            '# TYPE api_stage_duration_seconds summary'
+        ]
+        for (rota, nome), (n, soma) in sorted(agregado['etapas'].items()):
+            linhas.append(f'api_stage_duration_seconds_sum{rotulos(endpoint=rota, stage=nome)} {soma!r}')
+            linhas.append(f'api_stage_duration_seconds_count{rotulos(endpoint=rota, stage=nome)} {n}')
+
+        linhas += [
+            '# HELP api_requests_in_flight Requisições em andamento por rota.',
+            '# TYPE api_requests_in_flight gauge'
+        ]
+        for rota, n in sorted(agregado['em_andamento'].items()):
+            linhas.append(f'api_requests_in_flight{rotulos(endpoint=rota)} {n}')
+
+        linhas += [
+            '# HELP api_metrics_workers Processos cujas métricas foram somadas.',
+            '# TYPE api_metrics_workers gauge',
+            f'api_metrics_workers {agregado["processos"]}'
+        ]
+        return '\n'.join(linhas) + '\n'
+
+
+METRICAS = RegistroMetricas()
@@ -3,9 +3,25 @@ import uuid
 import traceback
 import logging
 import csv
+import io
 import os
+import queue
+import threading
+import atexit
+from datetime import datetime
 from functools import wraps
-from flask import request
+from flask import make_response, request
+
+from metricas import METRICAS
+from segmentos_logs import (
+    LOGS_DIR, RETENCAO_DIAS, aplicar_retencao, caminho_pendente, compactar_pendentes, identidade, primeiro_registro
+)
+from perfil import AMOSTRADOR, CABECALHO_PERFIL, encerrar_etapas, etapas_atuais, iniciar_etapas, server_timing
+
+try:
+    import fcntl  # trava do arquivo entre processos (POSIX)
+except ImportError:
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -16,16 +32,209 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 EXPORTS_DIR = os.path.join(BASE_DIR, 'exports')
 LOG_FILE_PATH = os.path.join(EXPORTS_DIR, 'logs_monitoramento.csv')
 
+# route é o padrão da rota (ex. /api/v1/books/<string:universal_product_code>) e timestamp o horário local
+# (ISO, com fuso) em que a requisição terminou; ambos ficam no fim para leitores posicionais de arquivos antigos
+CAMPOS_LOG = ["request_id", "endpoint", "method", "client_ip", "status_code", "duration_ms", "route", "timestamp"]
+CABECALHO_LOG = ','.join(CAMPOS_LOG) + '\n'
+
+# Fila de registros pendentes: tamanho máximo, tamanho do lote e intervalo máximo (s) entre gravações
+MAX_FILA = 10000
+TAMANHO_LOTE = 256
+INTERVALO_GRAVACAO = 1.0
+
+# O log ativo é rotacionado ao passar deste tamanho (bytes) ou quando o primeiro registro tem mais que
+# esta idade (segundos); o arquivo rotacionado é compactado em Parquet em LOGS_DIR (segmentos_logs.py)
+MAX_BYTES_LOG = 16 * 1024 * 1024
+MAX_IDADE_LOG = 24 * 3600
+
 # Garante que a pasta 'exports/' exista
 os.makedirs(EXPORTS_DIR, exist_ok=True)
 
-# Escreve o cabeçalho no arquivo CSV se ainda não existir
-if not os.path.exists(LOG_FILE_PATH):
-    with open(LOG_FILE_PATH, mode='w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=[
-            "request_id", "endpoint", "method", "client_ip", "status_code", "duration_ms"
-        ])
-        writer.writeheader()
+
+class GravadorLogs:
+    """
+    Grava os registros de monitoramento fora do caminho da requisição: cada chamada só coloca
+    o registro numa fila limitada e uma thread grava em lotes (por tamanho ou por tempo).
+    Com a fila cheia o registro é descartado e contado, sem bloquear a requisição.
+    Cada lote é gravado com uma única escrita em modo append, com o arquivo travado (flock),
+    então workers diferentes não intercalam linhas no mesmo arquivo.
+    Ao passar de max_bytes, quando o primeiro registro fica mais velho que max_idade ou quando o arquivo
+    tem outro cabeçalho (colunas de uma versão anterior), o log é rotacionado: renomeado para
+    LOGS_DIR/pendente_<id>.csv (id = request_id do primeiro registro) e recomeçado; a mesma thread compacta o arquivo rotacionado em
+    Parquet e apaga os segmentos além da retenção.
+    """
+
+    def __init__(self, caminho=LOG_FILE_PATH, max_fila=MAX_FILA, tamanho_lote=TAMANHO_LOTE,
+                 intervalo=INTERVALO_GRAVACAO, max_bytes=MAX_BYTES_LOG, max_idade=MAX_IDADE_LOG,
+                 diretorio_segmentos=LOGS_DIR, retencao_dias=RETENCAO_DIAS):
+        self.caminho = caminho
+        self.max_bytes = max_bytes
+        self.max_idade = max_idade
+        self.diretorio_segmentos = diretorio_segmentos
+        self.retencao_dias = retencao_dias
+        self.max_fila = max_fila
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.gravados = 0
+        self.descartados = 0
+        self.lotes = 0
+        self.erros = 0
+        self.rotacoes = 0
+        self.cabecalho_verificado = False
+        self.compactar = False
+        self.pid = None
+        self.fila = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def _iniciar(self):
+        # Fila e thread são criadas por processo: threads não sobrevivem ao fork dos workers
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.fila = queue.Queue(maxsize=self.max_fila)
+            self.thread = threading.Thread(target=self._loop, name='gravador-logs', daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+    def registrar(self, registro):
+        """Enfileira um registro (dicionário com CAMPOS_LOG); descarta se a fila estiver cheia."""
+        if self.pid != os.getpid():
+            self._iniciar()
+        try:
+            self.fila.put_nowait(registro)
+        except queue.Full:
+            self.descartados += 1
+
+    def _loop(self):
+        fila = self.fila
+        encerrar = False
+        while not encerrar:
+            lote = [fila.get()]
+            limite = time.monotonic() + self.intervalo
+            while len(lote) < self.tamanho_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(fila.get(timeout=restante))
+                except queue.Empty:
+                    break
+            # None na fila (enviado por encerrar()) grava o que já chegou e termina a thread
+            if None in lote:
+                encerrar = True
+                lote = [registro for registro in lote if registro is not None]
+            if lote:
+                self.gravar(lote)
+
+    def encerrar(self, timeout=5.0):
+        """Grava os registros pendentes e termina a thread (chamado ao encerrar o processo)."""
+        if self.pid != os.getpid():
+            return
+        try:
+            self.fila.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+    def gravar(self, lote):
+        """Grava um lote de registros no CSV (com o cabeçalho, se o arquivo ainda estiver vazio)."""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CAMPOS_LOG, lineterminator='\n')
+        for registro in lote:
+            writer.writerow(registro)
+        linhas = buffer.getvalue().encode('utf-8')
+
+        try:
+            while not self._anexar(linhas):
+                pass
+            self.gravados += len(lote)
+            self.lotes += 1
+        except Exception as csv_err:
+            self.erros += 1
+            logger.error(f"[ERRO] Falha ao salvar log em CSV: {csv_err}")
+
+        if self.compactar:
+            self.compactar = False
+            try:
+                compactar_pendentes(self.diretorio_segmentos)
+                aplicar_retencao(self.retencao_dias, self.diretorio_segmentos)
+            except Exception as compactar_err:
+                self.erros += 1
+                logger.error(f"[ERRO] Falha ao compactar log rotacionado: {compactar_err}")
+
+    def _anexar(self, linhas):
+        """
+        Anexa as linhas com o arquivo travado. Retorna False se o arquivo aberto deixou de ser o do
+        caminho (rotacionado por este ou por outro processo): quem chama tenta de novo.
+        """
+        with open(self.caminho, mode='ab') as arquivo:
+            if fcntl is not None:
+                fcntl.flock(arquivo, fcntl.LOCK_EX)
+            try:
+                inode = os.fstat(arquivo.fileno()).st_ino
+                try:
+                    if os.stat(self.caminho).st_ino != inode:
+                        return False
+                except FileNotFoundError:
+                    return False
+                tamanho = arquivo.seek(0, os.SEEK_END)
+                if tamanho == 0:
+                    linhas = CABECALHO_LOG.encode('utf-8') + linhas
+                else:
+                    with open(self.caminho, 'rb') as leitura:
+                        primeiro = primeiro_registro(leitura)
+                        leitura.seek(0)
+                        cabecalho = leitura.readline().decode('utf-8', errors='replace')
+                    if not self.cabecalho_verificado:
+                        if cabecalho != CABECALHO_LOG:
+                            self._rotacionar(primeiro, "colunas antigas")
+                            return False
+                    if tamanho >= self.max_bytes:
+                        self._rotacionar(primeiro, f"{tamanho} bytes")
+                        return False
+                    if time.time() - _horario(primeiro, time.time()) >= self.max_idade:
+                        self._rotacionar(primeiro, "idade máxima")
+                        return False
+                self.cabecalho_verificado = True
+                arquivo.write(linhas)
+                arquivo.flush()
+                return True
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+    def _rotacionar(self, primeiro, motivo):
+        # Chamado com o arquivo travado: renomeia o log ativo; a compactação acontece fora da trava
+        os.makedirs(self.diretorio_segmentos, exist_ok=True)
+        pendente = caminho_pendente(identidade(primeiro) or uuid.uuid4(), self.diretorio_segmentos)
+        os.replace(self.caminho, pendente)
+        self.rotacoes += 1
+        self.compactar = True
+        logger.info(f"Log de monitoramento rotacionado ({motivo}): {pendente}")
+
+    def estatisticas(self):
+        return {
+            "written": self.gravados,
+            "dropped": self.descartados,
+            "batches": self.lotes,
+            "errors": self.erros,
+            "rotations": self.rotacoes,
+            "queued": self.fila.qsize() if self.fila is not None and self.pid == os.getpid() else 0
+        }
+
+
+def _horario(registro, padrao):
+    # Epoch do timestamp de um registro; `padrao` se o registro não tiver horário (logs antigos)
+    try:
+        return datetime.fromisoformat(registro['timestamp']).timestamp()
+    except (TypeError, KeyError, ValueError):
+        return padrao
+
+
+GRAVADOR_LOGS = GravadorLogs()
+atexit.register(GRAVADOR_LOGS.encerrar)
+
 
 def monitor_api_call(func):
     @wraps(func)
@@ -37,15 +246,19 @@ def monitor_api_call(func):
         method = request.method
         client_ip = request.remote_addr
         status_code = 500
+        # Rota com os parâmetros (ex. /api/v1/books/<string:universal_product_code>) para as métricas
+        rota = request.url_rule.rule if request.url_rule is not None else path
+        METRICAS.inicio(rota)
+        token_etapas = iniciar_etapas()
+        perfil = AMOSTRADOR.decidir(request.headers.get(CABECALHO_PERFIL))
+        if perfil:
+            AMOSTRADOR.iniciar()
 
         try:
-            response = func(*args, **kwargs)
-
-            if hasattr(response, 'status_code'):
-                status_code = response.status_code
-            else:
-                status_code = 200
-
+            response = make_response(func(*args, **kwargs))
+            status_code = response.status_code
+            # Tempo de cada etapa medida com perfil.etapa() e o total, visíveis no DevTools do navegador
+            response.headers['Server-Timing'] = server_timing(etapas_atuais(), time.perf_counter() - start_time)
             return response
 
         except Exception as e:
@@ -66,6 +279,8 @@ def monitor_api_call(func):
         finally:
             end_time = time.perf_counter()
             duration_ms = (end_time - start_time) * 1000
+            etapas = encerrar_etapas(token_etapas)
+            METRICAS.fim(rota, method, status_code, end_time - start_time, etapas)
 
             log_data = {
                 "request_id": request_id,
@@ -73,21 +288,25 @@ def monitor_api_call(func):
                 "method": method,
                 "client_ip": client_ip,
                 "status_code": status_code,
-                "duration_ms": round(duration_ms, 2)
+                "duration_ms": round(duration_ms, 2),
+                "route": rota,
+                "timestamp": datetime.now().astimezone().isoformat(timespec='seconds')
             }
 
-            # Salva em CSV
-            try:
-                with open(LOG_FILE_PATH, mode='a', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.DictWriter(csvfile, fieldnames=log_data.keys())
-                    writer.writerow(log_data)
-            except Exception as csv_err:
-                logger.error(f"[ERRO] Falha ao salvar log em CSV: {csv_err}")
+            # Enfileira para o CSV (gravado em lotes pelo GRAVADOR_LOGS)
+            GRAVADOR_LOGS.registrar(log_data)
+            # As etapas vão só para o log do terminal; o CSV mantém as colunas de CAMPOS_LOG
+            log_data = {**log_data, "stages_ms": {nome: round(d * 1000, 2) for nome, d in etapas.items()}}
+
+            if perfil:
+                caminho_perfil = AMOSTRADOR.concluir(perfil, duration_ms, rota, request_id)
+                if caminho_perfil:
+                    logger.info(f"[PERFIL] {path} ({duration_ms:.0f} ms): {caminho_perfil}")
 
-            # Log no terminal (opcional)
+            # Log no terminal (chamadas bem-sucedidas só em nível DEBUG, fora do caminho quente)
             if status_code >= 400:
                 logger.warning(f"[AVISO] Chamada com erro: {path}", extra={'extra_data': log_data})
-            else:
-                logger.info(f"[INFO] Chamada bem-sucedida: {path}", extra={'extra_data': log_data})
+            elif logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"[INFO] Chamada bem-sucedida: {path}", extra={'extra_data': log_data})
 
     return wrapper
@@ -0,0 +1,193 @@
+import contextvars
+import glob
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Pasta onde os perfis (pilhas no formato "folded", pronto para flame graph) são gravados
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILES_DIR = os.path.join(BASE_DIR, 'exports', 'profiles')
+
+# Fração das requisições amostradas pelo profiler (0 desativa); só as lentas são gravadas
+TAXA_AMOSTRAGEM = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+# Duração (ms) a partir da qual uma requisição amostrada tem o perfil gravado
+LIMITE_LENTO_MS = float(os.environ.get('PROFILE_SLOW_MS', 500))
+# Permite forçar o perfil de uma requisição com o cabeçalho X-Profile: 1
+PERMITIR_CABECALHO = os.environ.get('PROFILE_ALLOW_HEADER', '0') == '1'
+CABECALHO_PERFIL = 'X-Profile'
+
+# Intervalo (segundos) entre amostras das pilhas e quantidade máxima de perfis mantidos na pasta
+INTERVALO_AMOSTRA = 0.005
+MAX_PERFIS = 200
+
+# Etapas da requisição em andamento (None fora de uma requisição monitorada)
+_etapas = contextvars.ContextVar('etapas', default=None)
+
+
+@contextmanager
+def etapa(nome):
+    """
+    Mede uma etapa da requisição em andamento, como bloco `with etapa('to_dict'):`
+    ou como decorador `@etapa('predict')`. Fora de uma requisição monitorada não faz nada.
+    Etapas aninhadas são medidas separadamente (a de fora inclui o tempo da de dentro).
+    """
+    registro = _etapas.get()
+    if registro is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro.append((nome, time.perf_counter() - inicio))
+
+
+def iniciar_etapas():
+    """Começa a coletar as etapas da requisição; o token devolvido vai para encerrar_etapas()."""
+    return _etapas.set([])
+
+
+def etapas_atuais():
+    """Duração (segundos) de cada etapa já concluída, somando as repetidas, na ordem de conclusão."""
+    duracoes = {}
+    for nome, duracao in _etapas.get() or ():
+        duracoes[nome] = duracoes.get(nome, 0.0) + duracao
+    return duracoes
+
+
+def encerrar_etapas(token):
+    duracoes = etapas_atuais()
+    _etapas.reset(token)
+    return duracoes
+
+
+def _token(nome):
+    # Nome de métrica do Server-Timing: só caracteres de token HTTP
+    return re.sub(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]", '_', nome) or 'etapa'
+
+
+def server_timing(duracoes, total):
+    """Valor do cabeçalho Server-Timing (durações em ms) com as etapas e o total da requisição."""
+    partes = [f'{_token(nome)};dur={duracao * 1000:.2f}' for nome, duracao in duracoes.items()]
+    partes.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(partes)
+
+
+def _pilha(frame):
+    # Pilha da thread no formato "folded": da chamada mais externa para a mais interna, separadas por ';'
+    quadros = []
+    while frame is not None:
+        codigo = frame.f_code
+        quadros.append(f'{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{frame.f_lineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(quadros))
+
+
+class AmostradorPilhas:
+    """
+    Profiler por amostragem: uma thread (uma por processo, criada na primeira requisição perfilada)
+    lê a pilha das threads registradas a cada INTERVALO_AMOSTRA segundos com sys._current_frames()
+    e conta cada pilha. Sem requisições perfiladas a thread fica parada, sem custo.
+    O resultado é gravado no formato "folded" (`pilha contagem` por linha), aceito pelo
+    flamegraph.pl e pelo speedscope.
+    """
+
+    def __init__(self, diretorio=PROFILES_DIR, intervalo=INTERVALO_AMOSTRA, taxa=TAXA_AMOSTRAGEM,
+                 limite_lento_ms=LIMITE_LENTO_MS, permitir_cabecalho=PERMITIR_CABECALHO, max_perfis=MAX_PERFIS):
+        self.diretorio = diretorio
+        self.intervalo = intervalo
+        self.taxa = taxa
+        self.limite_lento_ms = limite_lento_ms
+        self.permitir_cabecalho = permitir_cabecalho
+        self.max_perfis = max_perfis
+        self.ativos = {}
+        self.gravados = 0
+        self.pid = None
+        self.acordar = threading.Event()
+        self.lock = threading.Lock()
+
+    def decidir(self, cabecalho=None):
+        """
+        Se a requisição deve ser perfilada: None (não), 'amostra' (sorteada pela taxa; gravada se for lenta)
+        ou 'forcado' (cabeçalho X-Profile, se permitido; gravada sempre).
+        """
+        if self.permitir_cabecalho and cabecalho == '1':
+            return 'forcado'
+        if self.taxa > 0 and random.random() < self.taxa:
+            return 'amostra'
+        return None
+
+    def _iniciar(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.ativos = {}
+            self.pid = os.getpid()
+        threading.Thread(target=self._loop, name='amostrador-pilhas', daemon=True).start()
+
+    def iniciar(self):
+        """Passa a amostrar a thread atual."""
+        if self.pid != os.getpid():
+            self._iniciar()
+        with self.lock:
+            self.ativos[threading.get_ident()] = Counter()
+        self.acordar.set()
+
+    def parar(self):
+        """Para de amostrar a thread atual e devolve as pilhas contadas."""
+        with self.lock:
+            return self.ativos.pop(threading.get_ident(), Counter())
+
+    def _loop(self):
+        while True:
+            self.acordar.clear()
+            if not self.ativos:
+                self.acordar.wait()
+                continue
+            time.sleep(self.intervalo)
+            quadros = sys._current_frames()
+            with self.lock:
+                for thread_id, pilhas in self.ativos.items():
+                    frame = quadros.get(thread_id)
+                    if frame is not None:
+                        pilhas[_pilha(frame)] += 1
+
+    def gravar(self, pilhas, nome):
+        """Grava as pilhas em PROFILES_DIR/<nome>.folded, mantendo só os max_perfis mais recentes."""
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = os.path.join(self.diretorio, f'{nome}.folded')
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            for pilha, contagem in pilhas.most_common():
+                arquivo.write(f'{pilha} {contagem}\n')
+        self.gravados += 1
+
+        perfis = sorted(glob.glob(os.path.join(self.diretorio, '*.folded')), key=os.path.getmtime)
+        for antigo in perfis[:-self.max_perfis]:
+            try:
+                os.remove(antigo)
+            except OSError:
+                pass
+        return caminho
+
+    def concluir(self, modo, duracao_ms, rota, request_id):
+        """
+        Encerra a amostragem da requisição atual e grava o perfil se ela foi forçada ou lenta.
+        Retorna o caminho do arquivo gravado, ou None.
+        """
+        pilhas = self.parar()
+        if not pilhas or (modo != 'forcado' and duracao_ms < self.limite_lento_ms):
+            return None
+        rota = re.sub(r'[^A-Za-z0-9]+', '_', rota).strip('_')
+        nome = f'{time.strftime("%Y%m%d-%H%M%S")}_{rota}_{int(duracao_ms)}ms_{request_id[:8]}'
+        try:
+            return self.gravar(pilhas, nome)
+        except OSError:
+            return None
+
+
+AMOSTRADOR = AmostradorPilhas()
@@ -0,0 +1,130 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+# Limites padrão do cache de respostas
+MAX_ENTRADAS = 1024
+MAX_BYTES = 32 * 1024 * 1024
+# Tempo (segundos) que clientes e proxies podem reutilizar uma resposta sem revalidar o ETag
+MAX_AGE = 60
+
+# Cabeçalhos da resposta original que são guardados junto com o corpo
+CABECALHOS_GUARDADOS = ('Content-Type', 'X-Total-Count', 'X-Next-Cursor', 'Link')
+
+
+class ResponseCache:
+    """
+    Cache LRU de respostas GET, indexado por rota + parâmetros normalizados.
+    Cada entrada pertence a uma versão dos dados (função `versao`): quando a versão muda
+    (tabela recarregada), o cache inteiro é descartado. Respostas servidas pelo cache
+    levam ETag e Cache-Control; If-None-Match com o ETag atual recebe 304, sem corpo.
+    """
+
+    def __init__(self, versao, max_entradas=MAX_ENTRADAS, max_bytes=MAX_BYTES, max_age=MAX_AGE):
+        self.versao = versao
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.entradas = OrderedDict()
+        self.versao_entradas = None
+        self.bytes = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.remocoes = 0
+        self.invalidacoes = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def chave():
+        """Rota + parâmetros da query em ordem (a ordem dos parâmetros na URL não importa)."""
+        return request.path, tuple(sorted(request.args.items(multi=True)))
+
+    def _validar_versao(self, versao):
+        # Chamado com o lock: descarta tudo o que foi calculado sobre outra versão dos dados
+        if versao != self.versao_entradas:
+            if self.entradas:
+                self.invalidacoes += 1
+            self.entradas.clear()
+            self.bytes = 0
+            self.versao_entradas = versao
+
+    def obter(self, chave, versao):
+        """Entrada (corpo, cabeçalhos, etag) da chave, ou None; conta acerto/falta."""
+        with self.lock:
+            self._validar_versao(versao)
+            entrada = self.entradas.get(chave)
+            if entrada is None:
+                self.faltas += 1
+                return None
+            self.entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada
+
+    def guardar(self, chave, versao, response):
+        """Guarda uma resposta 200, removendo as menos usadas além dos limites. Retorna a entrada."""
+        corpo = response.get_data()
+        cabecalhos = [(nome, response.headers[nome]) for nome in CABECALHOS_GUARDADOS if nome in response.headers]
+        entrada = (corpo, cabecalhos, hashlib.sha1(corpo).hexdigest()[:16])
+        # Respostas muito grandes (ex. training-data com muitos livros) não ocupam o cache
+        if len(corpo) > self.max_bytes // 8:
+            return entrada
+
+        with self.lock:
+            self._validar_versao(versao)
+            anterior = self.entradas.pop(chave, None)
+            if anterior is not None:
+                self.bytes -= len(anterior[0])
+            self.entradas[chave] = entrada
+            self.bytes += len(corpo)
+            while len(self.entradas) > self.max_entradas or self.bytes > self.max_bytes:
+                _, removida = self.entradas.popitem(last=False)
+                self.bytes -= len(removida[0])
+                self.remocoes += 1
+        return entrada
+
+    def estatisticas(self):
+        with self.lock:
+            consultas = self.acertos + self.faltas
+            return {
+                "hits": self.acertos,
+                "misses": self.faltas,
+                "hit_ratio": round(self.acertos / consultas, 4) if consultas else 0.0,
+                "evictions": self.remocoes,
+                "invalidations": self.invalidacoes,
+                "entries": len(self.entradas),
+                "bytes": self.bytes,
+                "max_entries": self.max_entradas,
+                "max_bytes": self.max_bytes,
+                "dataset_version": self.versao_entradas
+            }
+
+    def cached(self, func):
+        """
+        Decorador de rota GET: serve a resposta do cache quando existe para a versão atual dos dados;
+        caso contrário executa a rota e guarda a resposta se o status for 200 (erros não são guardados).
+        O cabeçalho X-Cache indica HIT ou MISS.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            versao = self.versao()
+            chave = self.chave()
+            entrada = self.obter(chave, versao)
+            estado = 'HIT'
+            if entrada is None:
+                response = make_response(func(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entrada = self.guardar(chave, versao, response)
+                estado = 'MISS'
+
+            corpo, cabecalhos, etag = entrada
+            response = current_app.response_class(corpo, status=200, headers=cabecalhos)
+            response.headers['X-Cache'] = estado
+            response.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+            response.set_etag(etag)
+            return response.make_conditional(request)
+
+        return wrapper
@@ -0,0 +1,152 @@
+import argparse
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HOME_PAGE = """<html><body>
+<ul class="nav nav-list"><li><a href="index.html">Books</a><ul>
+{links}
+</ul></li></ul>
+</body></html>"""
+
+CATEGORY_LINK = '<li><a href="catalogue/category/books/{slug}/index.html">{name}</a></li>'
+
+LISTING_PAGE = """<html><body>
+<form><strong>{books_total}</strong> results.</form>
+<ol class="row">
+{books}
+</ol>
+<ul class="pager"><li class="current">Page {page} of {page_total}</li></ul>
+</body></html>"""
+
+LISTING_BOOK = '<li><article class="product_pod"><h3><a href="../../../{slug}/index.html">{title}</a></h3></article></li>'
+
+BOOK_PAGE = """<html><body>
+<article class="product_page">
+<div class="item active"><img src="../../media/cache/{slug}.jpg"></div>
+<h1>{title}</h1>
+<p class="star-rating Three"></p>
+<div id="product_description"></div>
+<p>Fixture description of {title}.</p>
+<table>
+<tr><td>{upc}</td></tr><tr><td>Books</td></tr><tr><td>£10.00</td></tr><tr><td>£12.00</td></tr>
+<tr><td>£2.00</td></tr><tr><td>In stock (5 available)</td></tr><tr><td>0</td></tr>
+</table>
+</article>
+</body></html>"""
+
+BOOKS_PER_PAGE = 20
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Serve a books.toscrape.com look-alike catalogue: home page, paginated category listings and book pages,
+    Every response is delayed by `latency` seconds to stand in for the network round trip.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, without TCP_NODELAY delayed ACKs would add ~40 ms per page
+    disable_nagle_algorithm = True
+    categories = 10
+    books_per_category = 45
+    latency = 0.02
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = self.page(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        content = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def page(self, path):
+        """
+        Render the fixture page of an url path.
+        @param path: request path
+        @return: html str, None if the path is not part of the catalogue
+        """
+        if path in ("/", "/index.html"):
+            links = [CATEGORY_LINK.format(slug=f"category-{i}_{i + 2}", name=f"Category {i}")
+                     for i in range(self.categories)]
+            return HOME_PAGE.format(links="\n".join(links))
+
+        match = re.fullmatch(r"/catalogue/category/books/category-(\d+)_\d+(?:/index\.html|/page-(\d+)\.html)?", path)
+        if match and int(match.group(1)) < self.categories:
+            category, page = int(match.group(1)), int(match.group(2) or 1)
+            page_total = -(-self.books_per_category // BOOKS_PER_PAGE)
+            first = (page - 1) * BOOKS_PER_PAGE
+            books = [
+                LISTING_BOOK.format(slug=f"book-{category}-{i}_{category * 1000 + i}", title=f"Book {category}-{i}")
+                for i in range(first, min(first + BOOKS_PER_PAGE, self.books_per_category))
+            ]
+            return LISTING_PAGE.format(books_total=self.books_per_category, books="\n".join(books),
+                                       page=page, page_total=page_total)
+
+        match = re.fullmatch(r"/catalogue/book-(\d+)-(\d+)_\d+/index\.html", path)
+        if match:
+            category, book = int(match.group(1)), int(match.group(2))
+            return BOOK_PAGE.format(slug=f"book-{category}-{book}", title=f"Book {category}-{book}",
+                                    upc=f"{category:08x}{book:08x}")
+        return None
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(categories=10, books_per_category=45, latency=0.02):
+    """
+    Start the fixture catalogue on a free local port, in a background thread.
+    @param categories: number of categories
+    @param books_per_category: number of books of each category
+    @param latency: delay in seconds added to every response
+    @return: tuple (server, root url), call server.shutdown() to stop it
+    """
+    handler = type("Handler", (FixtureHandler,), {
+        'categories': categories, 'books_per_category': books_per_category, 'latency': latency
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
+
+
+def benchmark(workers=(1, 4, 8, 16), categories=10, books_per_category=45, latency=0.02):
+    """
+    Crawl the fixture catalogue with each number of workers (without HTTP cache),
+    Print elapsed time and books/sec.
+    @param workers: worker counts to compare
+    @param categories: number of categories served
+    @param books_per_category: number of books of each category
+    @param latency: delay in seconds added to every response
+    """
+    from web_scraping import BookScraper
+
+    server, root_url = start_server(categories, books_per_category, latency)
+    try:
+        print(f"{categories} categories, {categories * books_per_category} books, {latency * 1000:.0f} ms latency")
+        for count in workers:
+            start = time.perf_counter()
+            scraper = BookScraper(workers=count, max_per_host=count, root_url=root_url, cache_dir=None)
+            books = sum(1 for _ in scraper.iter_books())
+            scraper.session.close()
+            elapsed = time.perf_counter() - start
+            print(f"--workers {count:<4}{books:>6} books{elapsed:>9.2f} s{books / elapsed:>10.1f} books/sec")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the crawl against a local stand-in of the catalogue")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--books-per-category", type=int, default=45)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+    benchmark(args.workers, args.categories, args.books_per_category, args.latency_ms / 1000)
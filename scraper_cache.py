@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Journal lines written before the index is compacted back into index.json
+MAX_JOURNAL_LINES = 1000
+
+
+class HttpCache:
+    def __init__(self, cache_dir, max_bytes):
+        """
+        On-disk cache of response bodies and their validators (ETag / Last-Modified),
+        Entries are evicted in least recently used order once max_bytes is exceeded.
+        Data extracted from a cached page can be stored next to it,
+        so unchanged pages don't need to be parsed again.
+        Every change is appended to a journal as it happens, so entries survive a crash or kill;
+        the journal is folded into index.json on close() or once it grows past MAX_JOURNAL_LINES.
+        @param cache_dir: cache directory
+        @param max_bytes: size cap of the cache in bytes
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.journal_path = os.path.join(cache_dir, "index.journal")
+        self.journal = None
+        self.journal_lines = 0
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.load_index()
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def path(self, key, suffix):
+        return os.path.join(self.cache_dir, f"{key}.{suffix}")
+
+    def load_index(self):
+        """
+        Load cache entries in LRU order from index.json and replay the journal on top of it,
+        Rebuild entries for bodies missing from both (without validators, they only count towards max_bytes
+        until the page is fetched again), forget entries whose body is missing,
+        and remove temporary files and extracted data left without a body.
+        """
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, encoding='utf-8') as index_file:
+                    for entry in json.load(index_file):
+                        self.entries[entry['key']] = entry
+            except ValueError:
+                pass
+
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, encoding='utf-8') as journal_file:
+                for line in journal_file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Last line cut short by a crash
+                        continue
+                    if 'forget' in record:
+                        self.entries.pop(record['forget'], None)
+                    else:
+                        self.entries.pop(record['key'], None)
+                        self.entries[record['key']] = record
+
+        filenames = os.listdir(self.cache_dir)
+        for filename in filenames:
+            if filename.endswith('.tmp'):
+                os.remove(os.path.join(self.cache_dir, filename))
+            elif filename.endswith('.body') and filename[:-len('.body')] not in self.entries:
+                key = filename[:-len('.body')]
+                self.entries[key] = self.rebuilt_entry(key)
+        for filename in filenames:
+            if filename.endswith('.json') and filename != "index.json" \
+                    and not os.path.exists(self.path(filename[:-len('.json')], 'body')):
+                os.remove(os.path.join(self.cache_dir, filename))
+
+        for key in list(self.entries):
+            if os.path.exists(self.path(key, 'body')):
+                self.total_bytes += self.entries[key]['size']
+            else:
+                del self.entries[key]
+        self.write_index()
+
+    def rebuilt_entry(self, key):
+        """Entry for a body file found on disk without index data."""
+        size = os.path.getsize(self.path(key, 'body'))
+        entry = {'key': key, 'url': None, 'etag': None, 'last_modified': None, 'content_type': None, 'size': size}
+        if os.path.exists(self.path(key, 'json')):
+            entry['extracted_size'] = os.path.getsize(self.path(key, 'json'))
+            entry['size'] += entry['extracted_size']
+        return entry
+
+    def log(self, record):
+        """Append a change to the journal, compacting it into index.json when too long (caller holds the lock)."""
+        if self.journal_lines >= MAX_JOURNAL_LINES:
+            self.write_index()
+        if self.journal is None:
+            self.journal = open(self.journal_path, 'a', encoding='utf-8')
+        self.journal.write(json.dumps(record) + '\n')
+        self.journal.flush()
+        self.journal_lines += 1
+
+    def write_index(self):
+        """Save entries in LRU order to index.json and empty the journal (caller holds the lock)."""
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as index_file:
+            json.dump(list(self.entries.values()), index_file)
+        os.replace(tmp_path, self.index_path)
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.journal_lines = 0
+
+    def lookup(self, url):
+        """
+        Get the cached body of an url and the headers to revalidate it.
+        @param url: request url
+        @return: tuple (entry dict, body bytes, conditional headers dict), (None, None, {}) on miss
+        """
+        key = self.key(url)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, None, {}
+            self.entries.move_to_end(key)
+        try:
+            with open(self.path(key, 'body'), 'rb') as body_file:
+                body = body_file.read()
+        except FileNotFoundError:
+            return None, None, {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return entry, body, headers
+
+    def store(self, url, response):
+        """
+        Cache a 200 response carrying a validator, replacing any previous entry.
+        @param url: request url
+        @param response: requests response
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        key = self.key(url)
+        body = response.content
+        tmp_path = self.path(key, f"{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as body_file:
+            body_file.write(body)
+
+        with self.lock:
+            self.forget(key)
+            os.replace(tmp_path, self.path(key, 'body'))
+            self.entries[key] = {
+                'key': key,
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'content_type': response.headers.get('Content-Type'),
+                'size': len(body)
+            }
+            self.total_bytes += len(body)
+            self.log(self.entries[key])
+            self.evict()
+
+    def load_extracted(self, url):
+        """
+        Get data previously extracted from the cached page of an url.
+        @param url: request url
+        @return: extracted data, None if there is none
+        """
+        try:
+            with open(self.path(self.key(url), 'json'), encoding='utf-8') as data_file:
+                return json.load(data_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def store_extracted(self, url, data):
+        """
+        Save data extracted from the cached page of an url.
+        @param url: request url
+        @param data: json serializable data
+        """
+        key = self.key(url)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            content = json.dumps(data, ensure_ascii=False)
+            with open(self.path(key, 'json'), 'w', encoding='utf-8') as data_file:
+                data_file.write(content)
+            extracted_size = len(content.encode('utf-8'))
+            self.total_bytes += extracted_size - entry.get('extracted_size', 0)
+            entry['size'] = entry['size'] - entry.get('extracted_size', 0) + extracted_size
+            entry['extracted_size'] = extracted_size
+            self.log(entry)
+            self.evict()
+
+    def forget(self, key):
+        """Remove an entry and its files (caller holds the lock)."""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry['size']
+        self.log({'forget': key})
+        for suffix in ('body', 'json'):
+            try:
+                os.remove(self.path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits max_bytes (caller holds the lock)."""
+        while self.total_bytes > self.max_bytes and self.entries:
+            self.forget(next(iter(self.entries)))
+
+    def close(self):
+        """Save entries in LRU order and empty the journal."""
+        with self.lock:
+            self.write_index()
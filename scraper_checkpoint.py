@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+
+
+class CrawlCheckpoint:
+    def __init__(self, path, resume=False):
+        """
+        Append-only JSON lines file holding every scraped book,
+        Only the byte offset of each record is kept in memory (by page url and by upc),
+        records are read back from disk when needed.
+        @param path: checkpoint file path
+        @param resume: keep records of a previous run if True, start from scratch otherwise
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.offsets = {}
+        self.upc_offsets = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume and os.path.exists(path):
+            self.load()
+        else:
+            open(path, 'w', encoding='utf-8').close()
+
+        self.file = open(path, 'ab')
+
+    def load(self):
+        """
+        Index records of an existing checkpoint,
+        Drop a partially written last line left by an interrupted run.
+        """
+        valid_end = 0
+        with open(self.path, 'rb') as checkpoint:
+            for line in iter(checkpoint.readline, b''):
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    book = json.loads(line)
+                except ValueError:
+                    break
+                self.offsets[book['product_page_url']] = valid_end
+                self.upc_offsets[book['universal_product_code']] = valid_end
+                valid_end += len(line)
+
+        if valid_end != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as checkpoint:
+                checkpoint.truncate(valid_end)
+
+    def __contains__(self, book_url):
+        return book_url in self.offsets
+
+    def __len__(self):
+        return len(self.upc_offsets)
+
+    def get(self, book_url):
+        """
+        Read back a checkpointed book.
+        @param book_url: book page url
+        @return: book data dict, None if the url was never scraped
+        """
+        offset = self.offsets.get(book_url)
+        if offset is None:
+            return None
+        with open(self.path, 'rb') as checkpoint:
+            checkpoint.seek(offset)
+            return json.loads(checkpoint.readline())
+
+    def append(self, book):
+        """
+        Persist a freshly scraped book (thread safe).
+        @param book: book data dict
+        """
+        line = (json.dumps(book, ensure_ascii=False) + '\n').encode('utf-8')
+        with self.lock:
+            offset = self.file.tell()
+            self.file.write(line)
+            self.file.flush()
+            self.offsets[book['product_page_url']] = offset
+            self.upc_offsets[book['universal_product_code']] = offset
+
+    def close(self):
+        self.file.close()
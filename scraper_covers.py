@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from tqdm import tqdm
+
+
+class CoverDownloader:
+    def __init__(self, session, covers_dir, workers=8, chunk_size=64 * 1024):
+        """
+        Concurrent cover downloader with content-addressed storage:
+        each distinct image is stored once in covers/_store/<sha256>.jpg
+        and linked to covers/<category>/<upc>.jpg.
+        A manifest (image url -> sha256, size) lets later runs skip covers already on disk.
+        @param session: scraper_session.ScraperSession instance
+        @param covers_dir: covers directory
+        @param workers: number of concurrent downloads
+        @param chunk_size: size in bytes of the chunks streamed to disk
+        """
+        self.session = session
+        self.covers_dir = covers_dir
+        self.store_dir = os.path.join(covers_dir, "_store")
+        self.manifest_path = os.path.join(covers_dir, "_manifest.json")
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+        self.stats = {'downloaded': 0, 'linked': 0, 'skipped': 0, 'failed': 0, 'bytes': 0}
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as manifest_file:
+                self.manifest = json.load(manifest_file)
+
+    def blob_path(self, digest):
+        return os.path.join(self.store_dir, f"{digest}.jpg")
+
+    def is_current(self, url, target):
+        """
+        Check if a cover file already holds the image of an url.
+        @param url: image url
+        @param target: cover file path
+        @return: True if the file exists with the expected size
+        """
+        entry = self.manifest.get(url)
+        return entry is not None and os.path.isfile(target) and os.path.getsize(target) == entry['size']
+
+    def fetch_blob(self, url, progress):
+        """
+        Get the stored blob of an image url, streaming it to disk if needed.
+        @param url: image url
+        @param progress: tqdm bar updated with downloaded bytes
+        @return: blob path, None if the download failed
+        """
+        entry = self.manifest.get(url)
+        if entry is not None:
+            blob = self.blob_path(entry['sha256'])
+            if os.path.isfile(blob) and os.path.getsize(blob) == entry['size']:
+                return blob
+
+        response = self.session.get(url, use_cache=False, stream=True)
+        if response is None:
+            with self.lock:
+                self.stats['failed'] += 1
+            return None
+
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self.store_dir, f"{threading.get_ident()}.tmp")
+        with response, open(tmp_path, 'wb') as tmp_file:
+            for chunk in response.iter_content(self.chunk_size):
+                tmp_file.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+                progress.update(len(chunk))
+
+        blob = self.blob_path(digest.hexdigest())
+        with self.lock:
+            if os.path.exists(blob):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, blob)
+            self.manifest[url] = {'sha256': digest.hexdigest(), 'size': size}
+            self.stats['downloaded'] += 1
+            self.stats['bytes'] += size
+        return blob
+
+    def link(self, blob, target):
+        """
+        Point a cover file at a stored blob (hard link, copy if linking is not supported).
+        @param blob: blob path
+        @param target: cover file path
+        """
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.remove(target)
+        try:
+            os.link(blob, target)
+        except OSError:
+            shutil.copyfile(blob, target)
+        self.stats['linked'] += 1
+
+    def link_result(self, future, target):
+        blob = future.result()
+        if blob is not None:
+            self.link(blob, target)
+
+    def download(self, books):
+        """
+        Download covers of an iterable of books, as the books come in,
+        Each image url is fetched at most once.
+        @param books: iterable of book data dicts
+        """
+        start = time.perf_counter()
+        progress = tqdm(desc="Downloading cover images", unit="B", unit_scale=True, unit_divisor=1024, ncols=80)
+        blobs = {}
+        links = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for book in books:
+                url = book['image_url']
+                target = os.path.join(self.covers_dir, book['category'], f"{book['universal_product_code']}.jpg")
+                if self.is_current(url, target):
+                    self.stats['skipped'] += 1
+                    continue
+                if url not in blobs:
+                    blobs[url] = executor.submit(self.fetch_blob, url, progress)
+                links.append((blobs[url], target))
+                while links and links[0][0].done():
+                    self.link_result(*links.popleft())
+
+            while links:
+                self.link_result(*links.popleft())
+        progress.close()
+        self.save_manifest()
+
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        print(f"Covers: {self.stats['downloaded']} downloaded, {self.stats['linked']} written, "
+              f"{self.stats['skipped']} up to date, {self.stats['failed']} failed - "
+              f"{self.stats['bytes'] / 1024 / 1024:.1f} MB at {self.stats['bytes'] / 1024 / 1024 / elapsed:.1f} MB/s")
+
+    def save_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(self.manifest, manifest_file)
+        os.replace(tmp_path, self.manifest_path)
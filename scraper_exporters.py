@@ -0,0 +1,106 @@
+import csv
+import gzip
+import json
+import os
+from abc import ABC, abstractmethod
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+HEADERS = [
+    'product_page_url',
+    'universal_product_code',
+    'title',
+    'price_including_tax',
+    'price_excluding_tax',
+    'number_available',
+    'product_description',
+    'category',
+    'review_rating',
+    'image_url'
+]
+
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def open_output(path, compression=None):
+    """
+    Open a text file for writing, optionally compressed.
+    @param path: file path without compression suffix
+    @param compression: None, 'gzip' or 'zstd'
+    @return: text file object
+    """
+    path += COMPRESSION_SUFFIXES[compression]
+    if compression == "gzip":
+        return gzip.open(path, 'wt', newline='', encoding='utf-8')
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the 'zstandard' package")
+        return zstandard.open(path, 'wt', newline='', encoding='utf-8')
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+class StreamExporter(ABC):
+    """
+    Write books one by one as they are scraped,
+    one file per category (books arrive grouped by category) or a single books file.
+    Only the file of the current category is open at a time.
+    """
+
+    extension = ""
+
+    def __init__(self, output_dir, one_file=False, compression=None):
+        self.output_dir = output_dir
+        self.one_file = one_file
+        self.compression = compression
+        self.current_name = None
+        self.file = None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, book):
+        """
+        Append a book to the file of its category.
+        @param book: book data dict
+        """
+        name = "books" if self.one_file else book['category'].lower().replace(' ', '_')
+        if name != self.current_name:
+            self.close()
+            self.file = open_output(os.path.join(self.output_dir, name + self.extension), self.compression)
+            self.current_name = name
+            self.start()
+        self.write_record(book)
+
+    def start(self):
+        pass
+
+    @abstractmethod
+    def write_record(self, book):
+        """
+        Write a book to the open file.
+        @param book: book data dict
+        """
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class CsvExporter(StreamExporter):
+    extension = ".csv"
+
+    def start(self):
+        self.writer = csv.DictWriter(self.file, fieldnames=HEADERS)
+        self.writer.writeheader()
+
+    def write_record(self, book):
+        self.writer.writerow(book)
+
+
+class JsonLinesExporter(StreamExporter):
+    extension = ".jsonl"
+
+    def write_record(self, book):
+        self.file.write(json.dumps(book, ensure_ascii=False) + "\n")
@@ -0,0 +1,211 @@
+import argparse
+import os
+import time
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxHTMLParser
+except ImportError:
+    SelectolaxHTMLParser = None
+
+
+def as_text(content):
+    """
+    Decode a raw page body (books.toscrape.com serves utf-8 without charset header).
+    @param content: page html, str or bytes
+    @return: str
+    """
+    if isinstance(content, bytes):
+        return content.decode('utf-8', errors='replace')
+    return content
+
+
+class SoupParser:
+    """BeautifulSoup backend, detail pages only build the tree of the product <article>."""
+
+    def __init__(self, features='html.parser'):
+        self.name = features
+        self.features = features
+        self.product_strainer = SoupStrainer('article', class_='product_page')
+
+    def parse_categories(self, content):
+        """
+        Get category names and relative urls from the home page.
+        @param content: page html
+        @return: list of tuples (name, href)
+        """
+        soup = BeautifulSoup(content, self.features)
+        hrefs = [line["href"] for line in soup.select("ul > li > ul > li > a")]
+        names = soup.find("ul", class_="nav nav-list").find("ul").find_all("li")
+        return [(names[i].text.strip().lower(), href) for i, href in enumerate(hrefs)]
+
+    def parse_listing(self, content):
+        """
+        Get books count, pages count and book hrefs of a category page.
+        @param content: page html
+        @return: tuple (books_total, page_total, list of book hrefs)
+        """
+        soup = BeautifulSoup(content, self.features)
+        books_total = int(soup.select_one("form > strong").text)
+        page_total = 1
+        if books_total > 20:
+            page_total = int(soup.find("li", {"class": "current"}).text.strip().rsplit(" ", 1)[-1])
+        hrefs = [line["href"] for line in soup.select("ol > li > article > h3 > a")]
+        return books_total, page_total, hrefs
+
+    def parse_book(self, content):
+        """
+        Extract raw fields of a book page.
+        @param content: page html
+        @return: dict with td (list of product table values), title, description,
+                 rating (star rating word) and image (src)
+        """
+        article = BeautifulSoup(content, self.features, parse_only=self.product_strainer)
+        description = article.select_one("article > p")
+        return {
+            'td': [td.text for td in article.find_all('td')],
+            'title': article.find('h1').text,
+            'description': description.text if description is not None else None,
+            'rating': article.select_one('.star-rating').attrs['class'][1],
+            'image': article.find("div", {"class": "item active"}).find("img")["src"]
+        }
+
+
+class LxmlParser:
+    """lxml backend using compiled XPath queries."""
+
+    name = 'lxml'
+
+    def parse_categories(self, content):
+        tree = lxml_html.fromstring(as_text(content))
+        links = tree.xpath('//ul[@class="nav nav-list"]/li/ul/li/a')
+        return [(link.text_content().strip().lower(), link.get("href")) for link in links]
+
+    def parse_listing(self, content):
+        tree = lxml_html.fromstring(as_text(content))
+        books_total = int(tree.xpath('string(//form/strong)'))
+        page_total = 1
+        if books_total > 20:
+            page_total = int(tree.xpath('string(//li[@class="current"])').strip().rsplit(" ", 1)[-1])
+        hrefs = tree.xpath('//ol/li/article/h3/a/@href')
+        return books_total, page_total, hrefs
+
+    def parse_book(self, content):
+        article = lxml_html.fromstring(as_text(content)).xpath('//article[contains(@class, "product_page")]')[0]
+        description = article.xpath('./p')
+        return {
+            'td': [td.text_content() for td in article.xpath('.//td')],
+            'title': article.xpath('string(.//h1)'),
+            'description': description[0].text_content() if description else None,
+            'rating': article.xpath('.//*[contains(@class, "star-rating")]/@class')[0].split()[1],
+            'image': article.xpath('.//div[@class="item active"]//img/@src')[0]
+        }
+
+
+class SelectolaxParser:
+    """selectolax (lexbor) backend using CSS selectors."""
+
+    name = 'selectolax'
+
+    def parse_categories(self, content):
+        tree = SelectolaxHTMLParser(as_text(content))
+        links = tree.css('ul.nav-list > li > ul > li > a')
+        return [(link.text().strip().lower(), link.attributes["href"]) for link in links]
+
+    def parse_listing(self, content):
+        tree = SelectolaxHTMLParser(as_text(content))
+        books_total = int(tree.css_first("form > strong").text())
+        page_total = 1
+        if books_total > 20:
+            page_total = int(tree.css_first("li.current").text().strip().rsplit(" ", 1)[-1])
+        hrefs = [a.attributes["href"] for a in tree.css("ol > li > article > h3 > a")]
+        return books_total, page_total, hrefs
+
+    def parse_book(self, content):
+        article = SelectolaxHTMLParser(as_text(content)).css_first("article.product_page")
+        description = article.css_first("article > p")
+        return {
+            'td': [td.text() for td in article.css('td')],
+            'title': article.css_first('h1').text(),
+            'description': description.text() if description is not None else None,
+            'rating': article.css_first('.star-rating').attributes['class'].split()[1],
+            'image': article.css_first("div.item.active img").attributes["src"]
+        }
+
+
+def available_parsers():
+    """
+    List installed parser backends, fastest first.
+    @return: list of backend names
+    """
+    names = []
+    if SelectolaxHTMLParser is not None:
+        names.append('selectolax')
+    if lxml_html is not None:
+        names.append('lxml')
+    names.append('html.parser')
+    return names
+
+
+def get_parser(name='auto'):
+    """
+    Build a parser backend.
+    @param name: 'auto' (fastest installed), 'selectolax', 'lxml' or 'html.parser'
+    @return: parser instance
+    """
+    if name == 'auto':
+        name = available_parsers()[0]
+    if name not in available_parsers():
+        raise ValueError(f"Parser '{name}' is not available, installed parsers: {available_parsers()}")
+    if name == 'selectolax':
+        return SelectolaxParser()
+    if name == 'lxml':
+        return LxmlParser()
+    return SoupParser('html.parser')
+
+
+def benchmark(pages_dir, repeat=3):
+    """
+    Parse every saved book page of a directory with each installed backend,
+    Print pages/sec per backend.
+    Book pages saved by the HTTP cache (exports/http_cache/*.body) can be used as fixtures.
+    @param pages_dir: directory of saved html pages
+    @param repeat: number of passes over the pages
+    """
+    pages = []
+    for filename in sorted(os.listdir(pages_dir)):
+        if filename.endswith(('.html', '.body')):
+            with open(os.path.join(pages_dir, filename), 'rb') as page:
+                content = page.read()
+            if b'product_page' in content:
+                pages.append(content)
+
+    if not pages:
+        print(f"No book pages found in {pages_dir}")
+        return
+
+    print(f"{len(pages)} book pages, {repeat} passes")
+    baseline = lambda content: BeautifulSoup(content, 'html.parser').find_all('td')
+    backends = [('html.parser (full tree)', baseline)]
+    backends += [(name, get_parser(name).parse_book) for name in available_parsers()]
+    for name, parse in backends:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for content in pages:
+                parse(content)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<26}{len(pages) * repeat / elapsed:>10.1f} pages/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark html parser backends on saved book pages")
+    parser.add_argument("pages_dir", nargs="?", default="exports/http_cache/")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    benchmark(args.pages_dir, args.repeat)
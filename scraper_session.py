@@ -0,0 +1,130 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+
+class ScraperSession:
+    def __init__(self, pool_size=8, max_per_host=8, timeout=(5, 30), retries=3, backoff=0.5, cache=None):
+        """
+        Shared HTTP layer for the scraper: one pooled keep-alive session,
+        per-host concurrency limit, retries with exponential backoff,
+        optional conditional-request cache.
+        @param pool_size: number of kept-alive connections per host
+        @param max_per_host: maximum simultaneous requests to the same host
+        @param timeout: (connect, read) timeout in seconds
+        @param retries: extra attempts on 5xx and connection errors
+        @param backoff: base delay in seconds, doubled after each failed attempt
+        @param cache: scraper_cache.HttpCache instance, None to disable caching
+        """
+        self.cache = cache
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_per_host = max(1, max_per_host)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.host_limits = {}
+        self.failures = []
+        self.lock = threading.Lock()
+
+    def host_limit(self, url):
+        """
+        Get (or create) the semaphore guarding the host of an url.
+        @param url: request url
+        @return: threading.BoundedSemaphore
+        """
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.host_limits:
+                self.host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self.host_limits[host]
+
+    def get(self, url, use_cache=True, **kwargs):
+        """
+        GET an url, retrying 5xx responses and connection errors,
+        Revalidate cached pages with If-None-Match / If-Modified-Since and serve 304s from disk,
+        Record the url in failures instead of raising when every attempt failed.
+        @param url: request url
+        @param use_cache: go through the cache if one is configured
+        @return: requests response (with from_cache set to True when served from disk),
+                 None if the url could not be fetched
+        """
+        entry, body, headers = None, None, {}
+        if use_cache and self.cache is not None:
+            entry, body, headers = self.cache.lookup(url)
+            headers.update(kwargs.pop('headers', None) or {})
+            kwargs['headers'] = headers
+
+        status_code, error = None, None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                with self.host_limit(url):
+                    response = self.session.get(url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                status_code, error = None, str(e)
+                continue
+
+            if response.status_code == 304 and entry is not None:
+                return self.cached_response(url, entry, body)
+            if response.status_code not in RETRY_STATUS_CODES:
+                if response.status_code >= 400:
+                    self.record_failure(url, response.status_code, response.reason, attempt + 1)
+                    return None
+                if use_cache and self.cache is not None and response.status_code == 200:
+                    self.cache.store(url, response)
+                return response
+            status_code, error = response.status_code, response.reason
+            response.close()
+
+        self.record_failure(url, status_code, error, self.retries + 1)
+        return None
+
+    @staticmethod
+    def cached_response(url, entry, body):
+        """
+        Build a 200 response from a cache entry.
+        @param url: request url
+        @param entry: cache entry dict
+        @param body: cached body bytes
+        @return: requests response
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = body
+        if entry.get('content_type'):
+            response.headers['Content-Type'] = entry['content_type']
+        response.from_cache = True
+        return response
+
+    def record_failure(self, url, status_code, error, attempts):
+        """
+        Keep track of an url that could not be fetched.
+        @param url: request url
+        @param status_code: last http status code, None for connection errors
+        @param error: error message
+        @param attempts: number of attempts made
+        """
+        with self.lock:
+            self.failures.append({
+                'url': url,
+                'status_code': status_code,
+                'error': error,
+                'attempts': attempts
+            })
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
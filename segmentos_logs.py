@@ -0,0 +1,210 @@
+import csv
+import glob
+import os
+import re
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 (engine usado pelo pandas para ler/escrever parquet)
+    PARQUET_DISPONIVEL = True
+except ImportError:
+    PARQUET_DISPONIVEL = False
+
+try:
+    import fcntl  # evita que dois processos compactem o mesmo segmento (POSIX)
+except ImportError:
+    fcntl = None
+
+# Pasta dos segmentos do log de monitoramento: CSVs rotacionados aguardando compactação
+# (pendente_<id>.csv) e segmentos compactados (logs_<inicio>_<fim>_<id>.parquet, epoch em segundos).
+# O id de um arquivo é o request_id do seu primeiro registro (inodes são reutilizados)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGS_DIR = os.path.join(BASE_DIR, 'exports', 'logs')
+
+# Dias mantidos; segmentos cujo último registro é mais antigo são apagados
+RETENCAO_DIAS = 30
+
+COLUNAS_CATEGORICAS_LOG = ['endpoint', 'method', 'client_ip', 'route']
+
+
+def primeiro_registro(arquivo):
+    """Primeiro registro completo do CSV do log aberto em modo binário (dicionário pelo cabeçalho), ou None."""
+    arquivo.seek(0)
+    cabecalho = arquivo.readline().decode('utf-8', errors='replace')
+    linha = arquivo.readline().decode('utf-8', errors='replace')
+    if not linha.endswith('\n'):
+        return None
+    return next(csv.DictReader([cabecalho, linha]), None)
+
+
+def identidade(registro):
+    """Id de um arquivo do log a partir do seu primeiro registro (request_id só com [A-Za-z0-9-])."""
+    if not registro or not registro.get('request_id'):
+        return None
+    return re.sub(r'[^A-Za-z0-9-]', '', registro['request_id'])[:64] or None
+
+
+def caminho_pendente(id_arquivo, diretorio=LOGS_DIR):
+    """Caminho para onde o log ativo é renomeado ao rotacionar."""
+    return os.path.join(diretorio, f'pendente_{id_arquivo}.csv')
+
+
+def _uuid_bytes(valor):
+    try:
+        return uuid.UUID(str(valor)).bytes
+    except ValueError:
+        return str(valor).encode('utf-8')
+
+
+def tipar_logs(df, horario_padrao=None):
+    """
+    Aplica o schema compacto dos registros de monitoramento: request_id como 16 bytes,
+    endpoint/método/IP/rota como categóricas (dicionário de ids no Parquet), status como int16,
+    duração como float32 e timestamp como datetime em UTC (epoch em segundos).
+    Linhas de versões antigas do log, sem rota ou horário, recebem o endpoint e `horario_padrao`.
+    """
+    if 'route' not in df.columns:
+        df['route'] = np.nan
+    if 'timestamp' not in df.columns:
+        df['timestamp'] = np.nan
+    if 'endpoint' in df.columns:
+        df['route'] = df['route'].fillna(df['endpoint'])
+    if 'request_id' in df.columns:
+        df['request_id'] = df['request_id'].map(_uuid_bytes)
+    if 'status_code' in df.columns:
+        df['status_code'] = pd.to_numeric(df['status_code'], errors='coerce').fillna(500).astype('int16')
+    if 'duration_ms' in df.columns:
+        df['duration_ms'] = pd.to_numeric(df['duration_ms'], errors='coerce').fillna(0.0).astype('float32')
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce', utc=True, format='ISO8601')
+    if horario_padrao is not None:
+        df['timestamp'] = df['timestamp'].fillna(pd.Timestamp(horario_padrao, unit='s', tz='UTC'))
+    df['timestamp'] = df['timestamp'].astype('datetime64[s, UTC]')
+    for col in COLUNAS_CATEGORICAS_LOG:
+        if col in df.columns:
+            df[col] = df[col].astype(str).astype('category')
+    return df
+
+
+def ler_csv_logs(caminho, colunas=None):
+    """
+    Lê um CSV do log (ativo ou rotacionado) já tipado por tipar_logs; sem horário vale o mtime do arquivo.
+    Com `colunas`, só elas (mais endpoint e timestamp, usados para completar rota e horário) são lidas.
+    """
+    usecols = None
+    if colunas is not None:
+        necessarias = set(colunas) | {'endpoint', 'timestamp'}
+        usecols = lambda coluna: coluna in necessarias  # noqa: E731
+    texto = {c: str for c in ['request_id', 'timestamp'] + COLUNAS_CATEGORICAS_LOG}
+    df = pd.read_csv(caminho, dtype=texto, on_bad_lines='skip', usecols=usecols)
+    df = tipar_logs(df, horario_padrao=os.path.getmtime(caminho))
+    return df if colunas is None else df[colunas]
+
+
+def compactar(caminho_csv, diretorio=LOGS_DIR):
+    """
+    Converte um CSV rotacionado (pendente_<id>.csv) em segmento Parquet tipado e apaga o CSV.
+    Retorna o caminho do segmento, ou None se outro processo já está compactando o arquivo,
+    se o CSV está vazio ou se o pyarrow não está instalado (o CSV fica como está).
+    """
+    if not PARQUET_DISPONIVEL:
+        return None
+    id_arquivo = os.path.basename(caminho_csv)[len('pendente_'):-len('.csv')]
+    with open(caminho_csv, 'rb') as trava:
+        if fcntl is not None:
+            try:
+                fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+        if not os.path.exists(caminho_csv):
+            return None
+
+        df = ler_csv_logs(caminho_csv)
+        if df.empty:
+            os.remove(caminho_csv)
+            return None
+        epoch = df['timestamp'].astype('int64')
+        segmento = os.path.join(diretorio, f'logs_{epoch.min()}_{epoch.max()}_{id_arquivo}.parquet')
+        tmp_path = f'{segmento}.{os.getpid()}.tmp'
+        # Mantém a ordem do CSV: o leitor do dashboard retoma um arquivo rotacionado pelo número da linha
+        df.to_parquet(tmp_path, index=False, compression='zstd')
+        os.replace(tmp_path, segmento)
+        os.remove(caminho_csv)
+    return segmento
+
+
+def compactar_pendentes(diretorio=LOGS_DIR):
+    """Compacta todos os CSVs rotacionados ainda pendentes (inclusive os de processos encerrados)."""
+    segmentos = []
+    for caminho in sorted(glob.glob(os.path.join(diretorio, 'pendente_*.csv'))):
+        try:
+            segmento = compactar(caminho, diretorio)
+        except FileNotFoundError:
+            continue
+        if segmento:
+            segmentos.append(segmento)
+    return segmentos
+
+
+def listar_segmentos(diretorio=LOGS_DIR):
+    """Segmentos compactados como (inicio, fim, id, caminho), com inicio/fim em epoch, em ordem de início."""
+    segmentos = []
+    for caminho in glob.glob(os.path.join(diretorio, 'logs_*.parquet')):
+        try:
+            inicio, fim, id_arquivo = os.path.basename(caminho)[len('logs_'):-len('.parquet')].split('_')
+            segmentos.append((int(inicio), int(fim), id_arquivo, caminho))
+        except ValueError:
+            continue
+    return sorted(segmentos)
+
+
+def aplicar_retencao(dias=RETENCAO_DIAS, diretorio=LOGS_DIR):
+    """Apaga os segmentos cujo último registro tem mais de `dias` dias. Retorna quantos foram apagados."""
+    limite = time.time() - dias * 24 * 3600
+    apagados = 0
+    for _, fim, _, caminho in listar_segmentos(diretorio):
+        if fim < limite:
+            try:
+                os.remove(caminho)
+                apagados += 1
+            except OSError:
+                pass
+    return apagados
+
+
+def para_epoch(valor):
+    """Epoch (segundos) de um epoch, datetime ou texto ISO; None continua None."""
+    if valor is None:
+        return None
+    if isinstance(valor, (int, float)):
+        return int(valor)
+    return int(pd.Timestamp(valor).timestamp())
+
+
+def ler_segmentos(inicio=None, fim=None, rotas=None, colunas=None, diretorio=LOGS_DIR):
+    """
+    Registros dos segmentos compactados com timestamp em [inicio, fim) (epoch, datetime ou texto ISO).
+    Só abre os segmentos cujo intervalo (no nome do arquivo) cruza a janela e, do Parquet,
+    só lê as colunas pedidas e os row groups que passam no filtro de horário/rota.
+    """
+    inicio, fim = para_epoch(inicio), para_epoch(fim)
+    filtros = []
+    if inicio is not None:
+        filtros.append(('timestamp', '>=', pd.Timestamp(inicio, unit='s', tz='UTC')))
+    if fim is not None:
+        filtros.append(('timestamp', '<', pd.Timestamp(fim, unit='s', tz='UTC')))
+    if rotas is not None:
+        filtros.append(('route', 'in', list(rotas)))
+
+    partes = []
+    for primeiro, ultimo, _, caminho in listar_segmentos(diretorio):
+        if (inicio is not None and ultimo < inicio) or (fim is not None and primeiro >= fim):
+            continue
+        try:
+            partes.append(pd.read_parquet(caminho, columns=colunas, filters=filtros or None))
+        except (OSError, ValueError):
+            continue
+    return partes
@@ -2,21 +2,42 @@ import csv
 import json
 import os
 import re
-import requests
 import time
-from bs4 import BeautifulSoup
-from tqdm import tqdm, trange
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from tqdm import tqdm
 import pandas as pd
 import argparse
+from scraper_session import ScraperSession
+from scraper_checkpoint import CrawlCheckpoint
+from scraper_cache import HttpCache
+from scraper_parsers import get_parser
+from scraper_covers import CoverDownloader
+from scraper_exporters import CsvExporter, JsonLinesExporter
+from book_table import ler_csv_categoria, salvar_parquet
 
 class BookScraper:
-    def __init__(self):
-        self.root_url = "http://books.toscrape.com/"
-        self.root_response = requests.get(self.root_url)
-        self.root_soup = BeautifulSoup(self.root_response.text, 'html.parser')
+    def __init__(self, workers=8, max_per_host=8, root_url="http://books.toscrape.com/",
+                 pool_size=None, timeout=30, retries=3, backoff=0.5,
+                 cache_dir="exports/http_cache/", max_cache_mb=200, parser="auto"):
+        self.root_url = root_url
+        self.workers = max(1, workers)
+        self.parser = get_parser(parser)
+        self.session = ScraperSession(
+            pool_size=pool_size or self.workers,
+            max_per_host=max_per_host,
+            timeout=(min(5, timeout), timeout),
+            retries=retries,
+            backoff=backoff,
+            cache=HttpCache(cache_dir, max_cache_mb * 1024 * 1024) if cache_dir and max_cache_mb > 0 else None
+        )
+
+        self.root_response = self.fetch(self.root_url)
 
         self.books = {}
         self.categories = self.setup_categories()
+        self.checkpoint = None
 
         self.exports_dir = "exports/"
         self.csv_dir = f"{self.exports_dir}csv/"
@@ -28,7 +49,7 @@ class BookScraper:
         Create 'exports' directory,
         Test connection,
         Parse config options and start scraping process,
-        Return error for failed connection,
+        Report urls that could not be fetched,
         @param config: dict of config args
         """
         try:
@@ -36,7 +57,7 @@ class BookScraper:
         except FileExistsError:
             pass
 
-        if self.root_response.status_code == 200:
+        if self.root_response is not None:
 
             if config["categories"] is not None:
                 cat_conf = config["categories"]
@@ -48,103 +69,160 @@ class BookScraper:
                     print("Invalid categories, please retry.")
                     exit()
 
-            self.get_book_urls()
+            self.checkpoint = CrawlCheckpoint(config["checkpoint"], resume=config["resume"])
+            if config["resume"]:
+                print(f"Resuming crawl: {len(self.checkpoint)} books already in {config['checkpoint']}")
 
-            if config["json"]:
-                self.export_json(config["one_file"])
+            compression = None if config["compression"] == "none" else config["compression"]
+            exporters = []
             if config["csv"]:
-                self.export_csv(config["one_file"])
-            if not config["ignore_covers"]:
-                self.download_images()
+                exporters.append(CsvExporter(self.csv_dir, config["one_file"], compression))
+            if config["json"]:
+                exporters.append(JsonLinesExporter(self.json_dir, config["one_file"], compression))
+
+            try:
+                books = self.export_stream(self.iter_books(), exporters)
+                if config["ignore_covers"]:
+                    deque(books, maxlen=0)
+                else:
+                    self.download_images(books)
+            finally:
+                # Close compressed streams even on errors, so their files are not left truncated
+                for exporter in exporters:
+                    exporter.close()
+                self.checkpoint.close()
 
-        else:
-            self.connection_error(self.root_response)
+        self.report_failures()
+        self.session.close()
 
     def setup_categories(self):
         """
         Get all categories names and urls.
         @return: list of categories tuples (name, url)
         """
-        if self.root_response.status_code == 200:
-            categories = []
-            categories_urls = [
-                self.root_url + line["href"].rsplit("/", 1)[0]
-                for line in self.root_soup.select("ul > li > ul > li > a")
+        if self.root_response is not None:
+            return [
+                (name, self.root_url + href.rsplit("/", 1)[0])
+                for name, href in self.parser.parse_categories(self.root_response.content)
             ]
-            category_names = self.root_soup.find("ul", class_="nav nav-list").find("ul").find_all("li")
-            for i, url in enumerate(categories_urls):
-                categories.append((category_names[i].text.strip().lower(), url))
-            return categories
 
-        else:
-            self.connection_error(self.root_response)
+        return []
+
+    def fetch(self, url):
+        """
+        GET an url through the shared pooled session,
+        Failed urls are recorded in session.failures.
+        @param url: page url
+        @return: requests response, None on failure
+        """
+        return self.session.get(url)
 
     def get_book_urls(self):
         """
         For each category, get all books urls,
         Check for extra pages (more than 20 books),
-        Clean urls and extract data.
+        Clean urls and extract data into books instance.
         """
-        for category in tqdm(self.categories, desc="Extracting data", ncols=80):
+        for category in self.categories:
             self.books[category[0]] = []
-            response = requests.get(category[1])
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                books_total = int(soup.select_one("form > strong").text)
-                if books_total > 20:
-                    page_total = int(soup.find("li", {"class": "current"}).text.replace("Page 1 of", ""))
-                else:
-                    page_total = 1
-
-                book_urls = []
-                for i in range(page_total):
-                    if page_total == 1:
-                        response = requests.get(category[1])
-                    else:
-                        response = requests.get(category[1] + f"/page-{i + 1}.html")
-                    soup = BeautifulSoup(response.text, "html.parser")
-                    book_raw_urls = [line["href"] for line in soup.select("ol > li > article > h3 > a")]
-                    for url in book_raw_urls:
-                        book_urls.append(url.replace("../../../", f"{self.root_url}catalogue/"))
+        for book in self.iter_books():
+            self.books[book['category']].append(book)
 
-                for book_url in tqdm(book_urls, desc=category[0].title(), ncols=80, leave=False):
-                    self.book_data(category[0], book_url)
-
-            else:
-                self.connection_error(response)
+    def iter_books(self):
+        """
+        For each category, get all books urls,
+        Check for extra pages (more than 20 books),
+        Clean urls and yield book data as soon as it is scraped.
+        Listing pages and book pages are fetched by a pool of workers,
+        books are yielded in category / page / book order.
+        Books already in the checkpoint are read back instead of fetched.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            first_pages = list(tqdm(
+                executor.map(self.fetch, [url for _, url in self.categories]),
+                total=len(self.categories), desc="Listing categories", ncols=80
+            ))
+
+            listing_jobs = []
+            for category, response in zip(self.categories, first_pages):
+                if response is None:
+                    continue
+                _, page_total, hrefs = self.parser.parse_listing(response.content)
+                listing_jobs.append((category[0], hrefs, [
+                    category[1] + f"/page-{i + 1}.html" for i in range(1, page_total)
+                ]))
+
+            extra_urls = [url for _, _, urls in listing_jobs for url in urls]
+            extra_pages = iter(executor.map(self.fetch, extra_urls))
+
+            book_jobs = []
+            for category_name, hrefs, urls in listing_jobs:
+                hrefs = list(hrefs)
+                for response in [next(extra_pages) for _ in urls]:
+                    if response is not None:
+                        hrefs += self.parser.parse_listing(response.content)[2]
+                for href in hrefs:
+                    book_url = href.replace("../../../", f"{self.root_url}catalogue/")
+                    book_jobs.append((category_name, book_url))
+
+            # keep a bounded window of pending book pages so memory does not grow with the catalogue
+            pending = deque()
+            jobs = iter(book_jobs)
+            with tqdm(total=len(book_jobs), desc="Extracting data", ncols=80) as progress:
+                for job in islice(jobs, self.workers * 4):
+                    pending.append(executor.submit(self.book_data, *job))
+                while pending:
+                    book = pending.popleft().result()
+                    for job in islice(jobs, 1):
+                        pending.append(executor.submit(self.book_data, *job))
+                    progress.update(1)
+                    if book is not None:
+                        yield book
 
     def book_data(self, category, book_url):
         """
-        Scrape and clean book data and add data to books instance.
+        Scrape and clean book data,
+        Reuse data extracted on a previous run when the page is unchanged (HTTP 304).
         @param category: current book category name
         @param book_url: current book url
+        @return: book data dict, None if the page could not be fetched
         """
-        response = requests.get(book_url)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            product_info = soup.find_all('td')
-            description = soup.select_one("article > p").text.replace(' ...more', '')
-            if description.isspace():
+        if self.checkpoint is not None and book_url in self.checkpoint:
+            return self.checkpoint.get(book_url)
+
+        response = self.fetch(book_url)
+        if response is not None and getattr(response, 'from_cache', False):
+            book = self.session.cache.load_extracted(book_url)
+            if book is not None:
+                book['category'] = category
+                if self.checkpoint is not None:
+                    self.checkpoint.append(book)
+                return book
+
+        if response is not None:
+            page = self.parser.parse_book(response.content)
+            product_info = page['td']
+            description = (page['description'] or '').replace(' ...more', '')
+            if not description or description.isspace():
                 description = 'n/a'
-            img = soup.find("div", {"class": "item active"}).find("img")
-            img_url = img["src"].replace("../../", f"{self.root_url}")
-            book_data = {
+            img_url = page['image'].replace("../../", f"{self.root_url}")
+            book = {
                 'product_page_url': book_url,
-                'universal_product_code': product_info[0].text,
-                'title': str(soup.find('h1').text),
-                'price_including_tax': product_info[3].text,
-                'price_excluding_tax': product_info[2].text,
-                'number_available': re.sub(r"\D", "", product_info[5].text),
+                'universal_product_code': product_info[0],
+                'title': page['title'],
+                'price_including_tax': product_info[3],
+                'price_excluding_tax': product_info[2],
+                'number_available': re.sub(r"\D", "", product_info[5]),
                 'product_description': description,
                 'category': category,
-                'review_rating':
-                    f"{self.review_rating(soup.select_one('.star-rating').attrs['class'][1])} star(s)",
+                'review_rating': f"{self.review_rating(page['rating'])} star(s)",
                 'image_url': img_url
             }
-            self.books[category].append(book_data)
-
-        else:
-            self.connection_error(response)
+            if self.session.cache is not None:
+                self.session.cache.store_extracted(book_url, book)
+            if self.checkpoint is not None:
+                self.checkpoint.append(book)
+            return book
 
     @staticmethod
     def review_rating(rating):
@@ -158,144 +236,156 @@ class BookScraper:
             if rating == mark:
                 return i + 1
 
-    def export_csv(self, one_file: bool):
+    @staticmethod
+    def export_stream(books, exporters):
         """
-        Export book data to csv files in exports directory.
-        @param one_file: one file export if True
+        Write each book to every exporter as it is scraped and pass it on.
+        @param books: iterable of book data dicts
+        @param exporters: list of scraper_exporters instances
+        @return: generator of book data dicts
         """
-        if not os.path.isdir(f"{self.csv_dir}"):
-            os.mkdir(f"{self.csv_dir}")
-
-        headers = [
-            'product_page_url',
-            'universal_product_code',
-            'title',
-            'price_including_tax',
-            'price_excluding_tax',
-            'number_available',
-            'product_description',
-            'category',
-            'review_rating',
-            'image_url'
-        ]
-
-        if one_file:
-            csv_fullpath = f"./{self.csv_dir}books.csv"
-            with open(csv_fullpath, 'w', newline='', encoding='utf-8') as csv_file:
-                writer = csv.DictWriter(csv_file, fieldnames=headers)
-                writer.writeheader()
-                for category in tqdm(self.categories, desc="Exporting to csv", ncols=80):
-                    writer.writerows(self.books[category[0]])
-
-        else:
-            for category in tqdm(self.categories, desc="Exporting to csv", ncols=80):
-                csv_filename = category[0].lower().replace(' ', '_') + ".csv"
-                csv_fullpath = f"./{self.csv_dir}{csv_filename}"
-                with open(csv_fullpath, 'w', newline='', encoding='utf-8') as csv_file:
-                    writer = csv.DictWriter(csv_file, fieldnames=headers)
-                    writer.writeheader()
-                    writer.writerows(self.books[category[0]])
-
-    def export_json(self, one_file: bool):
+        for book in books:
+            for exporter in exporters:
+                exporter.write(book)
+            yield book
+
+    def download_images(self, books=None):
         """
-        Export book data to json files in exports directory.
-        @param one_file: one file export if True
+        Download cover images in parallel into covers/<category>/<upc>.jpg,
+        Identical images are stored once (content-addressed) and linked,
+        Covers already on disk with the expected size are skipped.
+        @param books: iterable of book data dicts, defaults to books instance
         """
-        if not os.path.isdir(f"{self.json_dir}"):
-            os.mkdir(f"{self.json_dir}")
-
-        if one_file:
-            for _ in trange(1, desc="Exporting to json", ncols=80):
-                json_fullpath = f"./{self.json_dir}books.json"
-                json_data = json.dumps(self.books, indent=2)
-                with open(json_fullpath, "w") as json_file:
-                    json_file.write(json_data)
-
-        else:
-            for category in tqdm(self.categories, desc="Exporting to json", ncols=80):
-                json_filename = category[0].lower().replace(' ', '_') + ".json"
-                json_fullpath = f"./{self.json_dir}{json_filename}"
-                json_data = json.dumps(self.books[category[0]], indent=4)
-                with open(json_fullpath, "w") as json_file:
-                    json_file.write(json_data)
-
-    def download_images(self):
+        if books is None:
+            books = (book for category in self.categories for book in self.books[category[0]])
+        downloader = CoverDownloader(self.session, self.covers_dir, workers=self.workers)
+        downloader.download(books)
+
+    def report_failures(self):
         """
-        Create category dirs within covers directory,
-        Set names for image files as "upc + book title",
-        Download cover images.
+        Display urls that could not be fetched after all retries,
+        Save them to a csv file in exports directory.
         """
-        if not os.path.isdir(f"{self.covers_dir}"):
-            os.mkdir(f"{self.covers_dir}")
+        failures = self.session.failures
+        if not failures:
+            return
 
-        for category in tqdm(self.categories, desc="Downloading cover images", ncols=80):
-            img_category_dir = f"{self.covers_dir}{category[0]}/"
-            if not os.path.isdir(img_category_dir):
-                os.mkdir(img_category_dir)
+        print(f"\n{len(failures)} url(s) could not be fetched, please refer to details below:")
+        for failure in failures[:10]:
+            print(f"  [{failure['status_code'] or 'connection error'}] {failure['url']} - {failure['error']}")
 
-            for book in self.books[category[0]]:
-                image = requests.get(book["image_url"])
-                img_name = f"{book['universal_product_code']}.jpg"
-                output_path = os.path.join(img_category_dir, img_name)
-                with open(output_path, "wb") as f:
-                    f.write(image.content)
-
-    @staticmethod
-    def connection_error(response):
-        """Display error message"""
-        print("Connection failed, please refer to details below:")
-        print(response.raise_for_status())
-        exit()
+        failures_path = f"{self.exports_dir}failed_urls.csv"
+        with open(failures_path, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=['url', 'status_code', 'error', 'attempts'])
+            writer.writeheader()
+            writer.writerows(failures)
+        print(f"Full list saved to {failures_path}")
 
 
 
 
-def unificar_csvs(caminho_pasta):
+def unificar_csvs(caminho_pasta, max_workers=None):
     """
-    Lê todos os arquivos .csv de uma pasta, limpa os dados de preço,
-    adiciona uma coluna com o nome do arquivo de origem,
-    e salva uma tabela unificada na mesma pasta.
+    Lê todos os arquivos .csv de uma pasta em paralelo (pool de processos) com um schema explícito,
+    limpa os dados de preço, adiciona uma coluna com o nome do arquivo de origem,
+    e salva uma tabela unificada na mesma pasta, em CSV e em Parquet tipado.
+    Arquivos que não mudaram desde a última execução (mesmo mtime e tamanho) não são relidos:
+    o resultado já processado é reaproveitado do cache em .cache_unificacao/.
+    Livros repetidos (mesmo universal_product_code) aparecem uma única vez,
+    com os dados do arquivo modificado mais recentemente.
+    A tabela final é ordenada por arquivo de origem e pela ordem das linhas no arquivo,
+    sem depender dos mtimes.
     Se nenhum CSV for encontrado, cria um arquivo vazio tabela_unificada.csv.
     """
-    arquivos_csv = [f for f in os.listdir(caminho_pasta) if f.endswith('.csv') and f != 'tabela_unificada.csv']
+    arquivos_csv = [
+        f for f in os.listdir(caminho_pasta)
+        if f.endswith(('.csv', '.csv.gz', '.csv.zst')) and f != 'tabela_unificada.csv'
+    ]
     
     caminho_saida = os.path.join(caminho_pasta, "tabela_unificada.csv")
+    caminho_parquet = os.path.join(caminho_pasta, "tabela_unificada.parquet")
+    pasta_cache = os.path.join(caminho_pasta, ".cache_unificacao")
+    caminho_indice_cache = os.path.join(pasta_cache, "indice.json")
 
     if not arquivos_csv:
         print("Nenhum arquivo CSV para unificar encontrado na pasta especificada.")
         
         # Cria DataFrame vazio e salva como CSV
         pd.DataFrame().to_csv(caminho_saida, index=False)
+        salvar_parquet(pd.DataFrame(), caminho_parquet)
         print(f"📄 Arquivo vazio criado em: {caminho_saida}")
         return
 
-    dataframes = []
     print(f"Arquivos encontrados para unificação: {arquivos_csv}")
 
+    # Ordena do arquivo mais antigo para o mais recente, para que o upsert mantenha o dado mais novo
+    versoes = {}
     for arquivo in arquivos_csv:
-        caminho_arquivo = os.path.join(caminho_pasta, arquivo)
-        try:
-            df = pd.read_csv(caminho_arquivo)
-
-            for col in ['price_including_tax', 'price_excluding_tax']:
-                if col in df.columns:
-                    df[col] = df[col].astype(str).str.replace('£', '', regex=False).astype(float)
-
-            df['arquivo_origem'] = arquivo
-            dataframes.append(df)
-        except Exception as e:
-            print(f"Erro ao processar o arquivo {arquivo}: {e}")
+        info = os.stat(os.path.join(caminho_pasta, arquivo))
+        versoes[arquivo] = [info.st_mtime_ns, info.st_size]
+    arquivos_csv.sort(key=lambda arquivo: (versoes[arquivo][0], arquivo))
+
+    os.makedirs(pasta_cache, exist_ok=True)
+    indice_cache = {}
+    if os.path.exists(caminho_indice_cache):
+        with open(caminho_indice_cache, encoding='utf-8') as arquivo_indice:
+            indice_cache = json.load(arquivo_indice)
+
+    def caminho_cache(arquivo):
+        return os.path.join(pasta_cache, f"{arquivo}.pkl")
+
+    pendentes = [
+        arquivo for arquivo in arquivos_csv
+        if indice_cache.get(arquivo) != versoes[arquivo] or not os.path.exists(caminho_cache(arquivo))
+    ]
+    print(f"{len(arquivos_csv) - len(pendentes)} arquivo(s) sem alteração reaproveitados do cache, "
+          f"{len(pendentes)} para processar.")
+
+    if pendentes:
+        workers = min(len(pendentes), max_workers or os.cpu_count() or 1)
+        caminhos = [os.path.join(caminho_pasta, arquivo) for arquivo in pendentes]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = dict(zip(pendentes, [executor.submit(ler_csv_categoria, caminho) for caminho in caminhos]))
+            for arquivo, futuro in futuros.items():
+                try:
+                    futuro.result().to_pickle(caminho_cache(arquivo))
+                    indice_cache[arquivo] = versoes[arquivo]
+                except Exception as e:
+                    indice_cache.pop(arquivo, None)
+                    print(f"Erro ao processar o arquivo {arquivo}: {e}")
+
+    # Remove do cache arquivos que não existem mais na pasta
+    for arquivo in list(indice_cache):
+        if arquivo not in versoes:
+            del indice_cache[arquivo]
+            if os.path.exists(caminho_cache(arquivo)):
+                os.remove(caminho_cache(arquivo))
+    with open(caminho_indice_cache, 'w', encoding='utf-8') as arquivo_indice:
+        json.dump(indice_cache, arquivo_indice)
+
+    dataframes = [pd.read_pickle(caminho_cache(arquivo)) for arquivo in arquivos_csv if arquivo in indice_cache]
 
     if not dataframes:
         print("Nenhum dataframe foi criado a partir dos arquivos CSV. Verifique o conteúdo dos arquivos.")
         pd.DataFrame().to_csv(caminho_saida, index=False)
+        salvar_parquet(pd.DataFrame(), caminho_parquet)
         print(f"📄 Arquivo vazio criado em: {caminho_saida}")
         return
 
     tabela_unificada = pd.concat(dataframes, ignore_index=True)
+    # Upsert por universal_product_code: fica a última ocorrência (arquivo mais recente)
+    com_upc = tabela_unificada['universal_product_code'].notna()
+    duplicados = com_upc & tabela_unificada.duplicated('universal_product_code', keep='last')
+    if duplicados.any():
+        print(f"{int(duplicados.sum())} livro(s) repetido(s) substituído(s) pela versão mais recente.")
+        tabela_unificada = tabela_unificada[~duplicados]
+    # A ordem por mtime só serve ao upsert; a saída segue o nome do arquivo e (sort estável) a ordem das linhas nele
+    tabela_unificada = tabela_unificada.sort_values('arquivo_origem', kind='stable').reset_index(drop=True)
     tabela_unificada.to_csv(caminho_saida, index=False)
 
     print(f"✅ Tabela unificada com {len(tabela_unificada)} linhas salva em: {caminho_saida}")
+    if salvar_parquet(tabela_unificada, caminho_parquet, caminho_saida):
+        print(f"✅ Versão Parquet salva em: {caminho_parquet}")
 
 
 def timer(start):
@@ -309,18 +399,52 @@ def main_scraping():
     parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 
     parser.add_argument("-c", "--csv", action="store_true", help="Export to csv files")
-    parser.add_argument("-j", "--json", action="store_true", help="Export to json files")
+    parser.add_argument("-j", "--json", action="store_true", help="Export to json lines files")
     parser.add_argument("--one-file", action="store_true", help="Export data to one csv file")
+    parser.add_argument("--compression", type=str, default="none", choices=["none", "gzip", "zstd"],
+                        help="Compress exported files")
     parser.add_argument("--ignore-covers", action="store_true", help="Skip cover downloads")
     parser.add_argument("--categories", type=str, nargs="+", default=None,
                         help="Scrape specific categories (name or full url)")
+    parser.add_argument("-w", "--workers", type=int, default=8,
+                        help="Number of concurrent download workers")
+    parser.add_argument("--max-per-host", type=int, default=8,
+                        help="Maximum simultaneous requests to the same host")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help="Kept-alive connections per host (defaults to --workers)")
+    parser.add_argument("--timeout", type=float, default=30, help="Request timeout in seconds")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="Retries on 5xx responses and connection errors")
+    parser.add_argument("--backoff", type=float, default=0.5,
+                        help="Base delay in seconds of the exponential retry backoff")
+    parser.add_argument("--cache-dir", type=str, default="exports/http_cache/",
+                        help="HTTP cache directory, pages are revalidated with ETag / Last-Modified")
+    parser.add_argument("--max-cache-mb", type=int, default=200,
+                        help="HTTP cache size cap in MB (0 disables the cache)")
+    parser.add_argument("--parser", type=str, default="auto",
+                        choices=["auto", "selectolax", "lxml", "html.parser"],
+                        help="HTML parser backend (auto picks the fastest installed)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip books already saved in the checkpoint by a previous run")
+    parser.add_argument("--checkpoint", type=str, default="exports/checkpoint.jsonl",
+                        help="Checkpoint file where each book is saved as soon as it is scraped")
     args = parser.parse_args()
     config = vars(args)
     if not config["json"] and not config["csv"]:
         config["csv"] = True
 
     start = int(time.time())
-    scraper = BookScraper()
+    scraper = BookScraper(
+        workers=config["workers"],
+        max_per_host=config["max_per_host"],
+        pool_size=config["pool_size"],
+        timeout=config["timeout"],
+        retries=config["retries"],
+        backoff=config["backoff"],
+        cache_dir=config["cache_dir"],
+        max_cache_mb=config["max_cache_mb"],
+        parser=config["parser"]
+    )
     print("-" * 30)
     print(" Scraping Books.ToScrape.com")
     print("-" * 30)